@@ -1,5 +1,5 @@
 from fastapi import Header, HTTPException, Depends
-from db.session import SessionLocal
+from db.session import SessionLocal, AsyncSessionLocal
 from core.security import decode_token
 
 def get_db():
@@ -9,8 +9,12 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def get_user_id(authorization: str = Header(...)):
     if not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing bearer token")
     token = authorization.split()[1]
-    return decode_token(token)
\ No newline at end of file
+    return decode_token(token)
@@ -1,9 +1,12 @@
 # backend/api/routes/accounts.py
 from core.utils.currency import convert_amount
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from decimal import Decimal
-from api.deps import get_db, get_user_id
+from api.deps import get_async_db, get_user_id
+from db.queries import transactions_of_account, user_accounts
 from models import User, Account
 from schemas.account import AccountOut
 from decimal import Decimal
@@ -14,12 +17,12 @@ router = APIRouter(tags=["accounts"])
 
 
 @router.get("/me")
-def me(user_id: int = Depends(get_user_id), db: Session = Depends(get_db)):
-    user = db.query(User).get(user_id)
+async def me(user_id: int = Depends(get_user_id), db: AsyncSession = Depends(get_async_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    accounts = db.query(Account).filter_by(user_id=user_id).all()
+    accounts = (await db.execute(user_accounts(user_id))).scalars().all()
 
     out_accounts = []
     total_display = Decimal("0.00")
@@ -53,38 +56,37 @@ def me(user_id: int = Depends(get_user_id), db: Session = Depends(get_db)):
 
 
 @router.get("/accounts/{account_id}")
-def account_detail(account_id: int, user_id: int = Depends(get_user_id), db: Session = Depends(get_db)):
-    a = db.query(Account).filter_by(id=account_id, user_id=user_id).first()
+async def account_detail(account_id: int, user_id: int = Depends(get_user_id), db: AsyncSession = Depends(get_async_db)):
+    a = (await db.execute(select(Account).filter_by(id=account_id, user_id=user_id))).scalars().first()
     if not a:
         raise HTTPException(status_code=404, detail="Account not found")
     return AccountOut.model_validate(a)
 
 @router.get("/accounts/{account_id}/transactions")
-def account_transactions(
+async def account_transactions(
     account_id: int,
     user_id: int = Depends(get_user_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Return all transactions for an account, with related payment + service info
     in a single optimized query (no N+1 queries).
     """
-    account = db.query(Account).filter_by(id=account_id, user_id=user_id).first()
+    account = (await db.execute(select(Account).filter_by(id=account_id, user_id=user_id))).scalars().first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
     # One joined query to fetch everything efficiently
     txs = (
-        db.query(Transaction)
-        .outerjoin(Payment, Payment.id == Transaction.payment_id)
-        .outerjoin(Service, Service.id == Payment.service_id)
-        .filter(Transaction.account_id == account.id, Transaction.user_id == user_id)
-        .options(
-            joinedload(Transaction.payment).joinedload(Payment.service)
+        await db.execute(
+            transactions_of_account(account.id, user_id)
+            .outerjoin(Payment, Payment.id == Transaction.payment_id)
+            .outerjoin(Service, Service.id == Payment.service_id)
+            .options(
+                joinedload(Transaction.payment).joinedload(Payment.service)
+            )
         )
-        .order_by(Transaction.created_at.desc())
-        .all()
-    )
+    ).scalars().all()
 
     # Construct results
     result = [
@@ -109,21 +111,25 @@ def account_transactions(
     return result
 
 @router.get("/accounts/{account_id}/transactions/{transaction_id}")
-def get_transaction_detail(
+async def get_transaction_detail(
     account_id: int,
     transaction_id: int,
     user_id: int = Depends(get_user_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Return a single transaction for an account, including payment + service info.
     """
     tx = (
-        db.query(Transaction)
-        .filter_by(id=transaction_id, account_id=account_id, user_id=user_id)
-        .options(joinedload(Transaction.payment).joinedload(Payment.service))
-        .first()
-    )
+        await db.execute(
+            select(Transaction)
+            .filter_by(id=transaction_id, account_id=account_id, user_id=user_id)
+            .options(
+                joinedload(Transaction.payment).joinedload(Payment.service),
+                joinedload(Transaction.account),
+            )
+        )
+    ).scalars().first()
 
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
@@ -1,13 +1,19 @@
 # backend/api/routes/admin/accounts.py
-from fastapi import APIRouter, Depends, HTTPException, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Path, Body, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Optional
+from api.deps import get_async_db
 from db.session import SessionLocal
 from core.permissions import require_admin
 from models.account import Account
 from models.transaction import Transaction
 from models.payment import Payment
+from services.account_balance import update_account
+from services.ledger import compact_balances, get_balance_as_of
 from os import getenv
 
 try:
@@ -32,6 +38,33 @@ def get_db():
         db.close()
 
 
+@accounts_router.post("/ledger/compact", summary="Write ledger balance snapshots now (admin)")
+async def compact_ledger():
+    """Snapshot every account with postings since its last snapshot (see services/ledger.py)."""
+    return await compact_balances()
+
+
+@accounts_router.get("/{account_id}/balance", summary="Ledger balance of an account, now or at a point in time (admin)")
+async def get_account_balance(
+    account_id: int = Path(...),
+    as_of: Optional[datetime] = Query(None, description="UTC time to read the balance at (default: now)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    current = (await db.execute(select(Account.balance).filter_by(id=account_id))).scalar_one_or_none()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if as_of is not None and as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    ledger = await get_balance_as_of(db, account_id, as_of)
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="No ledger history for this account at that time")
+    if as_of is None:
+        # materialized balance vs. ledger: anything but 0 means a write bypassed the ledger
+        ledger["current_balance"] = Decimal(current).quantize(Decimal("0.01"))
+        ledger["drift"] = ledger["current_balance"] - ledger["balance"]
+    return ledger
+
+
 @accounts_router.get("/{account_id}")
 def get_account(account_id: int = Path(...), db: Session = Depends(get_db)):
     acc = db.query(Account).filter(Account.id == account_id).first()
@@ -54,27 +87,27 @@ def patch_account(
     payload: dict = Body(...),
     db: Session = Depends(get_db),
 ):
-    acc = db.query(Account).filter(Account.id == account_id).first()
-    if not acc:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    if "name" in payload and payload["name"] is not None:
-        acc.name = str(payload["name"]).strip()
-    if "number" in payload and payload["number"] is not None:
-        acc.number = str(payload["number"]).strip()
+    balance = None
     if "balance" in payload:
         raw = payload.get("balance")
         try:
-            raw_dec = Decimal(str(raw))
+            balance = Decimal(str(raw)).quantize(Decimal("0.01"))
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid balance value")
 
-        input_currency = (payload.get("currency") or acc.currency or "USD").upper()
-        acc.balance = raw_dec.quantize(Decimal("0.01"))
-        acc.currency = input_currency
+    def apply(acc: Account) -> None:
+        if "name" in payload and payload["name"] is not None:
+            acc.name = str(payload["name"]).strip()
+        if "number" in payload and payload["number"] is not None:
+            acc.number = str(payload["number"]).strip()
+        if balance is not None:
+            acc.balance = balance
+            acc.currency = (payload.get("currency") or acc.currency or "USD").upper()
 
-    db.commit()
-    db.refresh(acc)
+    # re-applied on a fresh row if a payment moved the balance meanwhile
+    acc = update_account(db, account_id, apply)
+    if not acc:
+        raise HTTPException(status_code=404, detail="Account not found")
 
     return {
         "id": acc.id,
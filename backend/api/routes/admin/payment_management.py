@@ -1,12 +1,25 @@
 # backend/api/routes/admin/payment_management.py
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, joinedload
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from decimal import Decimal
 
 from api.deps import get_db
 from core.permissions import require_admin
+from db.queries import oldest_first
+from core.utils.export import EXPORT_FORMAT_PATTERN, export_response
+from core.utils.pagination import (
+    TOTAL_MODE_PATTERN,
+    approximate_row_count,
+    keyset_after,
+    next_cursor_for,
+)
 from models.payment import Payment
+from models.service import Service
+from services.account_balance import release_hold_sync
+from services.reconciliation import get_reconcile_stats, reconcile_payments
 from schemas.admin_payment import (
     PaymentAdminOut,
     PaginatedAdminPayments,
@@ -84,27 +97,113 @@ def list_payments(
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200),
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (overrides offset)"),
+    total: str = Query("exact", pattern=TOTAL_MODE_PATTERN, description="exact | approx | none"),
 ):
-    q = db.query(Payment).options(joinedload(Payment.service))
-
-    total = q.count()
-    payments = (
-        q.order_by(Payment.created_at.asc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    q = (
+        db.query(Payment)
+        .options(joinedload(Payment.service))
+        .order_by(*oldest_first(Payment))
     )
+    if cursor:
+        q = q.filter(keyset_after(Payment.created_at, Payment.id, cursor, descending=False))
+    else:
+        q = q.offset(offset)
+
+    total_count = None
+    if total == "exact":
+        total_count = db.execute(select(func.count()).select_from(Payment)).scalar()
+    elif total == "approx":
+        total_count = approximate_row_count(db, Payment)
+
+    payments, next_cursor = next_cursor_for(q.limit(limit + 1).all(), limit)
 
     items = [PaymentAdminOut(**serialize_payment(p)) for p in payments]
 
     return PaginatedAdminPayments(
         items=items,
-        total=total,
+        total=total_count,
         limit=limit,
         offset=offset,
+        next_cursor=next_cursor,
     )
 
 
+@router.get(
+    "/export",
+    dependencies=[Depends(require_admin)],
+    summary="Stream payments as CSV / NDJSON (admin)",
+)
+def export_payments(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv | ndjson"),
+    start_date: Optional[datetime] = Query(None, description="created_at >= start_date"),
+    end_date: Optional[datetime] = Query(None, description="created_at <= end_date"),
+    status: Optional[str] = Query(None),
+):
+    """
+    serialize_payment fields as plain columns, streamed in batches
+    (constant memory for any date range).
+    """
+    stmt = (
+        select(
+            Payment.id,
+            Payment.customer_name,
+            Payment.service_id,
+            Service.name.label("service_name"),
+            Service.code.label("service_code"),
+            Payment.status,
+            Payment.confirmed_at,
+            Payment.created_at,
+            Payment.amount,
+            Payment.fee,
+            Payment.total_amount,
+            Payment.currency,
+            Payment.invoice_currency,
+            Payment.reference_number,
+            Payment.session_id,
+            Payment.acknowledgement_id,
+            Payment.cdc_transaction_datetime,
+            Payment.cdc_transaction_datetime_utc,
+            Payment.reversal_transaction_id,
+            Payment.reversal_acknowledgement_id,
+            Payment.account_id,
+        )
+        .select_from(Payment)
+        .outerjoin(Service, Payment.service_id == Service.id)
+        .order_by(*oldest_first(Payment))
+    )
+    if start_date:
+        stmt = stmt.filter(Payment.created_at >= start_date)
+    if end_date:
+        stmt = stmt.filter(Payment.created_at <= end_date)
+    if status:
+        stmt = stmt.filter(Payment.status == status)
+    return export_response(stmt, format, "payments")
+
+
+@router.post(
+    "/reconcile",
+    dependencies=[Depends(require_admin)],
+    summary="Run a reconciliation pass over stuck payments now (admin)",
+)
+async def run_reconciliation():
+    """
+    Re-check committed / failed / reversal_failed payments at OSP and
+    hand them back to the saga to confirm or reverse (see
+    services/reconciliation.py). Waits for a scheduled pass in progress.
+    """
+    return await reconcile_payments()
+
+
+@router.get(
+    "/reconcile",
+    dependencies=[Depends(require_admin)],
+    summary="Reconciliation throughput and stuck-payment backlog (admin)",
+)
+async def reconciliation_stats():
+    return await get_reconcile_stats()
+
+
 @router.get(
     "/{payment_id}",
     dependencies=[Depends(require_admin)],
@@ -141,6 +240,9 @@ def update_status(
     if body.status not in valid_status:
         raise HTTPException(400, "Invalid status")
 
+    if payment.status == "started" and body.status != "started":
+        # leaving `started` without the saga's debit: nothing will capture the held funds
+        release_hold_sync(db, payment.id)
     payment.status = body.status
     db.commit()
     db.refresh(payment)
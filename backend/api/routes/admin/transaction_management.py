@@ -1,14 +1,25 @@
 # backend/api/routes/admin/transaction_management.py
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, joinedload
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from api.deps import get_db
 from core.permissions import require_admin
+from db.queries import oldest_first
+from core.utils.export import EXPORT_FORMAT_PATTERN, export_response
+from core.utils.pagination import (
+    TOTAL_MODE_PATTERN,
+    approximate_row_count,
+    keyset_after,
+    next_cursor_for,
+)
 from models.transaction import Transaction
 from models.payment import Payment
 from models.account import Account
 from models.user import User
+from models.service import Service
 from schemas.admin_transaction import (
     AdminTransactionOut,
     PaginatedAdminTransactions,
@@ -100,10 +111,14 @@ def list_transactions(
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=500),
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (overrides offset)"),
+    total: str = Query("exact", pattern=TOTAL_MODE_PATTERN, description="exact | approx | none"),
 ):
     """
     Returns paginated transactions serialized for admin UI.
     Preloads payment, payment.service, account and account.user to avoid N+1.
+    Oldest first; keyset pagination on (created_at, id) via `cursor`,
+    `offset` kept for older clients.
     """
     q = (
         db.query(Transaction)
@@ -113,18 +128,78 @@ def list_transactions(
             # load transaction.account -> account.user
             joinedload(Transaction.account).joinedload(Account.user),
         )
+        .order_by(*oldest_first(Transaction))
     )
+    if cursor:
+        q = q.filter(keyset_after(Transaction.created_at, Transaction.id, cursor, descending=False))
+    else:
+        q = q.offset(offset)
+
+    total_count = None
+    if total == "exact":
+        total_count = db.execute(select(func.count()).select_from(Transaction)).scalar()
+    elif total == "approx":
+        total_count = approximate_row_count(db, Transaction)
 
-    total = q.count()
-    txs = q.order_by(Transaction.created_at.asc()).offset(offset).limit(limit).all()
+    txs, next_cursor = next_cursor_for(q.limit(limit + 1).all(), limit)
     items = [AdminTransactionOut(**serialize_tx(t)) for t in txs]
 
     return PaginatedAdminTransactions(
         items=items,
-        total=total,
+        total=total_count,
         limit=limit,
         offset=offset,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get(
+    "/export",
+    summary="Stream transactions as CSV / NDJSON (admin)",
+)
+def export_transactions(
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN, description="csv | ndjson"),
+    start_date: Optional[datetime] = Query(None, description="created_at >= start_date"),
+    end_date: Optional[datetime] = Query(None, description="created_at <= end_date"),
+):
+    """
+    Same fields as the list endpoint, without the limit: rows are selected
+    as plain columns (payment values preferred, as in serialize_tx) and
+    streamed in batches, so memory does not grow with the date range.
+    """
+    stmt = (
+        select(
+            Transaction.id,
+            Transaction.transaction_id,
+            Transaction.direction,
+            Transaction.created_at,
+            Transaction.account_id,
+            Account.number.label("account_number"),
+            User.name.label("user_name"),
+            User.phone.label("user_phone"),
+            func.coalesce(Payment.reference_number, Transaction.reference_number).label("reference_number"),
+            func.coalesce(Transaction.description, Payment.reference_number).label("description"),
+            func.coalesce(Payment.amount, Transaction.amount).label("amount"),
+            Payment.fee,
+            Payment.total_amount,
+            func.coalesce(Payment.currency, Transaction.currency).label("currency"),
+            Payment.invoice_currency,
+            Payment.customer_name,
+            Service.name.label("service_name"),
+            Payment.status,
+        )
+        .select_from(Transaction)
+        .outerjoin(Payment, Transaction.payment_id == Payment.id)
+        .outerjoin(Service, Payment.service_id == Service.id)
+        .outerjoin(Account, Transaction.account_id == Account.id)
+        .outerjoin(User, Account.user_id == User.id)
+        .order_by(*oldest_first(Transaction))
     )
+    if start_date:
+        stmt = stmt.filter(Transaction.created_at >= start_date)
+    if end_date:
+        stmt = stmt.filter(Transaction.created_at <= end_date)
+    return export_response(stmt, format, "transactions")
 
 
 @router.get(
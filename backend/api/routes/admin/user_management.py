@@ -5,9 +5,10 @@ from typing import List, Optional
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 
-from core.security import hash_password
-from core.permissions import require_admin
+from core.security import hash_password_pooled
+from core.permissions import require_admin, invalidate_cached_user
 from api.deps import get_db  # use shared get_db
+from db import queries
 
 from os import getenv
 
@@ -17,6 +18,8 @@ from models.account import Account
 from models.transaction import Transaction
 from models.payment import Payment
 from models.service import Service
+from services.account_balance import update_account
+from services.ledger import post_opening_balance
 
 # Schemas (keep these as-is in your codebase)
 from schemas.user import UserCreate, UserOut, UserUpdate as UserUpdateSchema
@@ -308,15 +311,15 @@ def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
         pin_str = str(pin_raw).strip()
         if (not pin_str.isdigit()) or (len(pin_str) != 4):
             raise HTTPException(status_code=400, detail="PIN must be exactly 4 numeric digits")
-        pin_hash_val = hash_password(pin_str)
+        pin_hash_val = hash_password_pooled(pin_str)
     else:
-        pin_hash_val = hash_password("1234")
+        pin_hash_val = hash_password_pooled("1234")
 
     new_user = User(
         name=user_data.name,
         phone=user_data.phone,
-        password_hash=hash_password(user_data.password),
-        pin_hash=hash_password("1234"),
+        password_hash=hash_password_pooled(user_data.password),
+        pin_hash=hash_password_pooled("1234"),
         role=user_data.role or "user",
     )
     db.add(new_user)
@@ -345,16 +348,17 @@ def update_user(
     if "role" in payload and payload["role"]:
         user.role = payload["role"]
     if "password" in payload and payload["password"]:
-        user.password_hash = hash_password(payload["password"])
+        user.password_hash = hash_password_pooled(payload["password"])
 
     if "pin" in payload and payload["pin"] is not None and str(payload["pin"]).strip() != "":
         pin_candidate = str(payload["pin"]).strip()
         if (not pin_candidate.isdigit()) or (len(pin_candidate) != 4):
             raise HTTPException(status_code=400, detail="PIN must be exactly 4 numeric digits")
-        user.pin_hash = hash_password(pin_candidate)
+        user.pin_hash = hash_password_pooled(pin_candidate)
 
     db.commit()
     db.refresh(user)
+    invalidate_cached_user(user.id)
     return user
 
 
@@ -367,6 +371,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(user)
     db.commit()
+    invalidate_cached_user(user_id)
     return AdminDeleteUserOut(message="User deleted successfully")
 
 
@@ -404,34 +409,28 @@ def update_account_balance(
     payload: dict = Body(...),
     db: Session = Depends(get_db),
 ):
-    account = (
-        db.query(Account)
-        .filter(Account.id == account_id, Account.user_id == user_id)
-        .first()
-    )
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     try:
         raw_balance = Decimal(payload.get("balance", 0))
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid balance")
 
-    input_currency = (payload.get("currency") or account.currency or "USD").upper()
+    def apply(account: Account) -> None:
+        input_currency = (payload.get("currency") or account.currency or "USD").upper()
 
-    if input_currency == "KHR":
-        khr_per_usd = get_khr_per_usd()
-        if khr_per_usd == 0:
-            raise HTTPException(
-                status_code=500, detail="Exchange rate unavailable"
-            )
-        balance_usd = (raw_balance / khr_per_usd).quantize(Decimal("0.01"))
-    else:
-        balance_usd = raw_balance.quantize(Decimal("0.01"))
+        if input_currency == "KHR":
+            khr_per_usd = get_khr_per_usd()
+            if khr_per_usd == 0:
+                raise HTTPException(
+                    status_code=500, detail="Exchange rate unavailable"
+                )
+            account.balance = (raw_balance / khr_per_usd).quantize(Decimal("0.01"))
+        else:
+            account.balance = raw_balance.quantize(Decimal("0.01"))
 
-    account.balance = balance_usd
-    db.commit()
-    db.refresh(account)
+    # re-applied on a fresh row if a payment moved the balance meanwhile
+    account = update_account(db, account_id, apply, user_id=user_id)
+    if not account:
+        raise HTTPException(status_code=404, detail="Account not found")
 
     return AdminAccountBalanceUpdateOut(
         id=account.id,
@@ -477,6 +476,8 @@ def create_user_account(
         currency=incoming_currency,
     )
     db.add(acc)
+    db.flush()
+    post_opening_balance(db, acc)
     db.commit()
     db.refresh(acc)
 
@@ -653,11 +654,7 @@ def user_payments(
     ),
 ):
     """Get user's recent payments (joined with service info)."""
-    q = (
-        db.query(Payment)
-        .options(joinedload(Payment.service), joinedload(Payment.transaction))
-        .filter(Payment.user_id == user_id)
-    )
+    q = queries.user_payments(user_id).options(joinedload(Payment.service), joinedload(Payment.transaction))
 
     if start_date:
         try:
@@ -683,7 +680,7 @@ def user_payments(
     if status:
         q = q.filter(Payment.status.ilike(status))
 
-    payments = q.order_by(Payment.created_at).limit(limit).all()
+    payments = db.execute(q.order_by(Payment.created_at).limit(limit)).scalars().unique().all()
 
     results: List[PaymentConfirmOut] = []
     for p in payments:
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from core.security import create_token, verify_password
-from db.session import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.security import create_token, verify_password_async
+from api.deps import get_async_db
 from models.user import User
 from core.rate_limit import rate_limit_login 
 
@@ -18,14 +20,10 @@ class TokenOut(BaseModel):
     name: str
 
 @router.post("/login", response_model=TokenOut, dependencies=[Depends(rate_limit_login)])
-def login(body: LoginIn):
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter_by(phone=body.phone).first()
-        if not user or not verify_password(body.password, user.password_hash):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        token = create_token(user.id)
+async def login(body: LoginIn, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).filter_by(phone=body.phone))).scalars().first()
+    if not user or not await verify_password_async(body.password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    token = create_token(user.id)
 
-        return TokenOut(access_token=token, role=user.role, name=user.name)
-    finally:
-        db.close()
+    return TokenOut(access_token=token, role=user.role, name=user.name)
@@ -1,8 +1,20 @@
 # backend/api/routes/debug.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from loguru import logger
+from services.osp_http import get_pool_stats
+from services.osp_breaker import get_breaker_stats
+from services.osp_cache import invoice_cache
+from core.security import get_bcrypt_pool_stats, get_token_cache_stats
+from core.permissions import get_user_cache_stats, require_admin
+from core.rate_limit import get_rate_limit_stats
+from core.logging import get_log_writer_stats
+from core.tracing import get_tracing_stats
+from core.idempotency import get_idempotency_stats
+from services.payment_saga import get_saga_stats
+from services.ledger import get_ledger_stats
 
-router = APIRouter(prefix="/debug", tags=["Debug"])
+# process internals and database backlogs: admins only
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(require_admin)])
 
 @router.get("/log-error")
 async def debug_log_error():
@@ -19,3 +31,75 @@ async def debug_log_error():
     except ZeroDivisionError as e:
         logger.exception("Forced exception in /debug/log-error")
         raise HTTPException(status_code=500, detail="Forced error for logging test")
+
+
+@router.get("/osp-pool")
+async def debug_osp_pool():
+    """Connection pool counters of the shared OSP client (this process)."""
+    return get_pool_stats()
+
+
+@router.get("/osp-breakers")
+async def debug_osp_breakers():
+    """Circuit breaker state and adaptive timeout per OSP endpoint (this process)."""
+    return get_breaker_stats()
+
+
+@router.get("/osp-lookup-cache")
+async def debug_osp_lookup_cache():
+    """Hit/miss counters of the OSP invoice lookup cache (this process)."""
+    return invoice_cache.stats()
+
+
+@router.get("/bcrypt-pool")
+async def debug_bcrypt_pool():
+    """Queue depth and counters of the bcrypt worker pool (this process)."""
+    return get_bcrypt_pool_stats()
+
+
+@router.get("/user-cache")
+async def debug_user_cache():
+    """Hit/miss counters of the authenticated-user cache (this process)."""
+    return get_user_cache_stats()
+
+
+@router.get("/token-cache")
+async def debug_token_cache():
+    """Hit/miss counters of the verified-JWT cache (this process)."""
+    return get_token_cache_stats()
+
+
+@router.get("/rate-limit")
+async def debug_rate_limit():
+    """Backend, tracked keys and evictions of the rate limiter (this process)."""
+    return get_rate_limit_stats()
+
+
+@router.get("/log-writer")
+async def debug_log_writer():
+    """Buffered/written record counts and inline flushes of the log writer (this process)."""
+    return get_log_writer_stats()
+
+
+@router.get("/tracing")
+async def debug_tracing():
+    """Exported/dropped/buffered span counts of the trace exporter (this process)."""
+    return get_tracing_stats()
+
+
+@router.get("/idempotency")
+async def debug_idempotency():
+    """Idempotency keys running in this process and stored keys by status (database)."""
+    return await get_idempotency_stats()
+
+
+@router.get("/payment-saga")
+async def debug_payment_saga():
+    """Saga worker counters (this process) and the pending/due backlog (database)."""
+    return await get_saga_stats()
+
+
+@router.get("/ledger")
+async def debug_ledger():
+    """Snapshot compaction runs (this process) and postings not yet covered by a snapshot (database)."""
+    return await get_ledger_stats()
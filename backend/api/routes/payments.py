@@ -1,47 +1,69 @@
 # backend/api/routes/payments.py
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from decimal import Decimal, InvalidOperation
-from api.deps import get_db, get_user_id
+from api.deps import get_async_db, get_user_id
+from db.queries import payment_debit
 
-from models import Payment, Transaction, Account, Service
+from models import Payment, PaymentSaga, Transaction, Account, Service
 from models.user import User
 import re
 
-from schemas.payment import PaymentStartOut, PaymentConfirmOut
-
+from schemas.payment import (
+    PaymentBatchIn,
+    PaymentBatchItemOut,
+    PaymentBatchOut,
+    PaymentLookupBatchIn,
+    PaymentStartOut,
+    PaymentConfirmOut,
+    PaymentStatusOut,
+)
+
+import asyncio
+import json
 import uuid
 import httpx
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 
 from core.utils.timezone import to_local_time
-from core.utils.payments import mark_confirmed
-from core.utils.txid import generate_transaction_id_from_id
 from core.utils.currency import convert_amount
 from core.config import settings
-from core.security import verify_password
+from core.metrics import PAYMENT_TRANSITIONS
+from core.security import verify_password_async
+from core.rate_limit import rate_limit_ip, rate_limit_user
+from core.utils.log_sampling import cap_body, should_log
+from services.payment_saga import (
+    SUCCEEDED as SAGA_SUCCEEDED,
+    get_payment_saga,
+    new_payment_saga,
+    resume_payment_saga,
+    start_payment_saga,
+    wait_for_saga,
+    wait_for_sagas,
+    wake_saga_workers,
+)
+from services.account_balance import InsufficientBalance, debit_account, place_hold, release_hold
+from services.ledger import OSP_CLEARING, post_entry
 
 from loguru import logger
-from typing import Any
+from typing import Any, AsyncIterator, List, Tuple
 
 if settings.USE_MOCK_OSP is True:
     from services.osp_client_mockup import (
         osp_lookup,
-        osp_commit,
-        osp_confirm,
-        osp_reverse,
     )
 else:
     from services.osp_client import (
         osp_lookup,
-        osp_commit,
-        osp_confirm,
-        osp_reverse,
     )
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
+_RL_WINDOW = settings.RATE_LIMIT_PAYMENT_WINDOW
+
 SENSITIVE_KEYS = {"pin"}
 
 
@@ -67,6 +89,8 @@ def _build_param_log(params: dict[str, Any]) -> dict:
 
 
 def _log_payment_request(endpoint: str, user_id: int | None, **params: Any) -> None:
+    if not should_log():
+        return
     try:
         logger.bind(
             payment_log="request",
@@ -92,24 +116,33 @@ def _serialize_response(response: Any) -> Any:
     return repr(response)
 
 
-def _log_payment_response(endpoint: str, user_id: int | None, response: Any) -> None:
+def _log_payment_response(endpoint: str, user_id: int | None, response: Any, failed: bool = False) -> None:
+    # Serialise (model_dump) only for records that will actually be written
+    if not should_log(failed=failed):
+        return
     try:
         logger.bind(
             payment_log="response",
             endpoint=endpoint,
             user_id=user_id,
-            response=_serialize_response(response),
+            response=cap_body(_serialize_response(response)),
         ).info("Payment response")
     except Exception:
         pass
 
 
 # Lookup Invoice (Query Payment)
-@router.get("/lookup")
+@router.get(
+    "/lookup",
+    dependencies=[Depends(rate_limit_ip("payments_lookup", settings.RATE_LIMIT_LOOKUP_PER_IP, _RL_WINDOW))],
+)
 async def lookup(reference_number: str):
     try:
         result = await osp_lookup(reference_number)
         return result
+    except HTTPException:
+        # e.g. OSP circuit open (503)
+        raise
     except httpx.HTTPStatusError as e:
         # Handle specific 423 Locked status from OSP
         if e.response.status_code == 423:
@@ -133,20 +166,129 @@ async def lookup(reference_number: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _lookup_line(index: int, reference_number: str, status_code: int, **body: Any) -> str:
+    item = {"index": index, "reference_number": reference_number, "status_code": status_code, **body}
+    return json.dumps(item, default=str) + "\n"
+
+
+async def _lookup_or_error(reference_number: str, semaphore: asyncio.Semaphore) -> Tuple[int, Any]:
+    """(200, OSP result) or (status_code, detail) for one reference of a batch; never raises."""
+    async with semaphore:
+        try:
+            return 200, await osp_lookup(reference_number)
+        except HTTPException as e:
+            # e.g. OSP circuit open (503)
+            return e.status_code, e.detail
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 423:
+                return 423, "This invoice has already been paid."
+            return e.response.status_code, f"OSP Error: {cap_body(e.response.text)}"
+        except Exception as e:
+            logger.warning(f"Batch lookup {reference_number} failed: {type(e).__name__}: {e}")
+            return 500, str(e) or type(e).__name__
+
+
+async def _lookup_item(index: int, reference_number: str, semaphore: asyncio.Semaphore) -> Tuple[int, str]:
+    """One batch entry as (status_code, NDJSON line)."""
+    status_code, value = await _lookup_or_error(reference_number, semaphore)
+    if status_code == 200:
+        return status_code, _lookup_line(index, reference_number, status_code, result=value)
+    return status_code, _lookup_line(index, reference_number, status_code, detail=value)
+
+
+async def _stream_lookups(reference_numbers: List[str]) -> AsyncIterator[str]:
+    semaphore = asyncio.Semaphore(max(1, settings.OSP_LOOKUP_BATCH_CONCURRENCY))
+    tasks = [
+        asyncio.create_task(_lookup_item(index, ref, semaphore))
+        for index, ref in enumerate(reference_numbers)
+    ]
+    counts = {"ok": 0, "already_paid": 0, "failed": 0}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            status_code, line = await next_done
+            key = "ok" if status_code == 200 else "already_paid" if status_code == 423 else "failed"
+            counts[key] += 1
+            yield line
+    finally:
+        # client went away: drop lookups that have not run yet
+        for task in tasks:
+            task.cancel()
+    yield json.dumps({"done": True, "total": len(tasks), **counts}) + "\n"
+
+
+# Lookup many invoices at once
+@router.post(
+    "/lookup/batch",
+    dependencies=[
+        Depends(rate_limit_user("payments_lookup_batch", settings.RATE_LIMIT_BULK_LOOKUP_PER_USER, _RL_WINDOW)),
+    ],
+)
+async def lookup_batch(body: PaymentLookupBatchIn, user_id: int = Depends(get_user_id)):
+    """
+    NDJSON stream, one line per reference as its OSP lookup completes
+    (`index` = position in the request; `status_code` 200 with `result`,
+    423 already paid, or the error with `detail`), then a summary line.
+    At most OSP_LOOKUP_BATCH_CONCURRENCY lookups run at once, over the
+    shared OSP connection pool and invoice cache.
+    """
+    reference_numbers = [ref.strip() for ref in body.reference_numbers]
+    if len(reference_numbers) > settings.OSP_LOOKUP_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.OSP_LOOKUP_BATCH_MAX_ITEMS} reference numbers per batch",
+        )
+    _log_payment_request("payments.lookup_batch", user_id=user_id, count=len(reference_numbers))
+    return StreamingResponse(_stream_lookups(reference_numbers), media_type="application/x-ndjson")
+
+
+def _quote_invoice(osp_data: dict, account_currency: str) -> Tuple[Decimal, str, Decimal, Decimal, Decimal]:
+    """
+    (invoice_amount, invoice_currency, amount, fee, total_debit) of an OSP
+    invoice; amount, fee and total in the account currency.
+    """
+    # Invoice details from OSP
+    invoice_amount = _to_decimal(osp_data.get("amount", "0"))
+    invoice_currency = (osp_data.get("currency") or "KHR").upper()
+
+    # Fee is configured in settings (assume USD). Convert fee into account currency.
+    fee_usd = _to_decimal(settings.FEE_AMOUNT or "0.00")
+    fee_in_account_currency = convert_amount(fee_usd, "USD", account_currency)
+
+    # Convert invoice -> account currency (no-op if same currency)
+    invoice_converted_to_account = convert_amount(
+        invoice_amount, invoice_currency, account_currency
+    )
+
+    # Total to reserve / debit from the account (in account currency)
+    total_debit = (invoice_converted_to_account + fee_in_account_currency).quantize(
+        Decimal("0.01")
+    )
+    return invoice_amount, invoice_currency, invoice_converted_to_account, fee_in_account_currency, total_debit
+
+
 # Start Payment
-@router.post("/start", response_model=PaymentStartOut)
+@router.post(
+    "/start",
+    response_model=PaymentStartOut,
+    dependencies=[
+        Depends(rate_limit_ip("payments_start", settings.RATE_LIMIT_START_PER_IP, _RL_WINDOW)),
+        Depends(rate_limit_user("payments_start", settings.RATE_LIMIT_START_PER_USER, _RL_WINDOW)),
+    ],
+)
 async def start_payment(
     account_id: int,
     reference_number: str,
     service_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_user_id),
 ):
-    account = db.query(Account).filter_by(id=account_id, user_id=user_id).first()
-    service = db.query(Service).filter_by(id=service_id).first()
+    account = (await db.execute(select(Account).filter_by(id=account_id, user_id=user_id))).scalars().first()
+    service = (await db.execute(select(Service).filter_by(id=service_id))).scalars().first()
 
     if not account or not service:
         raise HTTPException(status_code=404, detail="Account or service not found")
+    # End the read transaction: no connection is held across the OSP lookup
+    await db.commit()
 
     _log_payment_request(
         "payments.start.osp_lookup",
@@ -167,44 +309,25 @@ async def start_payment(
             updated_at=datetime.now(),
         )
         db.add(payment)
-        db.commit()
-        db.refresh(payment)
+        await db.commit()
+        await db.refresh(payment)
         _log_payment_response(
             "payments.start.osp_lookup",
             user_id=user_id,
             response=osp_data,
+            failed=True,
         )
         raise HTTPException(status_code=400, detail="Invalid invoice from OSP")
 
-    # Invoice details from OSP
-    invoice_amount = _to_decimal(osp_data.get("amount", "0"))
-    invoice_currency = (osp_data.get("currency") or "KHR").upper()
-
     # Account currency (what will be debited)
     account_currency = (getattr(account, "currency", "USD") or "USD").upper()
-
-    # Fee is configured in settings (assume USD). Convert fee into account currency.
-    fee_usd = _to_decimal(settings.FEE_AMOUNT or "0.00")
-    fee_in_account_currency = convert_amount(fee_usd, "USD", account_currency)
-
-    # Convert invoice -> account currency (no-op if same currency)
-    invoice_converted_to_account = convert_amount(
-        invoice_amount, invoice_currency, account_currency
-    )
-
-    # Total to reserve / debit from the account (in account currency)
-    total_debit = (invoice_converted_to_account + fee_in_account_currency).quantize(
-        Decimal("0.01")
-    )
-
-    # Check account balance
-    try:
-        acct_balance = Decimal(account.balance or 0).quantize(Decimal("0.01"))
-    except Exception:
-        acct_balance = Decimal("0.00")
-
-    if acct_balance < total_debit:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
+    (
+        invoice_amount,
+        invoice_currency,
+        invoice_converted_to_account,
+        fee_in_account_currency,
+        total_debit,
+    ) = _quote_invoice(osp_data, account_currency)
 
     osp_session_id = osp_data.get("session_id") or str(uuid.uuid4())
 
@@ -225,8 +348,14 @@ async def start_payment(
         created_at=datetime.utcnow(),
     )
     db.add(payment)
-    db.commit()
-    db.refresh(payment)
+    await db.flush()
+    # Reserve the funds until confirm (or PAYMENT_HOLD_TTL): checked and held in one statement
+    try:
+        await place_hold(db, payment, total_debit)
+    except InsufficientBalance:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Insufficient balance")
+    await db.commit()
 
     response = PaymentStartOut(
         payment_id=payment.id,
@@ -250,261 +379,452 @@ async def start_payment(
     return response
 
 
-# Confirm Payment (Commit + Confirm)
-@router.post("/{payment_id}/confirm", response_model=PaymentConfirmOut)
+# Confirm Payment (Commit + Confirm) — runs as a background saga, see services/payment_saga.py
+def _confirm_out(payment: Payment, account: Account, tx: Transaction | None, service: Service | None) -> PaymentConfirmOut:
+    debited_amount = _to_decimal(payment.total_amount).quantize(Decimal("0.01"))
+    return PaymentConfirmOut(
+        status=payment.status,
+        transaction_id=(tx.transaction_id or str(tx.id)) if tx else None,
+        account_id=account.id,
+        reference_number=payment.reference_number,
+        customer_name=payment.customer_name,
+        invoice_amount=float(
+            _to_decimal(payment.amount).quantize(Decimal("0.01"))
+        ),
+        invoice_currency=payment.invoice_currency,
+        amount=float(debited_amount),
+        amount_debited=float(debited_amount),
+        fee=float(_to_decimal(payment.fee).quantize(Decimal("0.01"))),
+        total_amount=float(debited_amount),
+        currency=(payment.currency or payment.invoice_currency),
+        new_balance=float(account.balance),
+        cdc_transaction_datetime=payment.cdc_transaction_datetime.strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        if payment.cdc_transaction_datetime
+        else None,
+        cdc_transaction_datetime_utc=payment.cdc_transaction_datetime_utc.strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        if payment.cdc_transaction_datetime_utc
+        else None,
+        cdc_transaction_datetime_local=to_local_time(payment.cdc_transaction_datetime),
+        service={
+            "id": service.id if service else None,
+            "name": service.name if service else None,
+            "logo_url": service.logo_url if service else None,
+        },
+    )
+
+
+async def _load_confirm_out(db: AsyncSession, payment_id: int, user_id: int) -> PaymentConfirmOut:
+    # populate_existing: the saga worker changed these rows in its own session
+    payment = (
+        await db.execute(
+            select(Payment)
+            .filter_by(id=payment_id, user_id=user_id)
+            .options(selectinload(Payment.service))
+            .execution_options(populate_existing=True)
+        )
+    ).scalars().first()
+    account = (
+        await db.execute(select(Account).filter_by(id=payment.account_id).execution_options(populate_existing=True))
+    ).scalars().first()
+    tx = (
+        await db.execute(payment_debit(payment.id))
+    ).scalars().first()
+    return _confirm_out(payment, account, tx, payment.service)
+
+
+def _processing_response(request: Request, payment_id: int, saga: PaymentSaga) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content={
+            "payment_id": payment_id,
+            "status": "processing",
+            "step": saga.step,
+            "status_url": request.url_for("payment_status", payment_id=payment_id).path,
+        },
+    )
+
+
+@router.post(
+    "/{payment_id}/confirm",
+    response_model=PaymentConfirmOut,
+    responses={202: {"description": "Still processing: poll GET /payments/{payment_id}/status"}},
+    dependencies=[
+        Depends(rate_limit_ip("payments_confirm", settings.RATE_LIMIT_CONFIRM_PER_IP, _RL_WINDOW)),
+        Depends(rate_limit_user("payments_confirm", settings.RATE_LIMIT_CONFIRM_PER_USER, _RL_WINDOW)),
+    ],
+)
 async def confirm_payment(
     payment_id: int,
     pin: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_user_id),
 ):
-    payment = db.query(Payment).filter_by(id=payment_id, user_id=user_id).first()
+    payment = (await db.execute(select(Payment).filter_by(id=payment_id, user_id=user_id))).scalars().first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
 
-    account = db.query(Account).filter_by(id=payment.account_id, user_id=user_id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
     # PIN must be exactly 4 numeric digits
     if not isinstance(pin, str) or not re.fullmatch(r"\d{4}", pin):
         raise HTTPException(status_code=400, detail="PIN must be exactly 4 numeric digits")
 
-    user = db.query(User).filter_by(id=user_id).first()
+    user = await db.get(User, user_id)
     if not user or not getattr(user, "pin_hash", None):
         raise HTTPException(status_code=401, detail="PIN not set for user")
+    # End the read transaction: no connection is held across the bcrypt check
+    await db.commit()
 
-    if not verify_password(pin, user.pin_hash):
+    if not await verify_password_async(pin, user.pin_hash):
         raise HTTPException(status_code=402, detail="Invalid PIN")
 
-    # Ensure account has still enough balance
-    try:
-        acct_balance = Decimal(account.balance or 0).quantize(Decimal("0.01"))
-    except Exception:
-        acct_balance = Decimal("0.00")
-
-    payment_total = _to_decimal(payment.total_amount).quantize(Decimal("0.01"))
-    payment_currency = (payment.currency or "USD").upper()
-    account_currency = (getattr(account, "currency", "USD") or "USD").upper()
+    # A repeated confirm joins the saga already running instead of paying twice
+    saga = await get_payment_saga(db, payment.id)
+    if saga is None:
+        if payment.status != "started":
+            raise HTTPException(status_code=409, detail=f"Payment is already {payment.status}")
 
-    # Defensive check
-    if payment_currency != account_currency:
-        payment_total = convert_amount(payment_total, payment_currency, account_currency)
+        account = (await db.execute(select(Account).filter_by(id=payment.account_id, user_id=user_id))).scalars().first()
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
 
-    if acct_balance < payment_total:
-        raise HTTPException(status_code=400, detail="Insufficient balance")
+        payment_total = _to_decimal(payment.total_amount).quantize(Decimal("0.01"))
+        payment_currency = (payment.currency or "USD").upper()
+        account_currency = (getattr(account, "currency", "USD") or "USD").upper()
 
-    try:
-        transaction_id = generate_transaction_id_from_id(payment.id, datetime.utcnow())
-        logger.info(
-            f"[Payment Confirm] Start Ref={payment.reference_number}, Txn={transaction_id}"
-        )
+        # Defensive check
+        if payment_currency != account_currency:
+            payment_total = convert_amount(payment_total, payment_currency, account_currency)
 
-        # Always refresh session before commit (pre-OSP request log)
-        _log_payment_request(
-            "payments.confirm.osp_lookup",
-            user_id=user_id,
-            payment_id=payment_id,
-            reference_number=payment.reference_number,
-        )
-        lookup_res = await osp_lookup(payment.reference_number)
-        if lookup_res.get("response_code") == 200:
-            payment.session_id = lookup_res.get("session_id")
-            db.commit()
-            logger.info(f"[Payment Confirm] Refreshed session_id={payment.session_id}")
+        # The hold placed at start may have expired: re-reserved together with the saga
+        try:
+            saga = await start_payment_saga(db, payment, payment_total)
+        except InsufficientBalance:
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+
+        if saga is None:
+            # a concurrent confirm got there first (join its saga), or the payment was canceled
+            saga = await get_payment_saga(db, payment.id)
+            if saga is None:
+                current = (await db.execute(
+                    select(Payment.status).filter_by(id=payment_id).execution_options(populate_existing=True)
+                )).scalar()
+                raise HTTPException(status_code=409, detail=f"Payment is already {current}")
         else:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid invoice or expired session from OSP",
+            _log_payment_request(
+                "payments.confirm",
+                user_id=user_id,
+                payment_id=payment_id,
+                reference_number=payment.reference_number,
+                transaction_id=saga.transaction_id,
+            )
+            logger.info(
+                f"[Payment Confirm] Queued Ref={payment.reference_number}, Txn={saga.transaction_id}"
             )
 
-        # --- Commit Payment to OSP --- (pre-OSP request log)
-        _log_payment_request(
-            "payments.confirm.osp_commit",
-            user_id=user_id,
-            payment_id=payment_id,
-            reference_number=payment.reference_number,
-            session_id=payment.session_id,
-            transaction_id=transaction_id,
-        )
-        commit_res = await osp_commit(
-            payment.reference_number, payment.session_id, transaction_id
+    finished = await wait_for_saga(payment.id, settings.PAYMENT_CONFIRM_WAIT_SECONDS)
+    if finished is None:
+        return _processing_response(request, payment_id, saga)
+
+    if finished.status != SAGA_SUCCEEDED:
+        _log_payment_response(
+            "payments.confirm", user_id=user_id, response={"detail": finished.last_error}, failed=True
         )
-        logger.info(f"[OSP Commit Response] {commit_res}")
-
-        if commit_res.get("response_code") != 200:
-            logger.error(f"[OSP Commit Error] {commit_res}")    
-            raise HTTPException(status_code=400, detail="OSP commit failed")
-
-        # --- Convert CDC Datetime (UTC+7 and UTC) ---
-        cdc_dt_str = commit_res.get("cdc_transaction_datetime")
-        cdc_local = cdc_utc = None
-        if cdc_dt_str:
-            try:
-                cdc_local = datetime.strptime(cdc_dt_str, "%Y-%m-%d %H:%M:%S")
-                cdc_utc = (cdc_local - timedelta(hours=7)).replace(tzinfo=timezone.utc)
-            except Exception as e:
-                logger.warning(f"[CDC Time Parse Error] {cdc_dt_str}: {e}")
-
-        # --- Update DB (mark payment committed) ---
-        payment.acknowledgement_id = commit_res.get("acknowledgement_id")
-        payment.cdc_transaction_datetime = cdc_local
-        payment.cdc_transaction_datetime_utc = cdc_utc
-        payment.status = "committed"
-        db.commit()
-        db.refresh(payment)
-
-        # --- Record Transaction ---
-        debited_amount = _to_decimal(payment.total_amount).quantize(Decimal("0.01"))
-        debited_currency = payment.currency or account.currency or "USD"
-
-        tx = Transaction(
-            user_id=user_id,
-            account_id=account.id,
-            payment_id=payment.id,
-            reference_number=payment.reference_number,
-            amount=float(debited_amount),
-            currency=debited_currency,
-            direction="debit",
-            description=f"Payment to {payment.service.name if payment.service else ''}",
-            created_at=datetime.utcnow(),
+        # reversal_failed (left for reconciliation): same 500 as before
+        failed_status = (await db.execute(
+            select(Payment.status).filter_by(id=payment_id).execution_options(populate_existing=True)
+        )).scalar()
+        raise HTTPException(
+            status_code=500 if failed_status == "reversal_failed" else 400,
+            detail=finished.last_error or "Payment failed",
         )
-        db.add(tx)
 
-        # Deduct from account balance
-        account.balance = (acct_balance - debited_amount).quantize(Decimal("0.01"))
-        db.commit()
-        db.refresh(tx)
+    response = await _load_confirm_out(db, payment_id, user_id)
+    _log_payment_response("payments.confirm", user_id=user_id, response=response)
+    return response
 
-        try:
-            tx.transaction_id = transaction_id
-            db.add(tx)
-            db.commit()
-            db.refresh(tx)
-        except Exception:
-            db.rollback()
-
-        # --- Confirm Payment with OSP --- (pre-OSP request log)
-        ack_id = payment.acknowledgement_id
-        _log_payment_request(
-            "payments.confirm.osp_confirm",
-            user_id=user_id,
-            payment_id=payment_id,
-            reference_number=payment.reference_number,
-            transaction_id=tx.transaction_id,
-            acknowledgement_id=ack_id,
-        )
-        confirm_res = await osp_confirm(
-            payment.reference_number, tx.transaction_id, ack_id
+
+# Batch Payment (one PIN check, one balance reservation, one saga per invoice)
+@router.post(
+    "/batch",
+    response_model=PaymentBatchOut,
+    dependencies=[
+        Depends(rate_limit_ip("payments_batch", settings.RATE_LIMIT_BATCH_PAY_PER_IP, _RL_WINDOW)),
+        Depends(rate_limit_user("payments_batch", settings.RATE_LIMIT_BATCH_PAY_PER_USER, _RL_WINDOW)),
+    ],
+)
+async def batch_payment(
+    body: PaymentBatchIn,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_user_id),
+):
+    """
+    Pay many invoices of one service from one account.
+
+    The PIN is verified once and invoices are looked up concurrently. The
+    total of all payable invoices is then debited with a single
+    conditional UPDATE (all or nothing: 400 if the balance does not cover
+    it), together with one payment, debit row and saga per invoice. The
+    sagas commit/confirm the invoices concurrently; an item OSP rejects is
+    reversed / refunded on its own. Items still running after
+    PAYMENT_CONFIRM_WAIT_SECONDS come back as `processing` with a
+    `status_url`.
+    """
+    reference_numbers = [ref.strip() for ref in body.reference_numbers]
+    if len(reference_numbers) > settings.PAYMENT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.PAYMENT_BATCH_MAX_ITEMS} invoices per batch",
         )
-        logger.info(f"[OSP Confirm Response] {confirm_res}")
 
-        if confirm_res.get("response_code") != 200:
-            raise HTTPException(status_code=400, detail="OSP confirm failed")
+    # PIN must be exactly 4 numeric digits
+    if not isinstance(body.pin, str) or not re.fullmatch(r"\d{4}", body.pin):
+        raise HTTPException(status_code=400, detail="PIN must be exactly 4 numeric digits")
 
-        # Mark as confirmed in DB
-        mark_confirmed(payment, db)
+    user = await db.get(User, user_id)
+    if not user or not getattr(user, "pin_hash", None):
+        raise HTTPException(status_code=401, detail="PIN not set for user")
+    account = (await db.execute(select(Account).filter_by(id=body.account_id, user_id=user_id))).scalars().first()
+    service = (await db.execute(select(Service).filter_by(id=body.service_id))).scalars().first()
+    if not account or not service:
+        raise HTTPException(status_code=404, detail="Account or service not found")
+    account_currency = (getattr(account, "currency", "USD") or "USD").upper()
+    # End the read transaction: no connection is held across bcrypt and the OSP lookups
+    await db.commit()
 
-        # --- Prepare local time for UI ---
-        local_cdc_time = to_local_time(payment.cdc_transaction_datetime)
+    if not await verify_password_async(body.pin, user.pin_hash):
+        raise HTTPException(status_code=402, detail="Invalid PIN")
 
-        response = PaymentConfirmOut(
-            status=payment.status,
-            transaction_id=tx.transaction_id or str(tx.id),
-            account_id=account.id,
-            reference_number=payment.reference_number,
-            customer_name=payment.customer_name,
-            invoice_amount=float(
-                _to_decimal(payment.amount).quantize(Decimal("0.01"))
-            ),
-            invoice_currency=payment.invoice_currency,
-            amount=float(debited_amount),
-            amount_debited=float(debited_amount),
-            fee=float(_to_decimal(payment.fee).quantize(Decimal("0.01"))),
-            total_amount=float(debited_amount),
-            currency=(payment.currency or payment.invoice_currency),
-            new_balance=float(account.balance),
-            cdc_transaction_datetime=payment.cdc_transaction_datetime.strftime(
-                "%Y-%m-%d %H:%M:%S"
+    _log_payment_request(
+        "payments.batch",
+        user_id=user_id,
+        account_id=account.id,
+        service_id=service.id,
+        count=len(reference_numbers),
+    )
+
+    items = [PaymentBatchItemOut(index=i, reference_number=ref, status="pending") for i, ref in enumerate(reference_numbers)]
+    to_lookup: List[PaymentBatchItemOut] = []
+    seen = set()
+    for item in items:
+        if item.reference_number in seen:
+            item.status, item.detail = "skipped", "Duplicate reference number in batch"
+        else:
+            seen.add(item.reference_number)
+            to_lookup.append(item)
+
+    semaphore = asyncio.Semaphore(max(1, settings.OSP_LOOKUP_BATCH_CONCURRENCY))
+    lookups = await asyncio.gather(*(_lookup_or_error(item.reference_number, semaphore) for item in to_lookup))
+
+    payable = []
+    for item, (status_code, osp_data) in zip(to_lookup, lookups):
+        if status_code != 200 or not osp_data or osp_data.get("response_code") != 200:
+            item.status = "lookup-failed"
+            item.detail = osp_data if status_code != 200 else "Invalid invoice from OSP"
+            continue
+        payable.append((item, osp_data, _quote_invoice(osp_data, account_currency)))
+
+    total_reserved = sum((quote[4] for _, _, quote in payable), Decimal("0.00"))
+    if payable:
+        # Check and debit in one statement: no concurrent debit can slip in between
+        try:
+            await debit_account(db, account.id, total_reserved)
+        except InsufficientBalance:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+
+        now = datetime.utcnow()
+        payments = []
+        for item, osp_data, (invoice_amount, invoice_currency, _, fee, total_debit) in payable:
+            payment = Payment(
+                user_id=user_id,
+                account_id=account.id,
+                service_id=service.id,
+                reference_number=item.reference_number,
+                customer_name=osp_data.get("customer_name"),
+                amount=float(invoice_amount.quantize(Decimal("0.01"))),
+                fee=float(fee.quantize(Decimal("0.01"))),
+                total_amount=float(total_debit),
+                currency=account_currency,
+                invoice_currency=invoice_currency,
+                session_id=osp_data.get("session_id") or str(uuid.uuid4()),
+                status="processing",
+                created_at=now,
             )
-            if payment.cdc_transaction_datetime
-            else None,
-            cdc_transaction_datetime_utc=payment.cdc_transaction_datetime_utc.strftime(
-                "%Y-%m-%d %H:%M:%S"
+            db.add(payment)
+            payments.append(payment)
+        await db.flush()
+
+        for (item, _, (_, _, _, _, total_debit)), payment in zip(payable, payments):
+            # Just looked up: start at commit. The debit row makes the saga's debit step a no-op.
+            saga = new_payment_saga(payment, step="commit")
+            db.add(saga)
+            db.add(
+                Transaction(
+                    transaction_id=saga.transaction_id,
+                    user_id=user_id,
+                    account_id=account.id,
+                    payment_id=payment.id,
+                    reference_number=payment.reference_number,
+                    amount=float(total_debit),
+                    currency=account_currency,
+                    direction="debit",
+                    description=f"Payment to {service.name}",
+                    created_at=now,
+                )
             )
-            if payment.cdc_transaction_datetime_utc
-            else None,
-            cdc_transaction_datetime_local=local_cdc_time,
-            service={
-                "id": payment.service.id if payment.service else None,
-                "name": payment.service.name if payment.service else None,
-                "logo_url": payment.service.logo_url if payment.service else None,
-            },
+            post_entry(
+                db, saga.transaction_id, account.id, -total_debit, OSP_CLEARING, account_currency, f"Payment to {service.name}"
+            )
+            item.payment_id, item.transaction_id, item.total_amount = payment.id, saga.transaction_id, total_debit
+    await db.commit()
+    wake_saga_workers()
+
+    payment_ids = [item.payment_id for item in items if item.payment_id]
+    if payment_ids:
+        finished = await wait_for_sagas(payment_ids, settings.PAYMENT_CONFIRM_WAIT_SECONDS)
+        statuses = dict(
+            (await db.execute(
+                select(Payment.id, Payment.status)
+                .where(Payment.id.in_(payment_ids))
+                .execution_options(populate_existing=True)
+            )).all()
         )
+        for item in items:
+            if not item.payment_id:
+                continue
+            saga = finished.get(item.payment_id)
+            if saga is None:
+                item.status = "processing"
+                item.status_url = request.url_for("payment_status", payment_id=item.payment_id).path
+                continue
+            item.status = statuses[item.payment_id]
+            if saga.status != SAGA_SUCCEEDED:
+                item.detail = saga.last_error
+
+    new_balance = (
+        await db.execute(select(Account.balance).filter_by(id=account.id).execution_options(populate_existing=True))
+    ).scalar()
+    confirmed = sum(1 for item in items if item.status == "confirmed")
+    processing = sum(1 for item in items if item.status == "processing")
+    response = PaymentBatchOut(
+        account_id=account.id,
+        currency=account_currency,
+        total_reserved=total_reserved,
+        new_balance=new_balance,
+        confirmed=confirmed,
+        processing=processing,
+        failed=len(items) - confirmed - processing,
+        items=items,
+    )
+    _log_payment_response("payments.batch", user_id=user_id, response=response)
+    return response
 
-        _log_payment_response("payments.confirm", user_id=user_id, response=response)
-        return response
 
-    except HTTPException as e:
-        # Mark payment as failed on expected OSP / business errors
-        db.rollback()
-        try:
-            p = db.query(Payment).filter_by(id=payment_id, user_id=user_id).first()
-            if p:
-                p.status = "failed"
-                db.commit()
-        except Exception:
-            db.rollback()
-        raise e
-    except Exception as e:
-        # Unexpected error: mark as failed and return 500
-        db.rollback()
-        try:
-            p = db.query(Payment).filter_by(id=payment_id, user_id=user_id).first()
-            if p:
-                p.status = "failed"
-                db.commit()
-        except Exception:
-            db.rollback()
-        logger.exception(f"Payment confirm failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Confirm failed: {e}")
+@router.get("/{payment_id}/status", response_model=PaymentStatusOut)
+async def payment_status(
+    payment_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_user_id),
+):
+    payment = (await db.execute(select(Payment).filter_by(id=payment_id, user_id=user_id))).scalars().first()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    saga = await get_payment_saga(db, payment.id)
+    result = None
+    if saga is not None and saga.status == SAGA_SUCCEEDED:
+        result = await _load_confirm_out(db, payment_id, user_id)
+    return PaymentStatusOut(
+        payment_id=payment.id,
+        status=payment.status,
+        step=saga.step if saga else None,
+        saga_status=saga.status if saga else None,
+        attempts=saga.attempts if saga else None,
+        next_run_at=saga.next_run_at if saga else None,
+        last_error=saga.last_error if saga else None,
+        result=result,
+    )
 
 
 # Reverse Payment
-@router.post("/{payment_id}/reverse")
+@router.post(
+    "/{payment_id}/reverse",
+    dependencies=[Depends(rate_limit_user("payments_reverse", settings.RATE_LIMIT_REVERSE_PER_USER, _RL_WINDOW))],
+)
 async def reverse_payment(
     payment_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     user_id: int = Depends(get_user_id),
 ):
-    payment = db.query(Payment).filter_by(id=payment_id, user_id=user_id).first()
+    """
+    Cancel a payment that was only started (its held funds are released),
+    or reverse a confirmed one: the saga's reverse step reverses it at OSP
+    and refunds the debit.
+    """
+    payment = (await db.execute(select(Payment).filter_by(id=payment_id, user_id=user_id))).scalars().first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
-
-    try:
-        # Pre-OSP request log
-        _log_payment_request(
-            "payments.reverse.osp_reverse",
-            user_id=user_id,
-            payment_id=payment_id,
-            reference_number=payment.reference_number,
-            session_id=payment.session_id,
+    if payment.status == "processing":
+        # The confirm saga owns the payment; it reverses by itself on failure
+        raise HTTPException(status_code=409, detail="Payment is still processing")
+
+    if payment.status == "started":
+        # Nothing reached OSP yet
+        canceled = await db.execute(
+            update(Payment)
+            .where(Payment.id == payment_id, Payment.status == "started")
+            .values(status="canceled")
+            .execution_options(synchronize_session=False)
         )
-        res = await osp_reverse(payment.reference_number, payment.session_id)
-        logger.info(f"[OSP Reverse Response] {res}")
-
-        payment.status = "reversed"
-        db.commit()
-
-        response = {"status": payment.status, "osp_response": res}
+        if canceled.rowcount != 1:
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Payment is still processing")
+        await release_hold(db, payment_id)
+        await db.commit()
+        # Core UPDATE: not seen by the Payment.status listener
+        PAYMENT_TRANSITIONS.inc("started", "canceled")
+        response = {"status": "canceled", "osp_response": None}
         _log_payment_response("payments.reverse", user_id=user_id, response=response)
         return response
 
-    except Exception as e:
-        db.rollback()
-        logger.exception(f"Reverse failed: {e}")
-        payment = db.query(Payment).filter_by(id=payment_id, user_id=user_id).first()
-        if payment:
-            payment.status = "failed"
-            db.commit()
-        raise HTTPException(status_code=500, detail=str(e))
+    saga = await get_payment_saga(db, payment_id)
+    if payment.status != "confirmed" or saga is None:
+        raise HTTPException(status_code=409, detail=f"Payment cannot be reversed ({payment.status})")
+
+    _log_payment_request(
+        "payments.reverse",
+        user_id=user_id,
+        payment_id=payment_id,
+        reference_number=payment.reference_number,
+        transaction_id=saga.transaction_id,
+    )
+    if not await resume_payment_saga(db, payment_id, "confirmed", "reverse", saga.transaction_id):
+        raise HTTPException(status_code=409, detail="Payment is still processing")
+
+    finished = await wait_for_saga(payment_id, settings.PAYMENT_CONFIRM_WAIT_SECONDS)
+    if finished is None:
+        return _processing_response(request, payment_id, await get_payment_saga(db, payment_id))
+    payment = (
+        await db.execute(select(Payment).filter_by(id=payment_id).execution_options(populate_existing=True))
+    ).scalars().first()
+    if payment.status != "reversed":
+        _log_payment_response(
+            "payments.reverse", user_id=user_id, response={"detail": finished.last_error}, failed=True
+        )
+        # reversal_failed: left for reconciliation
+        raise HTTPException(status_code=500, detail=finished.last_error or "Reversal failed")
+
+    response = {
+        "status": payment.status,
+        "osp_response": {
+            "reversal_transaction_id": payment.reversal_transaction_id,
+            "reversal_acknowledgement_id": payment.reversal_acknowledgement_id,
+        },
+    }
+    _log_payment_response("payments.reverse", user_id=user_id, response=response)
+    return response
@@ -1,9 +1,15 @@
 # backend/api/routes/transactions.py
+from typing import Optional
+
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from api.deps import get_db
+from api.deps import get_async_db
 from core.permissions import get_current_user
+from core.utils.pagination import TOTAL_MODE_PATTERN, keyset_after, next_cursor_for
+from db.queries import user_transactions
 from models.transaction import Transaction
 from models.payment import Payment
 from models.service import Service
@@ -14,25 +20,33 @@ router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
 
 @router.get("/", response_model=PaginatedTransactions)
-def list_transactions(
+async def list_transactions(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (overrides page)"),
+    total: str = Query("exact", pattern=TOTAL_MODE_PATTERN, description="exact | approx | none"),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
-    q = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == user.id)
-        .order_by(Transaction.created_at.desc())
-        .join(Payment, Transaction.payment_id == Payment.id, isouter=True)
-        .join(Service, Payment.service_id == Service.id, isouter=True)
-    )
+    """
+    Newest first. Keyset pagination on (created_at, id) via `cursor`;
+    `page` (OFFSET) is kept for older clients.
+    """
+    q = user_transactions(user.id).options(joinedload(Transaction.payment).joinedload(Payment.service))
+    if cursor:
+        q = q.filter(keyset_after(Transaction.created_at, Transaction.id, cursor, descending=True))
+    else:
+        q = q.offset((page - 1) * page_size)
 
-    total = q.count()
-    items_orm = (
-        q.offset((page - 1) * page_size)
-         .limit(page_size)
-         .all()
+    # Per-user count is served by ix_transactions_user_created; approx == exact here
+    total_count = None
+    if total != "none":
+        total_count = await db.scalar(
+            select(func.count()).select_from(Transaction).filter(Transaction.user_id == user.id)
+        )
+    items_orm, next_cursor = next_cursor_for(
+        list((await db.execute(q.limit(page_size + 1))).scalars().all()),
+        page_size,
     )
 
     items: list[TransactionOut] = []
@@ -58,24 +72,27 @@ def list_transactions(
 
     return PaginatedTransactions(
         items=items,
-        total=total,
+        total=total_count,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/{transaction_id}", response_model=TransactionOut)
-def get_transaction(
+async def get_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: User = Depends(get_current_user),
 ):
     """Get a single transaction, with payment + service details if available."""
     tx = (
-        db.query(Transaction)
-        .filter_by(id=transaction_id, user_id=user.id)
-        .first()
-    )
+        await db.execute(
+            select(Transaction)
+            .filter_by(id=transaction_id, user_id=user.id)
+            .options(joinedload(Transaction.payment).joinedload(Payment.service))
+        )
+    ).scalars().first()
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
@@ -0,0 +1,77 @@
+# backend/benchmarks/__init__.py
+"""
+Benchmarks of the hot paths. Run from backend/, one module at a time:
+
+    python -m benchmarks.event_loop_lag       sync vs async session on the event loop
+    python -m benchmarks.jwt_verify           decode_token with and without the token cache
+    python -m benchmarks.pagination           OFFSET vs cursor pages, exact vs approx totals
+    python -m benchmarks.logging_pipeline     five loguru sinks vs the batched writer
+    python -m core.utils.txid                 transaction id generator
+
+Settings are read once at import time, so the environment is pointed at
+a throwaway SQLite database and log directory here, before any benchmark
+imports the app modules. Numbers are only comparable within one run.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+TMP = tempfile.mkdtemp(prefix="dummybank-bench-")
+# the seeded databases run to hundreds of MB
+atexit.register(shutil.rmtree, TMP, ignore_errors=True)
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{TMP}/bench.db",
+    LOG_PATH=f"{TMP}/logs",
+    LOG_CONSOLE="false",
+    METRICS_MULTIPROC_DIR="",
+    TRACE_SAMPLE_RATE="0",
+)
+for _name, _value in {
+    "SECRET_KEY": "bench-secret",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "CORS_ORIGINS": "*",
+    "OSP_BASE_URL": "http://127.0.0.1:9",
+    "OSP_AUTH": "bench",
+    "OSP_PARTNER": "BENCH",
+    "API_VERSION": "v1.0.0",
+    "API_TITLE": "Dummy Bank API",
+    "API_DESCRIPTION": "benchmarks",
+    "API_CONTACT_NAME": "benchmarks",
+    "API_CONTACT_EMAIL": "bench@example.com",
+    "LOG_LEVEL": "INFO",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+
+def percentile(samples: list, q: float) -> float:
+    """q-th percentile (0-100) of unsorted samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def seed_transactions(rows: int, users: int = 10) -> None:
+    """Create the schema and `rows` transactions spread over `users`, one second apart."""
+    from datetime import datetime, timedelta
+
+    from db.base import Base
+    from db.session import engine
+    import models
+    from models import Transaction
+
+    Base.metadata.create_all(engine)
+    start = datetime(2024, 1, 1)
+    chunk = 100_000
+    with engine.begin() as conn:
+        for first in range(0, rows, chunk):
+            conn.execute(
+                Transaction.__table__.insert(),
+                [
+                    dict(
+                        user_id=1 + i % users, account_id=1, reference_number=f"BENCH-{i}", amount=1,
+                        currency="USD", direction="debit", created_at=start + timedelta(seconds=i),
+                    )
+                    for i in range(first, min(rows, first + chunk))
+                ],
+            )
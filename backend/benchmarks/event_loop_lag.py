@@ -0,0 +1,109 @@
+# backend/benchmarks/event_loop_lag.py
+"""
+Event-loop lag while concurrent requests run the /transactions queries
+(per-user count + one page) through the sync Session on the loop, as the
+routes did before the async port, and through the AsyncSession they use
+now. A ticker task sleeps 1ms in a loop; how late it wakes up is the lag
+every other request on the worker sees.
+
+    python -m benchmarks.event_loop_lag [rows] [concurrency] [requests]
+                                        (default 200,000 rows, 20 concurrent, 400 requests)
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks import percentile, seed_transactions
+
+TICK = 0.001
+
+
+def _queries(user_id: int):
+    from sqlalchemy import func, select
+
+    from models import Transaction
+
+    count = select(func.count()).select_from(Transaction).filter(Transaction.user_id == user_id)
+    page = (
+        select(Transaction)
+        .filter(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        .offset(2000)
+        .limit(21)
+    )
+    return count, page
+
+
+async def _sync_request(user_id: int) -> None:
+    from db.session import SessionLocal
+
+    count, page = _queries(user_id)
+    with SessionLocal() as db:
+        db.execute(count).scalar()
+        db.execute(page).scalars().all()
+
+
+async def _async_request(user_id: int) -> None:
+    from db.session import AsyncSessionLocal
+
+    count, page = _queries(user_id)
+    async with AsyncSessionLocal() as db:
+        await db.scalar(count)
+        (await db.execute(page)).scalars().all()
+
+
+async def _measure(request, concurrency: int, total: int) -> dict:
+    lags, latencies = [], []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started - TICK)
+
+    queue = asyncio.Queue()
+    for n in range(total):
+        queue.put_nowait(1 + n % 10)
+
+    async def client():
+        while not queue.empty():
+            user_id = queue.get_nowait()
+            started = time.perf_counter()
+            await request(user_id)
+            latencies.append(time.perf_counter() - started)
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return {
+        "req/s": total / elapsed,
+        "lag p50 ms": percentile(lags, 50) * 1000,
+        "lag p99 ms": percentile(lags, 99) * 1000,
+        "lag max ms": max(lags) * 1000,
+        "latency p99 ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def main(rows: int, concurrency: int, total: int) -> None:
+    seed_transactions(rows)
+    from db.session import async_engine
+
+    for label, request in (("sync Session (before)", _sync_request), ("AsyncSession (now)", _async_request)):
+        await request(1)  # connect / warm up
+        result = await _measure(request, concurrency, total)
+        print(f"{label:<22} " + "   ".join(f"{k} {v:8.1f}" for k, v in result.items()))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+            int(sys.argv[3]) if len(sys.argv) > 3 else 400,
+        )
+    )
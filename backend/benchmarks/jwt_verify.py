@@ -0,0 +1,54 @@
+# backend/benchmarks/jwt_verify.py
+"""
+Tokens verified per second by core.security.decode_token: cache hits
+(the same token on every request of a session), misses (every token new),
+and plain python-jose / PyJWT (if installed) HS256 verification.
+
+    python -m benchmarks.jwt_verify [count]     (default 50,000)
+"""
+import sys
+import time
+
+import benchmarks  # noqa: F401  (settings environment)
+
+
+def _rate(label: str, count: int, run) -> None:
+    started = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - started
+    print(f"{label:<32} {count / seconds:>12,.0f} tokens/s")
+
+
+def main(count: int) -> None:
+    from jose import jwt as jose_jwt
+
+    from core import security
+    from core.config import settings
+
+    token = security.create_token(1)
+    fresh = [security.create_token(n) for n in range(1, count + 1)]
+
+    security._token_cache.clear()
+    _rate("decode_token, cache hit", count, lambda: [security.decode_token(token) for _ in range(count)])
+    security._token_cache.clear()
+    _rate("decode_token, cache miss", count, lambda: [security.decode_token(t) for t in fresh])
+    _rate(
+        "python-jose decode",
+        count,
+        lambda: [jose_jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGO]) for _ in range(count)],
+    )
+    try:
+        import jwt as pyjwt
+    except ImportError:
+        print("PyJWT not installed: skipped")
+    else:
+        _rate(
+            "PyJWT decode",
+            count,
+            lambda: [pyjwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGO]) for _ in range(count)],
+        )
+    print(f"cache: {security.get_token_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
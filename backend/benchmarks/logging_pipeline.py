@@ -0,0 +1,103 @@
+# backend/benchmarks/logging_pipeline.py
+"""
+Log records per second and their cost on the caller: the five synchronous
+loguru sinks setup_logging used to register (console, app.log, error.log
+and the two daily archives) against the batched JSON-lines writer.
+
+    python -m benchmarks.logging_pipeline [records]     (default 50,000)
+
+The console goes to /dev/null in the old setup and is off in the new one,
+so neither measures a terminal.
+"""
+import os
+import sys
+import time
+
+from benchmarks import TMP, percentile
+
+_OLD_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message} | extra={extra}"
+
+
+def _old_setup(log_dir: str):
+    from loguru import logger
+
+    logger.remove()
+    console = open(os.devnull, "w")
+    logger.add(console, level="INFO", format=_OLD_FORMAT)
+    for name, level, retention in (
+        ("app.log", "INFO", "30 days"),
+        ("error.log", "ERROR", "30 days"),
+        ("app_{time:YYYYMMDD}.log", "INFO", "90 days"),
+        ("error_{time:YYYYMMDD}.log", "ERROR", "90 days"),
+    ):
+        logger.add(os.path.join(log_dir, name), level=level, format=_OLD_FORMAT, rotation="00:00", retention=retention)
+
+    def stop():
+        logger.remove()
+        console.close()
+
+    return stop
+
+
+def _new_setup(log_dir: str):
+    from core import logging as app_logging
+    from core.config import settings
+
+    settings.LOG_PATH = log_dir
+    app_logging.setup_logging()
+    return app_logging.shutdown_logging
+
+
+def _records(records: int) -> dict:
+    from loguru import logger
+
+    per_call = []
+    started = time.perf_counter()
+    for i in range(records):
+        t = time.perf_counter()
+        logger.bind(endpoint="payments.confirm", user_id=i, params={"reference_number": f"R{i}", "amount": "10.00"}).info(
+            "[PAYMENT][REQUEST] confirm | module=api.routes.payments"
+        )
+        per_call.append(time.perf_counter() - t)
+    return {"caller": records / (time.perf_counter() - started), "per_call": per_call}
+
+
+def _requests(count: int) -> list:
+    """A request doing some CPU work and five log calls, spaced out like real traffic."""
+    from loguru import logger
+
+    latencies = []
+    for i in range(count):
+        t = time.perf_counter()
+        sum(range(3000))
+        for step in range(5):
+            logger.bind(endpoint="payments.confirm", user_id=i, step=step).info("[PAYMENT] step | module=api.routes.payments")
+        latencies.append(time.perf_counter() - t)
+        time.sleep(0.0005)
+    return latencies
+
+
+def main(records: int) -> None:
+    for label, setup in (("five sinks (before)", _old_setup), ("batched writer (now)", _new_setup)):
+        log_dir = os.path.join(TMP, label.split()[0])
+        os.makedirs(log_dir, exist_ok=True)
+        stop = setup(log_dir)
+        started = time.perf_counter()
+        result = _records(records)
+        stop()  # includes flushing what the writer still buffers
+        end_to_end = records / (time.perf_counter() - started)
+
+        stop = setup(log_dir)
+        latencies = _requests(records // 10)
+        stop()
+
+        per_call = result["per_call"]
+        print(
+            f"{label:<21} caller {result['caller']:>9,.0f} rec/s   end-to-end {end_to_end:>9,.0f} rec/s   "
+            f"per call p50 {percentile(per_call, 50) * 1e6:6.1f}us p99 {percentile(per_call, 99) * 1e6:7.1f}us   "
+            f"request p50 {percentile(latencies, 50) * 1e6:6.0f}us p99 {percentile(latencies, 99) * 1e6:6.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
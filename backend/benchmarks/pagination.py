@@ -0,0 +1,71 @@
+# backend/benchmarks/pagination.py
+"""
+OFFSET vs keyset (cursor) pages of one user's transactions, newest first
+(the /transactions query), and exact vs approximate totals.
+
+    python -m benchmarks.pagination [rows] [users]     (default 1,000,000 rows, 10 users)
+"""
+import sys
+import time
+
+from benchmarks import seed_transactions
+
+PAGE_SIZE = 20
+
+
+def _best_ms(run, repeat: int = 3):
+    """(result, best wall time in ms) of `repeat` runs: the first one warms the page cache."""
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = run()
+        elapsed = (time.perf_counter() - t) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(rows: int, users: int) -> None:
+    started = time.perf_counter()
+    seed_transactions(rows, users)
+    print(f"seeded {rows:,} transactions for {users} users in {time.perf_counter() - started:.1f}s")
+
+    from sqlalchemy import func, select
+
+    from core.utils.pagination import approximate_row_count, encode_cursor, keyset_after
+    from db.session import SessionLocal
+    from models import Transaction
+
+    query = (
+        select(Transaction)
+        .filter(Transaction.user_id == 3)
+        .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+    )
+    pages = rows // users // PAGE_SIZE
+    with SessionLocal() as db:
+        for page in sorted({1, pages // 10, pages // 2, pages - 1} - {0}):
+            offset_query = query.offset((page - 1) * PAGE_SIZE).limit(PAGE_SIZE + 1)
+            offset_rows, offset_ms = _best_ms(lambda: db.execute(offset_query).scalars().all())
+
+            # the cursor a client holds when asking for this page
+            previous = db.execute(query.offset((page - 1) * PAGE_SIZE - 1).limit(1)).scalar() if page > 1 else None
+            cursor_query = query.limit(PAGE_SIZE + 1)
+            if previous is not None:
+                cursor = encode_cursor(previous.created_at, previous.id)
+                cursor_query = cursor_query.filter(
+                    keyset_after(Transaction.created_at, Transaction.id, cursor, descending=True)
+                )
+            cursor_rows, cursor_ms = _best_ms(lambda: db.execute(cursor_query).scalars().all())
+
+            assert [r.id for r in offset_rows] == [r.id for r in cursor_rows]
+            print(f"page {page:>6}: offset {offset_ms:7.2f}ms   cursor {cursor_ms:7.2f}ms")
+
+        _, exact_ms = _best_ms(lambda: db.execute(select(func.count()).select_from(Transaction)).scalar())
+        _, approx_ms = _best_ms(lambda: approximate_row_count(db, Transaction))
+        print(f"total: exact {exact_ms:.2f}ms   approx {approx_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
@@ -16,10 +16,110 @@ class Settings(BaseSettings):
     OSP_AUTH                        : str = config('OSP_AUTH', cast=str)
     OSP_PARTNER                     : str = config('OSP_PARTNER', cast=str, default='')
     OSP_TIMEOUT                     : int = config('OSP_TIMEOUT', cast=int, default=30)
+    OSP_MAX_CONNECTIONS             : int = config('OSP_MAX_CONNECTIONS', cast=int, default=20)
+    OSP_MAX_KEEPALIVE_CONNECTIONS   : int = config('OSP_MAX_KEEPALIVE_CONNECTIONS', cast=int, default=10)
+    OSP_KEEPALIVE_EXPIRY            : float = config('OSP_KEEPALIVE_EXPIRY', cast=float, default=30.0)
+    OSP_HTTP2                       : bool = config('OSP_HTTP2', cast=lambda x: x.lower() == 'true', default='false')
+
+    # OSP circuit breaker (per endpoint) + adaptive timeouts
+    OSP_CB_FAILURE_RATE             : float = config('OSP_CB_FAILURE_RATE', cast=float, default=0.5)
+    OSP_CB_SLOW_CALL_SECONDS        : float = config('OSP_CB_SLOW_CALL_SECONDS', cast=float, default=10.0)
+    OSP_CB_MIN_CALLS                : int = config('OSP_CB_MIN_CALLS', cast=int, default=10)
+    OSP_CB_WINDOW_SIZE              : int = config('OSP_CB_WINDOW_SIZE', cast=int, default=100)
+    OSP_CB_OPEN_SECONDS             : float = config('OSP_CB_OPEN_SECONDS', cast=float, default=30.0)
+    OSP_CB_HALF_OPEN_PROBES         : int = config('OSP_CB_HALF_OPEN_PROBES', cast=int, default=1)
+    OSP_TIMEOUT_MIN                 : float = config('OSP_TIMEOUT_MIN', cast=float, default=2.0)
+    OSP_TIMEOUT_PERCENTILE          : float = config('OSP_TIMEOUT_PERCENTILE', cast=float, default=0.99)
+    OSP_TIMEOUT_MULTIPLIER          : float = config('OSP_TIMEOUT_MULTIPLIER', cast=float, default=3.0)
+
+    # OSP invoice lookup cache (0 disables)
+    OSP_LOOKUP_CACHE_TTL            : float = config('OSP_LOOKUP_CACHE_TTL', cast=float, default=30.0)
+    OSP_LOOKUP_CACHE_MAX_ENTRIES    : int = config('OSP_LOOKUP_CACHE_MAX_ENTRIES', cast=int, default=10000)
+    # POST /payments/lookup/batch: references per request, OSP lookups in flight per request
+    OSP_LOOKUP_BATCH_MAX_ITEMS      : int = config('OSP_LOOKUP_BATCH_MAX_ITEMS', cast=int, default=500)
+    OSP_LOOKUP_BATCH_CONCURRENCY    : int = config('OSP_LOOKUP_BATCH_CONCURRENCY', cast=int, default=10)
 
     FEE_AMOUNT                      : Decimal = config('FEE_AMOUNT', cast=Decimal)
     USD_TO_KHR_RATE                 : Decimal = config('USD_TO_KHR_RATE', cast=Decimal)
 
+    # bcrypt worker pool (PIN / password hashing off the event loop)
+    BCRYPT_POOL_SIZE                : int = config('BCRYPT_POOL_SIZE', cast=int, default=4)
+    BCRYPT_MAX_PENDING              : int = config('BCRYPT_MAX_PENDING', cast=int, default=64)
+
+    # Authenticated-user cache (core.permissions.get_current_user)
+    USER_CACHE_TTL                  : float = config('USER_CACHE_TTL', cast=float, default=60.0)
+    USER_CACHE_MAX_ENTRIES          : int = config('USER_CACHE_MAX_ENTRIES', cast=int, default=4096)
+
+    # Verified-JWT cache (core.security.decode_token); entries also expire at the token's exp
+    TOKEN_CACHE_TTL                 : float = config('TOKEN_CACHE_TTL', cast=float, default=300.0)
+    TOKEN_CACHE_MAX_ENTRIES         : int = config('TOKEN_CACHE_MAX_ENTRIES', cast=int, default=10000)
+
+    # Rate limiter store: memory (per worker) | sqlite (shared per host) | redis (shared, needs `redis`)
+    RATE_LIMIT_BACKEND              : str = config('RATE_LIMIT_BACKEND', cast=str, default='memory')
+    RATE_LIMIT_SQLITE_PATH          : str = config('RATE_LIMIT_SQLITE_PATH', cast=str, default='./rate_limit.db')
+    RATE_LIMIT_REDIS_URL            : str = config('RATE_LIMIT_REDIS_URL', cast=str, default='')
+    RATE_LIMIT_MAX_KEYS             : int = config('RATE_LIMIT_MAX_KEYS', cast=int, default=100000)
+    RATE_LIMIT_EVICT_INTERVAL       : float = config('RATE_LIMIT_EVICT_INTERVAL', cast=float, default=60.0)
+
+    # Payment route quotas per RATE_LIMIT_PAYMENT_WINDOW seconds (0 disables that limit)
+    RATE_LIMIT_PAYMENT_WINDOW       : int = config('RATE_LIMIT_PAYMENT_WINDOW', cast=int, default=60)
+    RATE_LIMIT_LOOKUP_PER_IP        : int = config('RATE_LIMIT_LOOKUP_PER_IP', cast=int, default=30)
+    RATE_LIMIT_BULK_LOOKUP_PER_USER : int = config('RATE_LIMIT_BULK_LOOKUP_PER_USER', cast=int, default=10)
+    RATE_LIMIT_START_PER_IP         : int = config('RATE_LIMIT_START_PER_IP', cast=int, default=60)
+    RATE_LIMIT_START_PER_USER       : int = config('RATE_LIMIT_START_PER_USER', cast=int, default=20)
+    RATE_LIMIT_CONFIRM_PER_IP       : int = config('RATE_LIMIT_CONFIRM_PER_IP', cast=int, default=30)
+    RATE_LIMIT_CONFIRM_PER_USER     : int = config('RATE_LIMIT_CONFIRM_PER_USER', cast=int, default=10)
+    RATE_LIMIT_REVERSE_PER_USER     : int = config('RATE_LIMIT_REVERSE_PER_USER', cast=int, default=5)
+    RATE_LIMIT_BATCH_PAY_PER_IP     : int = config('RATE_LIMIT_BATCH_PAY_PER_IP', cast=int, default=10)
+    RATE_LIMIT_BATCH_PAY_PER_USER   : int = config('RATE_LIMIT_BATCH_PAY_PER_USER', cast=int, default=5)
+
+    # /metrics: shared dir for per-worker snapshots when running several workers ('' = single process)
+    METRICS_MULTIPROC_DIR           : str = config('METRICS_MULTIPROC_DIR', cast=str, default='')
+    METRICS_FLUSH_INTERVAL          : float = config('METRICS_FLUSH_INTERVAL', cast=float, default=5.0)
+
+    # Tracing: share of requests whose spans go to LOG_PATH/traces.log (0 = request ids only)
+    TRACE_SAMPLE_RATE               : float = config('TRACE_SAMPLE_RATE', cast=float, default=1.0)
+    TRACE_BUFFER_SIZE               : int = config('TRACE_BUFFER_SIZE', cast=int, default=50000)
+    TRACE_FLUSH_INTERVAL            : float = config('TRACE_FLUSH_INTERVAL', cast=float, default=1.0)
+
+    # Payment saga workers (confirm flow runs in the background, see services/payment_saga.py)
+    PAYMENT_SAGA_WORKERS            : int = config('PAYMENT_SAGA_WORKERS', cast=int, default=16)
+    PAYMENT_SAGA_MAX_ATTEMPTS       : int = config('PAYMENT_SAGA_MAX_ATTEMPTS', cast=int, default=5)
+    PAYMENT_SAGA_BACKOFF_BASE       : float = config('PAYMENT_SAGA_BACKOFF_BASE', cast=float, default=1.0)
+    PAYMENT_SAGA_BACKOFF_MAX        : float = config('PAYMENT_SAGA_BACKOFF_MAX', cast=float, default=60.0)
+    PAYMENT_SAGA_LEASE_SECONDS      : float = config('PAYMENT_SAGA_LEASE_SECONDS', cast=float, default=120.0)
+    PAYMENT_SAGA_POLL_INTERVAL      : float = config('PAYMENT_SAGA_POLL_INTERVAL', cast=float, default=1.0)
+    # How long POST /payments/{id}/confirm waits for the saga before answering 202 (0 = never wait)
+    PAYMENT_CONFIRM_WAIT_SECONDS    : float = config('PAYMENT_CONFIRM_WAIT_SECONDS', cast=float, default=10.0)
+    # Funds held by POST /payments/start are released if the payment is not confirmed within this (seconds)
+    PAYMENT_HOLD_TTL                : float = config('PAYMENT_HOLD_TTL', cast=float, default=900.0)
+    # POST /payments/batch: invoices per request
+    PAYMENT_BATCH_MAX_ITEMS         : int = config('PAYMENT_BATCH_MAX_ITEMS', cast=int, default=200)
+    # Node part (0-999) of generated transaction ids, unique per host/container; required unless DEBUG (-1 = derived from the hostname)
+    TXID_NODE_ID                    : int = config('TXID_NODE_ID', cast=int, default=-1)
+
+    # Reconciliation of stuck payments (committed / failed / reversal_failed, see services/reconciliation.py)
+    RECONCILE_INTERVAL              : float = config('RECONCILE_INTERVAL', cast=float, default=300.0)
+    RECONCILE_MIN_AGE               : float = config('RECONCILE_MIN_AGE', cast=float, default=600.0)
+    RECONCILE_BATCH_SIZE            : int = config('RECONCILE_BATCH_SIZE', cast=int, default=100)
+    RECONCILE_CONCURRENCY           : int = config('RECONCILE_CONCURRENCY', cast=int, default=8)
+
+    # Idempotency-Key (core/idempotency.py): how long a response is replayed, how long a duplicate waits for
+    # the original still running, after how long a running request's key may be taken over (crashed worker),
+    # and the largest response body stored
+    IDEMPOTENCY_TTL                 : float = config('IDEMPOTENCY_TTL', cast=float, default=86400.0)
+    IDEMPOTENCY_WAIT_SECONDS        : float = config('IDEMPOTENCY_WAIT_SECONDS', cast=float, default=15.0)
+    IDEMPOTENCY_LOCK_SECONDS        : float = config('IDEMPOTENCY_LOCK_SECONDS', cast=float, default=60.0)
+    IDEMPOTENCY_MAX_BODY_BYTES      : int = config('IDEMPOTENCY_MAX_BODY_BYTES', cast=int, default=262144)
+
+    # Ledger balance snapshots (services/ledger.py): compaction interval (0 disables) and the age postings
+    # need before a snapshot covers them (longer than any write transaction)
+    LEDGER_SNAPSHOT_INTERVAL        : float = config('LEDGER_SNAPSHOT_INTERVAL', cast=float, default=3600.0)
+    LEDGER_SNAPSHOT_LAG             : float = config('LEDGER_SNAPSHOT_LAG', cast=float, default=60.0)
+
+    # Admin account/balance edits re-applied this many times when the row changed underneath them (then 409)
+    ACCOUNT_UPDATE_RETRIES          : int = config('ACCOUNT_UPDATE_RETRIES', cast=int, default=3)
+
     API_VERSION: str = config('API_VERSION', cast=str)
     API_TITLE: str = config('API_TITLE', cast=str)
     API_DESCRIPTION: str = config('API_DESCRIPTION', cast=str)
@@ -29,5 +129,14 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = config('LOG_LEVEL', cast=str)
     LOG_PATH: str = config('LOG_PATH', cast=str, default='./logs')
     SINGLE_PROCESS: int = config('SINGLE_PROCESS', cast=int, default=1)
+    # Background log writer: ring buffer size, records per write, flush period, archive retention
+    LOG_BUFFER_SIZE                 : int = config('LOG_BUFFER_SIZE', cast=int, default=20000)
+    LOG_BATCH_SIZE                  : int = config('LOG_BATCH_SIZE', cast=int, default=1000)
+    LOG_FLUSH_INTERVAL              : float = config('LOG_FLUSH_INTERVAL', cast=float, default=0.2)
+    LOG_RETENTION_DAYS              : int = config('LOG_RETENTION_DAYS', cast=int, default=90)
+    LOG_CONSOLE                     : bool = config('LOG_CONSOLE', cast=lambda x: x.lower() == 'true', default='true')
+    # Payment/OSP request logging: share of successful requests logged (failures always are), body size cap
+    LOG_PAYMENT_SAMPLE_RATE         : float = config('LOG_PAYMENT_SAMPLE_RATE', cast=float, default=1.0)
+    LOG_BODY_MAX_CHARS              : int = config('LOG_BODY_MAX_CHARS', cast=int, default=2000)
 
 settings = Settings()
@@ -0,0 +1,308 @@
+# backend/core/idempotency.py
+"""
+Idempotency-Key support for POST/PUT/PATCH/DELETE requests.
+
+A client retrying e.g. POST /payments/{id}/confirm after a timeout sends
+the same Idempotency-Key header again: the first request runs, retries
+get its stored response (marked `Idempotent-Replayed: true`) instead of
+paying for the OSP commit/confirm sequence twice.
+
+    key           sha256(Authorization, key): keys are scoped per caller
+    fingerprint   sha256(method, path, query, body): reusing a key for a
+                  different request is answered 422
+    row           idempotency_keys: `pending` while the first request
+                  runs, `done` with status/headers/body afterwards,
+                  replayed until IDEMPOTENCY_TTL
+
+Duplicates arriving while the first request is still running are
+coalesced instead of run in parallel: in this process they await the
+same future, across processes they poll the row, for up to
+IDEMPOTENCY_WAIT_SECONDS (then 409). Only final answers up to
+IDEMPOTENCY_MAX_BODY_BYTES are stored (2xx and 4xx but the non-final
+ones in _RETRYABLE_STATUSES); a 5xx, a non-final answer or an exception
+drops the key so a retry runs again. A `pending` row whose worker died is taken
+over after IDEMPOTENCY_LOCK_SECONDS. Expired rows are purged lazily, at
+most once a minute per process.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
+from core.metrics import IDEMPOTENCY_REQUESTS
+from db.session import AsyncSessionLocal
+from models import IdempotencyKey
+
+# (status, [[header, value], ...], body)
+Stored = Tuple[int, List[List[str]], bytes]
+
+PENDING = "pending"
+DONE = "done"
+
+_UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+_MAX_KEY_LENGTH = 255
+_PURGE_INTERVAL = 60.0
+# "try again later" answers: replaying them for IDEMPOTENCY_TTL would turn them into final ones
+# (accepted / still processing, timeout, conflict, PIN locked, too early, rate limited)
+_RETRYABLE_STATUSES = {202, 408, 409, 423, 425, 429}
+
+# key hash -> (fingerprint, stored response) of the request running in this process; None if nothing was stored
+_inflight: Dict[str, "asyncio.Future[Optional[Tuple[str, Stored]]]"] = {}
+_last_purge = 0.0
+
+
+def _sha256(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _error(status: int, detail: str) -> Stored:
+    body = json.dumps({"detail": detail}).encode()
+    return status, [["content-type", "application/json"], ["content-length", str(len(body))]], body
+
+
+_MISMATCH = _error(422, "Idempotency-Key was already used for a different request")
+_IN_PROGRESS = _error(409, "A request with this Idempotency-Key is still in progress, retry later")
+
+
+async def _send_stored(send, stored: Stored, replayed: bool = False) -> None:
+    status, headers, body = stored
+    raw = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+    if replayed:
+        raw.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def _row_stored(row: IdempotencyKey) -> Stored:
+    return row.response_status, json.loads(row.response_headers or "[]"), row.response_body or b""
+
+
+async def _claim(key_hash: str, fingerprint: str) -> Tuple[bool, Optional[IdempotencyKey]]:
+    """(True, None) if this request owns the key now, else (False, the existing row or None if it just vanished)."""
+    global _last_purge
+    now = datetime.utcnow()
+    lock_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    async with AsyncSessionLocal() as db:
+        if time.monotonic() - _last_purge > _PURGE_INTERVAL:
+            _last_purge = time.monotonic()
+            await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+        db.add(
+            IdempotencyKey(
+                key_hash=key_hash, fingerprint=fingerprint, status=PENDING, created_at=now, expires_at=lock_until
+            )
+        )
+        try:
+            await db.commit()
+            return True, None
+        except IntegrityError:
+            await db.rollback()
+        # Expired: a replay window that ended, or the lock of a worker that died mid-request
+        taken = await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.expires_at < now)
+            .values(
+                fingerprint=fingerprint,
+                status=PENDING,
+                response_status=None,
+                response_headers=None,
+                response_body=None,
+                created_at=now,
+                expires_at=lock_until,
+            )
+        )
+        await db.commit()
+        if taken.rowcount == 1:
+            return True, None
+        return False, await db.get(IdempotencyKey, key_hash)
+
+
+async def _store(key_hash: str, stored: Stored) -> None:
+    status, headers, body = stored
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status == PENDING)
+            .values(
+                status=DONE,
+                response_status=status,
+                response_headers=json.dumps(headers),
+                response_body=body,
+                expires_at=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+            )
+        )
+        await db.commit()
+
+
+async def _forget(key_hash: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key_hash == key_hash, IdempotencyKey.status == PENDING)
+        )
+        await db.commit()
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware: stores and replays responses of unsafe requests
+    carrying an Idempotency-Key header (requests without one pass through).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") not in _UNSAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or ())
+        key = headers.get(b"idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        key = key.strip()
+        if not key or len(key) > _MAX_KEY_LENGTH:
+            IDEMPOTENCY_REQUESTS.inc("invalid")
+            await _send_stored(send, _error(400, f"Idempotency-Key must be 1-{_MAX_KEY_LENGTH} characters"))
+            return
+
+        body = await _read_body(receive)
+        key_hash = _sha256(headers.get(b"authorization", b""), key)
+        fingerprint = _sha256(
+            scope["method"].encode(), scope.get("path", "").encode(), scope.get("query_string", b""), body
+        )
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            leader = _inflight.get(key_hash)
+            if leader is None:
+                break
+            # The same key is running in this process: share its outcome
+            try:
+                result = await asyncio.wait_for(asyncio.shield(leader), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                IDEMPOTENCY_REQUESTS.inc("in_progress")
+                await _send_stored(send, _IN_PROGRESS)
+                return
+            if result is None:
+                # nothing stored (5xx / error): this request runs itself
+                continue
+            if result[0] != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc("mismatch")
+                await _send_stored(send, _MISMATCH)
+                return
+            IDEMPOTENCY_REQUESTS.inc("coalesced")
+            await _send_stored(send, result[1], replayed=True)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key_hash] = future
+        result = None
+        try:
+            result = await self._lead(scope, receive, send, body, key_hash, fingerprint, deadline)
+        finally:
+            _inflight.pop(key_hash, None)
+            future.set_result(result)
+
+    async def _lead(self, scope, receive, send, body, key_hash, fingerprint, deadline) -> Optional[Tuple[str, Stored]]:
+        delay = 0.05
+        while True:
+            claimed, row = await _claim(key_hash, fingerprint)
+            if claimed:
+                break
+            if row is not None and row.fingerprint != fingerprint:
+                IDEMPOTENCY_REQUESTS.inc("mismatch")
+                await _send_stored(send, _MISMATCH)
+                return None
+            if row is not None and row.status == DONE:
+                stored = _row_stored(row)
+                IDEMPOTENCY_REQUESTS.inc("replayed")
+                await _send_stored(send, stored, replayed=True)
+                return fingerprint, stored
+            # running in another process (or just finished without storing): poll
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                IDEMPOTENCY_REQUESTS.inc("in_progress")
+                await _send_stored(send, _IN_PROGRESS)
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+        try:
+            stored = await self._run(scope, receive, send, body)
+        except Exception:
+            await _forget(key_hash)
+            raise
+        if stored is None:
+            await _forget(key_hash)
+            IDEMPOTENCY_REQUESTS.inc("not_stored")
+            return None
+        await _store(key_hash, stored)
+        IDEMPOTENCY_REQUESTS.inc("stored")
+        return fingerprint, stored
+
+    async def _run(self, scope, receive, send, body: bytes) -> Optional[Stored]:
+        """Run the request (its body already read), streaming the response through; returns it if storable."""
+        body_sent = False
+        response = {"status": 500, "headers": [], "chunks": [], "size": 0}
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers") or ())
+            elif message["type"] == "http.response.body" and response["chunks"] is not None:
+                chunk = message.get("body", b"")
+                response["size"] += len(chunk)
+                if response["size"] > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+                    response["chunks"] = None
+                else:
+                    response["chunks"].append(chunk)
+            await send(message)
+
+        await self.app(scope, replay_receive, send_wrapper)
+        status = response["status"]
+        if status >= 500 or status in _RETRYABLE_STATUSES or response["chunks"] is None:
+            return None
+        headers = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in response["headers"]]
+        return response["status"], headers, b"".join(response["chunks"])
+
+
+async def get_idempotency_stats() -> dict:
+    """Keys running in this process and stored keys by status (database)."""
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(select(IdempotencyKey.status, func.count()).group_by(IdempotencyKey.status))
+        ).all()
+    return {
+        "inflight": len(_inflight),
+        "keys": {status: count for status, count in rows},
+        "ttl_seconds": settings.IDEMPOTENCY_TTL,
+    }
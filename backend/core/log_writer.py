@@ -0,0 +1,234 @@
+# backend/core/log_writer.py
+import glob
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, TextIO
+
+ERROR_LEVELNO = 40
+# Records serialised between GIL hand-offs, so request threads are not
+# held up for a whole switch interval while a large batch is encoded
+_YIELD_EVERY = 32
+
+
+def _record_to_dict(record: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "time": record["time"].isoformat(timespec="milliseconds"),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    if record["extra"]:
+        out["extra"] = record["extra"]
+    exc = record["exception"]
+    if exc is not None:
+        out["exception"] = "".join(traceback.format_exception(exc.type, exc.value, exc.traceback))
+    return out
+
+
+def _console_line(record: Dict[str, Any]) -> str:
+    # Same layout as core.logging.LOG_FORMAT
+    line = (
+        f"{record['time']:%Y-%m-%d %H:%M:%S}.{record['time'].microsecond // 1000:03d} | "
+        f"{record['level'].name: <8} | "
+        f"{record['name']}:{record['function']}:{record['line']} - "
+        f"{record['message']} | extra={record['extra']}\n"
+    )
+    exc = record["exception"]
+    if exc is not None:
+        line += "".join(traceback.format_exception(exc.type, exc.value, exc.traceback))
+    return line
+
+
+class _DailyFile:
+    """
+    Append-only file renamed to `<stem>_YYYYMMDD.log` when the local date
+    changes (the daily archive), then reopened. Archives older than
+    `retention_days` are deleted on rotation.
+    """
+
+    def __init__(self, directory: str, stem: str, retention_days: int, follow_rotation: bool):
+        self.path = os.path.join(directory, f"{stem}.log")
+        self.directory = directory
+        self.stem = stem
+        self.retention_days = retention_days
+        # Several workers append to the same file: pick up a rename done by another one
+        self.follow_rotation = follow_rotation
+        self._fh: Optional[TextIO] = None
+        self._day = self._file_day()
+
+    def _file_day(self) -> date:
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(self.path)).date()
+        except OSError:
+            return date.today()
+
+    def _open(self) -> TextIO:
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        return self._fh
+
+    def _rotated_elsewhere(self) -> bool:
+        if self._fh is None:
+            return False
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fh.fileno()).st_ino
+        except OSError:
+            return True
+
+    def _rotate(self, today: date) -> None:
+        self.close()
+        # Another worker may already have rotated: only move a file still holding an older day
+        file_day = self._file_day()
+        if os.path.exists(self.path) and file_day != today:
+            archive = os.path.join(self.directory, f"{self.stem}_{file_day:%Y%m%d}.log")
+            try:
+                if os.path.exists(archive):
+                    with open(self.path, encoding="utf-8") as src, open(archive, "a", encoding="utf-8") as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.remove(self.path)
+                else:
+                    os.rename(self.path, archive)
+            except OSError:
+                pass
+        self._day = today
+        cutoff = f"{self.stem}_{today - timedelta(days=self.retention_days):%Y%m%d}.log"
+        for old in glob.glob(os.path.join(self.directory, f"{self.stem}_????????.log")):
+            if os.path.basename(old) < cutoff:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def maybe_rotate(self, today: date) -> None:
+        if today != self._day:
+            self._rotate(today)
+        elif self.follow_rotation and self._rotated_elsewhere():
+            self.close()
+
+    def write(self, text: str) -> None:
+        fh = self._open()
+        fh.write(text)
+        fh.flush()
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class BatchedLogWriter:
+    """
+    Loguru sink that hands records to one background thread.
+
+    - The calling thread only appends the record to a bounded buffer. If
+      the writer falls that far behind, the caller flushes inline instead
+      (counted as `inline_flushes`): backpressure, never lost records.
+    - The writer drains up to `batch_size` records every `flush_interval`
+      seconds (or sooner when half full), serialises them to JSON lines
+      and writes app.log in one call; ERROR+ records also go to error.log.
+    - Daily archives come from renaming those files at midnight instead of
+      writing every record to a second file.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        buffer_size: int,
+        batch_size: int,
+        flush_interval: float,
+        retention_days: int,
+        console: bool,
+        follow_rotation: bool,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.console = console
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._max_buffered = max(1, buffer_size)
+        self._wake_at = max(1, buffer_size // 2)
+        self._app = _DailyFile(directory, "app", retention_days, follow_rotation)
+        self._error = _DailyFile(directory, "error", retention_days, follow_rotation)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._stats = {"records": 0, "inline_flushes": 0, "batches": 0, "write_errors": 0}
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    # loguru calls this with a formatted Message; only `.record` is used
+    def __call__(self, message) -> None:
+        buffer = self._buffer
+        if len(buffer) >= self._max_buffered:
+            self._stats["inline_flushes"] += 1
+            with self._lock:
+                self._write_batch(self._drain())
+        buffer.append(message.record)
+        if len(buffer) >= self._wake_at:
+            self._wakeup.set()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        buffer = self._buffer
+        while buffer and len(batch) < self.batch_size:
+            batch.append(buffer.popleft())
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        app_lines, error_lines, console_lines = [], [], []
+        try:
+            for n, record in enumerate(batch, 1):
+                if n % _YIELD_EVERY == 0:
+                    time.sleep(0)
+                line = json.dumps(_record_to_dict(record), default=str, ensure_ascii=False) + "\n"
+                app_lines.append(line)
+                if record["level"].no >= ERROR_LEVELNO:
+                    error_lines.append(line)
+                if self.console:
+                    console_lines.append(_console_line(record))
+            # Roll both files together so error.log is archived even on a quiet day
+            today = date.today()
+            self._app.maybe_rotate(today)
+            self._error.maybe_rotate(today)
+            self._app.write("".join(app_lines))
+            if error_lines:
+                self._error.write("".join(error_lines))
+            if console_lines:
+                sys.stderr.write("".join(console_lines))
+                sys.stderr.flush()
+        except Exception:
+            self._stats["write_errors"] += 1
+        self._stats["records"] += len(batch)
+        self._stats["batches"] += 1
+
+    def flush(self) -> None:
+        while self._buffer:
+            # Lock per batch so an inline flush from a caller never waits on a full drain
+            with self._lock:
+                self._write_batch(self._drain())
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self._app.close()
+        self._error.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "buffered": len(self._buffer), "buffer_size": self._max_buffered}
@@ -1,11 +1,12 @@
 # backend/core/logging.py
+import atexit
 import logging
 import os
-import sys
 from typing import Optional
 
 from loguru import logger
 from core.config import settings
+from core.log_writer import BatchedLogWriter
 
 
 LOG_FORMAT = (
@@ -36,7 +37,16 @@ def _get_log_level() -> str:
     return str(lvl).upper()
 
 
+_writer: Optional[BatchedLogWriter] = None
+
+
 def setup_logging() -> None:
+    """
+    One loguru sink: a BatchedLogWriter thread writing JSON lines to
+    app.log (all records) and error.log (ERROR+), rotated daily into
+    app_YYYYMMDD.log / error_YYYYMMDD.log, plus the console.
+    """
+    global _writer
     log_dir = getattr(settings, "LOG_PATH", "./logs")
     os.makedirs(log_dir, exist_ok=True)
 
@@ -44,63 +54,24 @@ def setup_logging() -> None:
 
     # Remove default loguru handler to avoid duplicates
     logger.remove()
+    if _writer is not None:
+        _writer.stop()
 
-    # Decide if we need enqueue=True (multi-process)
-    # SINGLE_PROCESS=1 → single process (no queue)
-    # SINGLE_PROCESS=0 → multi-process (use queue)
+    # SINGLE_PROCESS=0 → several workers append to the same files, so each
+    # writer must follow a rotation done by another process
     single_process = int(getattr(settings, "SINGLE_PROCESS", 1))
-    use_enqueue = single_process == 0
-
-    # Console
-    logger.add(
-        sys.stderr,
-        level=log_level,
-        format=LOG_FORMAT,
-        backtrace=getattr(settings, "DEBUG", False),
-        diagnose=getattr(settings, "DEBUG", False),
-        enqueue=use_enqueue,
-    )
-
-    # app.log – all logs, rotated daily
-    logger.add(
-        os.path.join(log_dir, "app.log"),
-        level=log_level,
-        format=LOG_FORMAT,
-        rotation="00:00",      
-        retention="30 days",    
-        enqueue=use_enqueue,
-    )
 
-    # error.log – only errors, rotated daily
-    logger.add(
-        os.path.join(log_dir, "error.log"),
-        level="ERROR",
-        format=LOG_FORMAT,
-        rotation="00:00",
-        retention="30 days",
-        enqueue=use_enqueue,
-    )
-
-    # app_YYYYMMDD.log – per-day archive of all logs
-    logger.add(
-        os.path.join(log_dir, "app_{time:YYYYMMDD}.log"),
-        level=log_level,
-        format=LOG_FORMAT,
-        # rotation based on filename pattern -> new file each day
-        rotation="00:00",
-        retention="90 days",
-        enqueue=use_enqueue,
-    )
-
-    # error_YYYYMMDD.log – per-day archive of error logs
-    logger.add(
-        os.path.join(log_dir, "error_{time:YYYYMMDD}.log"),
-        level="ERROR",
-        format=LOG_FORMAT,
-        rotation="00:00",
-        retention="90 days",
-        enqueue=use_enqueue,
+    _writer = BatchedLogWriter(
+        log_dir,
+        buffer_size=settings.LOG_BUFFER_SIZE,
+        batch_size=settings.LOG_BATCH_SIZE,
+        flush_interval=settings.LOG_FLUSH_INTERVAL,
+        retention_days=settings.LOG_RETENTION_DAYS,
+        console=settings.LOG_CONSOLE,
+        follow_rotation=single_process == 0,
     )
+    logger.add(_writer, level=log_level, format="{message}", backtrace=False, diagnose=False)
+    atexit.register(shutdown_logging)
 
     # Intercept standard logging so anything using logging.getLogger() goes into loguru
     logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
@@ -112,3 +83,16 @@ def setup_logging() -> None:
         std_logger.propagate = False
 
     logger.info(f"Logging initialized path={log_dir} level={log_level} | module=core.logging")
+
+
+def shutdown_logging() -> None:
+    """Flush buffered records and close the log files."""
+    global _writer
+    if _writer is not None:
+        logger.remove()
+        _writer.stop()
+        _writer = None
+
+
+def get_log_writer_stats() -> dict:
+    return _writer.stats() if _writer is not None else {}
@@ -0,0 +1,318 @@
+# backend/core/metrics.py
+"""
+Prometheus text-format metrics without an external client or service.
+
+- Counters / gauges / histograms are sharded per thread: each thread only
+  writes its own dict, so the hot path takes no lock; shards are summed
+  when /metrics is scraped.
+- With several workers, set METRICS_MULTIPROC_DIR: every worker dumps a
+  JSON snapshot there every METRICS_FLUSH_INTERVAL seconds and the worker
+  serving the scrape merges them with its own live values.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from core.config import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # thread id -> {labels: value}
+        self._shards: Dict[int, Dict[Labels, Any]] = {}
+        REGISTRY.append(self)
+
+    def _shard(self) -> Dict[Labels, Any]:
+        tid = threading.get_ident()
+        shard = self._shards.get(tid)
+        if shard is None:
+            shard = self._shards[tid] = {}
+        return shard
+
+    def _snapshots(self) -> Iterable[Dict[Labels, Any]]:
+        # dict(...) copies in one C call under the GIL: safe against concurrent writers
+        return [dict(shard) for shard in list(self._shards.values())]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def collect(self) -> Dict[Labels, float]:
+        total: Dict[Labels, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                total[labels] = total.get(labels, 0.0) + value
+        return total
+
+
+class Gauge(Counter):
+    """Up/down value; shards (and workers) are summed, so use it for totals like in-use counts."""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # per-bucket (non-cumulative) counts incl. +Inf, sum, count
+            state = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def collect(self) -> Dict[Labels, list]:
+        total: Dict[Labels, list] = {}
+        for shard in self._snapshots():
+            for labels, (counts, sum_, count) in shard.items():
+                acc = total.get(labels)
+                if acc is None:
+                    total[labels] = [list(counts), sum_, count]
+                else:
+                    acc[0] = [a + b for a, b in zip(acc[0], counts)]
+                    acc[1] += sum_
+                    acc[2] += count
+        return total
+
+
+REGISTRY: List[_Metric] = []
+
+# --- Metric definitions ---
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+OSP_LATENCY = Histogram("osp_request_duration_seconds", "OSP call latency by endpoint and outcome", ("endpoint", "outcome"))
+OSP_ERRORS = Counter("osp_errors_total", "Failed OSP calls by endpoint and error kind", ("endpoint", "kind"))
+DB_CHECKOUT = Histogram(
+    "db_connection_checkout_seconds",
+    "Time a pooled DB connection stays checked out",
+    ("engine",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+DB_CHECKED_OUT = Gauge("db_connections_checked_out", "Pooled DB connections currently checked out", ("engine",))
+PAYMENT_TRANSITIONS = Counter(
+    "payment_status_transitions_total", "Payment.status changes (from -> to)", ("from_status", "to_status")
+)
+SAGA_STEPS = Counter("payment_saga_steps_total", "Payment saga step attempts by step and outcome", ("step", "outcome"))
+RECONCILE_ACTIONS = Counter(
+    "payment_reconcile_total", "Stuck payments seen by reconciliation, by action taken", ("action",)
+)
+IDEMPOTENCY_REQUESTS = Counter(
+    "idempotency_requests_total", "Requests with an Idempotency-Key header, by outcome", ("outcome",)
+)
+
+
+# --- Exposition ---
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value))
+
+
+def _snapshot() -> Dict[str, Dict[str, Any]]:
+    return {
+        m.name: {"samples": [[list(labels), value] for labels, value in m.collect().items()]}
+        for m in REGISTRY
+    }
+
+
+def _merge(metric: _Metric, into: Dict[Labels, Any], samples: List[list]) -> None:
+    for labels, value in samples:
+        key = tuple(labels)
+        if metric.type == "histogram":
+            acc = into.get(key)
+            if acc is None:
+                into[key] = [list(value[0]), value[1], value[2]]
+            elif len(acc[0]) == len(value[0]):
+                acc[0] = [a + b for a, b in zip(acc[0], value[0])]
+                acc[1] += value[1]
+                acc[2] += value[2]
+        else:
+            into[key] = into.get(key, 0.0) + value
+
+
+def _other_worker_snapshots() -> List[Tuple[Dict[str, Any], bool]]:
+    """(snapshot, fresh) per other worker; a stale file is a worker that has stopped."""
+    directory = settings.METRICS_MULTIPROC_DIR
+    if not directory:
+        return []
+    own = os.path.join(directory, f"{os.getpid()}.json")
+    stale_before = time.time() - 3 * settings.METRICS_FLUSH_INTERVAL
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        if path == own:
+            continue
+        try:
+            fresh = os.path.getmtime(path) >= stale_before
+            with open(path, encoding="utf-8") as fh:
+                snapshots.append((json.load(fh), fresh))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text format 0.0.4, merged across workers."""
+    others = _other_worker_snapshots()
+    lines: List[str] = []
+    for metric in REGISTRY:
+        values = metric.collect()
+        for snap, fresh in others:
+            # Counters/histograms of stopped workers still count; their gauges do not
+            if metric.type == "gauge" and not fresh:
+                continue
+            _merge(metric, values, snap.get(metric.name, {}).get("samples", []))
+
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for labels, value in sorted(values.items()):
+            if metric.type == "histogram":
+                counts, sum_, count = value
+                cumulative = 0
+                for bound, n in zip(list(metric.buckets) + [float("inf")], counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{metric.name}_bucket{_label_str(metric.labelnames, labels, ('le', le))} {cumulative}")
+                lines.append(f"{metric.name}_sum{_label_str(metric.labelnames, labels)} {_fmt(sum_)}")
+                lines.append(f"{metric.name}_count{_label_str(metric.labelnames, labels)} {count}")
+            else:
+                lines.append(f"{metric.name}{_label_str(metric.labelnames, labels)} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Multi-worker snapshots ---
+_flusher: Optional[threading.Thread] = None
+
+
+def _write_snapshot() -> None:
+    directory = settings.METRICS_MULTIPROC_DIR
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(_snapshot(), fh)
+    os.replace(tmp, path)
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        try:
+            _write_snapshot()
+        except OSError:
+            pass
+
+
+def start_metrics_flusher() -> None:
+    """Start dumping this worker's snapshot (no-op unless METRICS_MULTIPROC_DIR is set)."""
+    global _flusher
+    if not settings.METRICS_MULTIPROC_DIR or _flusher is not None:
+        return
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    _flusher = threading.Thread(target=_flush_loop, name="metrics-flusher", daemon=True)
+    _flusher.start()
+
+
+def stop_metrics_flusher() -> None:
+    """Write a last snapshot so a stopping worker's counts are not lost."""
+    if settings.METRICS_MULTIPROC_DIR:
+        try:
+            _write_snapshot()
+        except OSError:
+            pass
+
+
+# --- Instrumentation ---
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware overhead): counts requests
+    and observes latency per route template, e.g. /payments/{payment_id}/confirm.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # unmatched paths share one label so scanners cannot blow up cardinality
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, template)
+            HTTP_REQUESTS.inc(method, template, str(status["code"]))
+
+
+def instrument_engine(sync_engine, label: str) -> None:
+    """Observe how long each pooled connection of `sync_engine` stays checked out."""
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        record.info["metrics_checkout_at"] = time.perf_counter()
+        DB_CHECKED_OUT.inc(label)
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        started = record.info.pop("metrics_checkout_at", None)
+        if started is not None:
+            DB_CHECKOUT.observe(time.perf_counter() - started, label)
+            DB_CHECKED_OUT.dec(label)
+
+
+def instrument_payment_status(status_attribute) -> None:
+    """Count every change of Payment.status (set on the instance, whether or not it is committed)."""
+
+    @event.listens_for(status_attribute, "set")
+    def _on_set(target, value, oldvalue, initiator):
+        old = oldvalue if isinstance(oldvalue, str) else "none"
+        if value != old:
+            PAYMENT_TRANSITIONS.inc(old, str(value))
@@ -4,27 +4,53 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi_permissions import Authenticated, configure_permissions
 from db.session import SessionLocal
 from models.user import User
-from core.security import decode_token
-from api.deps import get_db
+from core.security import decode_token_claims
+from core.config import settings
+from core.utils.ttl_cache import TTLCache
+from api.deps import get_async_db
 
 # Token scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# --- Authenticated-user cache ---
+# (user_id, token iat) -> detached User. Per process: admin changes are
+# invalidated here directly, other workers catch up within USER_CACHE_TTL.
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_ENTRIES, ttl=settings.USER_CACHE_TTL)
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """Drop every cached principal of `user_id` (call after update/delete)."""
+    _user_cache.discard_where(lambda key: key[0] == int(user_id))
+
+
+def get_user_cache_stats() -> dict:
+    return _user_cache.stats()
+
+
 # --- Authentication: get current user ---
-def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid or expired token",
     )
     try:
-        user_id = decode_token(token)
+        claims = decode_token_claims(token)
     except HTTPException:
 
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user_id = int(claims["sub"])
+    cache_key = (user_id, claims.get("iat"))
+    user = _user_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    user = await db.get(User, user_id)
     if not user:
         raise credentials_exception
+    # Detach so the instance outlives this request's session (columns stay loaded)
+    db.expunge(user)
+    _user_cache.set(cache_key, user)
     return user
 
 # --- Role-based check (admin only) ---
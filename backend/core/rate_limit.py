@@ -1,10 +1,18 @@
 # backend/core/rate_limit.py
+import importlib.util
+import os
+import sqlite3
+import threading
 import time
-from typing import Dict, Tuple
-from fastapi import HTTPException, Request
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Tuple
 
-# key -> (reset_at_epoch, count)
-_RL_STATE: Dict[str, Tuple[float, int]] = {}
+from fastapi import Depends, HTTPException, Request
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from api.deps import get_user_id
+from core.config import settings
 
 
 def _make_key(client_id: str, scope: str) -> str:
@@ -15,6 +23,213 @@ def _make_key(client_id: str, scope: str) -> str:
     return f"{scope}:{client_id}"
 
 
+class MemoryRateLimitBackend:
+    """
+    Sliding-window log kept in this process.
+
+    - Only accepted hits are logged, so a key holds at most `max_requests`
+      timestamps.
+    - Keys are LRU-bounded by `max_keys`, and keys whose newest hit is
+      older than their window are swept every `evict_interval` seconds.
+    - Limits are per worker: use the sqlite/redis backend with several
+      uvicorn workers.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys: int, evict_interval: float):
+        self.max_keys = max_keys
+        self.evict_interval = evict_interval
+        # key -> (window_seconds, timestamps of accepted hits)
+        self._log: "OrderedDict[str, Tuple[float, Deque[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + evict_interval
+        self.evicted = 0
+
+    def hit(self, key: str, max_requests: int, window_seconds: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._log.get(key)
+            if entry is None:
+                entry = (window_seconds, deque())
+                self._log[key] = entry
+            hits = entry[1]
+            while hits and hits[0] <= now - window_seconds:
+                hits.popleft()
+            self._log.move_to_end(key)
+
+            if len(hits) >= max_requests:
+                return False, hits[0] + window_seconds - now
+
+            hits.append(now)
+            while len(self._log) > self.max_keys:
+                self._log.popitem(last=False)
+                self.evicted += 1
+            return True, 0.0
+
+    def _maybe_sweep(self, now: float) -> None:
+        if time.monotonic() < self._next_sweep:
+            return
+        self._next_sweep = time.monotonic() + self.evict_interval
+        stale = [k for k, (window, hits) in self._log.items() if not hits or hits[-1] <= now - window]
+        for k in stale:
+            del self._log[k]
+        self.evicted += len(stale)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._log.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"keys": len(self._log), "max_keys": self.max_keys, "evicted": self.evicted}
+
+
+class SQLiteRateLimitBackend:
+    """
+    Sliding-window log in a SQLite file shared by every worker on the host.
+
+    Each hit is one short write transaction (BEGIN IMMEDIATE serialises the
+    check-and-insert across processes). Expired rows are deleted per key on
+    every hit and table-wide every `evict_interval` seconds.
+    """
+
+    name = "sqlite"
+    # BEGIN IMMEDIATE may wait up to the 5s busy timeout
+    blocking = True
+
+    def __init__(self, path: str, evict_interval: float):
+        self.path = path
+        self.evict_interval = evict_interval
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        self.evicted = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_hits ("
+            " key TEXT NOT NULL, ts REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_hits_key_ts ON rate_limit_hits (key, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_hits_expires ON rate_limit_hits (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly below
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, max_requests: int, window_seconds: float, now: float) -> Tuple[bool, float]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rate_limit_hits WHERE key = ? AND ts <= ?", (key, now - window_seconds))
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(ts) FROM rate_limit_hits WHERE key = ?", (key,)
+            ).fetchone()
+            if count >= max_requests:
+                allowed, retry_after = False, oldest + window_seconds - now
+            else:
+                conn.execute(
+                    "INSERT INTO rate_limit_hits (key, ts, expires_at) VALUES (?, ?, ?)",
+                    (key, now, now + window_seconds),
+                )
+                allowed, retry_after = True, 0.0
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.evict_interval
+                self.evicted += conn.execute("DELETE FROM rate_limit_hits WHERE expires_at <= ?", (now,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def reset(self) -> None:
+        self._conn().execute("DELETE FROM rate_limit_hits")
+
+    def stats(self) -> Dict[str, int]:
+        keys, rows = self._conn().execute(
+            "SELECT COUNT(DISTINCT key), COUNT(*) FROM rate_limit_hits"
+        ).fetchone()
+        return {"keys": keys, "rows": rows, "evicted": self.evicted}
+
+
+# KEYS[1]=key, ARGV = now, window, max_requests, member
+_REDIS_SLIDING_WINDOW = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1] - ARGV[2])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[3]) then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, tostring(oldest[2] + ARGV[2] - ARGV[1])}
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(ARGV[2] * 1000))
+return {1, '0'}
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Sliding-window log in a Redis sorted set per key (any Redis-protocol
+    server). The check-and-add runs as one Lua script; keys expire on
+    their own after one window, so no sweeping is needed.
+    """
+
+    name = "redis"
+    # sync client: a network round trip per hit
+    blocking = True
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_REDIS_SLIDING_WINDOW)
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+
+    def hit(self, key: str, max_requests: int, window_seconds: float, now: float) -> Tuple[bool, float]:
+        with self._seq_lock:
+            self._seq += 1
+            member = f"{now}:{os.getpid()}:{self._seq}"
+        allowed, retry_after = self._script(
+            keys=[f"rl:{key}"], args=[now, window_seconds, max_requests, member]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+    def reset(self) -> None:
+        for k in self._client.scan_iter("rl:*"):
+            self._client.delete(k)
+
+    def stats(self) -> Dict[str, int]:
+        # Keys live in the shared server; counting them would mean a full SCAN
+        return {}
+
+
+def _build_backend():
+    name = settings.RATE_LIMIT_BACKEND.lower()
+    if name == "redis":
+        if not settings.RATE_LIMIT_REDIS_URL:
+            logger.warning("RATE_LIMIT_BACKEND=redis but RATE_LIMIT_REDIS_URL is empty; using memory | module=core.rate_limit")
+        elif importlib.util.find_spec("redis") is None:
+            logger.warning("RATE_LIMIT_BACKEND=redis but the 'redis' package is not installed; using memory | module=core.rate_limit")
+        else:
+            return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    elif name == "sqlite":
+        return SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH, settings.RATE_LIMIT_EVICT_INTERVAL)
+    elif name != "memory":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND={name!r}; using memory | module=core.rate_limit")
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS, settings.RATE_LIMIT_EVICT_INTERVAL)
+
+
+_backend = _build_backend()
+_backend_errors = 0
+
+
 def check_rate_limit(
     client_id: str,
     *,
@@ -23,42 +238,98 @@ def check_rate_limit(
     window_seconds: int = 60,
 ) -> None:
     """
-    Simple in-memory sliding window counter.
+    Sliding-window log limiter on the configured backend (RATE_LIMIT_BACKEND).
 
     - client_id: identifier for the caller (e.g. IP, user id, phone, etc.)
     - scope: logical bucket (login/payment/etc)
-    - max_requests: allowed requests per window_seconds
+    - max_requests: allowed requests in any window_seconds interval
+
+    Fails open if the shared store is unreachable: a limiter outage must
+    not take logins or payments down with it.
     """
-    now = time.time()
+    global _backend_errors
     key = _make_key(client_id, scope)
+    try:
+        allowed, retry_after = _backend.hit(key, max_requests, window_seconds, time.time())
+    except Exception as e:
+        _backend_errors += 1
+        logger.bind(scope=scope, backend=_backend.name).warning(
+            f"Rate limit backend error, allowing request: {e} | module=core.rate_limit"
+        )
+        return
 
-    reset_at, count = _RL_STATE.get(key, (now + window_seconds, 0))
-
-    # window expired → reset
-    if now > reset_at:
-        reset_at = now + window_seconds
-        count = 0
-
-    count += 1
-    _RL_STATE[key] = (reset_at, count)
-
-    if count > max_requests:
-        retry_after = max(int(reset_at - now), 0)
+    if not allowed:
         raise HTTPException(
             status_code=429,
             detail="Too many requests. Please try again later.",
-            headers={"Retry-After": str(retry_after)},
+            headers={"Retry-After": str(max(int(retry_after + 0.999), 1))},
         )
 
 
+async def check_rate_limit_async(client_id: str, **kwargs) -> None:
+    """
+    check_rate_limit() for async code: the sqlite/redis backends block on
+    I/O, so they run in the threadpool instead of on the event loop.
+    """
+    if _backend.blocking:
+        await run_in_threadpool(check_rate_limit, client_id, **kwargs)
+    else:
+        check_rate_limit(client_id, **kwargs)
+
+
+def get_rate_limit_stats() -> Dict[str, object]:
+    return {"backend": _backend.name, "errors": _backend_errors, **_backend.stats()}
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limit_ip(scope: str, max_requests: int, window_seconds: int) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency factory: limit `scope` per client IP.
+    max_requests <= 0 disables the limit.
+
+        @router.get("/lookup", dependencies=[Depends(rate_limit_ip("lookup", 30, 60))])
+    """
+
+    async def dependency(request: Request) -> None:
+        if max_requests > 0:
+            await check_rate_limit_async(
+                client_id=_client_ip(request),
+                scope=f"{scope}:ip",
+                max_requests=max_requests,
+                window_seconds=window_seconds,
+            )
+
+    return dependency
+
+
+def rate_limit_user(scope: str, max_requests: int, window_seconds: int) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency factory: limit `scope` per authenticated user id.
+    Shares the route's `get_user_id` result (decoded once per request).
+    """
+
+    async def dependency(user_id: int = Depends(get_user_id)) -> None:
+        if max_requests > 0:
+            await check_rate_limit_async(
+                client_id=str(user_id),
+                scope=f"{scope}:user",
+                max_requests=max_requests,
+                window_seconds=window_seconds,
+            )
+
+    return dependency
+
+
 async def rate_limit_login(request: Request) -> None:
     """
     Rate-limit login attempts per client IP.
     5 requests / 60 seconds by default.
     """
-    client_ip = request.client.host if request.client else "unknown"
-    check_rate_limit(
-        client_id=client_ip,
+    await check_rate_limit_async(
+        client_id=_client_ip(request),
         scope="login",
         max_requests=5,
         window_seconds=60,
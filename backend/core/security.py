@@ -1,10 +1,17 @@
 # backend/core/security.py
 from jose import jwt, JWTError
 from jose.exceptions import ExpiredSignatureError
+import asyncio
 import bcrypt
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException
 from core.config import settings
+from core.tracing import start_span
+from core.utils.ttl_cache import TTLCache
 
 ALGO = "HS256"
 
@@ -17,6 +24,65 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
+# --- Bounded bcrypt pool ---
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event
+# loop while capping how many CPU-heavy checks run at once.
+_BCRYPT_POOL = ThreadPoolExecutor(
+    max_workers=settings.BCRYPT_POOL_SIZE,
+    thread_name_prefix="bcrypt",
+)
+_BCRYPT_LOCK = threading.Lock()
+_BCRYPT_STATS = {"pending": 0, "max_pending_seen": 0, "completed": 0, "rejected": 0}
+
+
+def _bcrypt_done(_: Future) -> None:
+    with _BCRYPT_LOCK:
+        _BCRYPT_STATS["pending"] -= 1
+        _BCRYPT_STATS["completed"] += 1
+
+
+def _submit_bcrypt(fn, *args) -> Future:
+    """
+    Queue a bcrypt call on the pool. When BCRYPT_MAX_PENDING calls are
+    already queued or running, reject with 503 instead of growing the queue.
+    """
+    with _BCRYPT_LOCK:
+        if _BCRYPT_STATS["pending"] >= settings.BCRYPT_MAX_PENDING:
+            _BCRYPT_STATS["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy. Please try again later.",
+                headers={"Retry-After": "1"},
+            )
+        _BCRYPT_STATS["pending"] += 1
+        _BCRYPT_STATS["max_pending_seen"] = max(_BCRYPT_STATS["max_pending_seen"], _BCRYPT_STATS["pending"])
+    future = _BCRYPT_POOL.submit(fn, *args)
+    future.add_done_callback(_bcrypt_done)
+    return future
+
+
+async def hash_password_async(password: str) -> str:
+    with start_span("bcrypt.hash"):
+        return await asyncio.wrap_future(_submit_bcrypt(hash_password, password))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    # Span covers queueing for a pool slot, which is usually where the time goes
+    with start_span("bcrypt.verify"):
+        return await asyncio.wrap_future(_submit_bcrypt(verify_password, plain_password, hashed_password))
+
+
+def hash_password_pooled(password: str) -> str:
+    """Blocking variant for sync (threadpool) handlers; still bounded by the pool."""
+    with start_span("bcrypt.hash"):
+        return _submit_bcrypt(hash_password, password).result()
+
+
+def get_bcrypt_pool_stats() -> dict:
+    with _BCRYPT_LOCK:
+        return {**_BCRYPT_STATS, "workers": settings.BCRYPT_POOL_SIZE, "max_pending": settings.BCRYPT_MAX_PENDING}
+
+
 def _build_payload(sub: int) -> dict:
     now = datetime.now(timezone.utc)
     return {
@@ -37,14 +103,38 @@ def create_token_specific(sub: int) -> str:
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGO)
 
 
-def decode_token(token: str) -> int:
+# --- Verified-token cache ---
+# sha256(token) -> claims. Entries never outlive the token's own `exp`, so a
+# hit is exactly as valid as re-verifying. Only successful verifications are
+# cached; bad tokens always go through jose.
+_token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.TOKEN_CACHE_TTL)
+
+
+def get_token_cache_stats() -> dict:
+    return _token_cache.stats()
+
+
+def decode_token_claims(token: str) -> dict:
+    """Verify the token and return its claims (`sub` guaranteed present)."""
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGO])
-        sub = payload.get("sub")
-        if sub is None:
+        if payload.get("sub") is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-        return int(sub)
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    exp = payload.get("exp")
+    if exp is not None:
+        _token_cache.set(digest, payload, ttl=float(exp) - time.time())
+    return payload
+
+
+def decode_token(token: str) -> int:
+    return int(decode_token_claims(token)["sub"])
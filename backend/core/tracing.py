@@ -0,0 +1,476 @@
+# backend/core/tracing.py
+"""
+Lightweight in-process tracing with the OpenTelemetry span model.
+
+- TracingMiddleware opens one SERVER span per HTTP request and binds a
+  request id (X-Request-ID, or the trace id) into loguru's `extra`, so
+  every log line of the request carries `request_id` / `trace_id`.
+- Child spans: SQL statements and session commits (instrument_engine_tracing
+  / instrument_session_tracing), OSP calls (services.osp_breaker /
+  services.osp_http) and anything wrapped in start_span() / @traced.
+- Work outside a request (saga workers, scheduled reconciliation) opens
+  its own root with start_root_span(), optionally continuing the trace
+  of the request that queued it, so its child spans are exported too.
+- Finished spans are written by one background thread as JSON lines to
+  LOG_PATH/traces.log (rotated daily like app.log), one OTLP-style span
+  per line. A full buffer drops spans rather than slowing requests.
+"""
+import functools
+import inspect
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+
+from core.config import settings
+from core.log_writer import _DailyFile
+
+SERVICE_NAME = "dummy-bank-api"
+_STATEMENT_MAX_CHARS = 1000
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("trace_request_id", default=None)
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    """One timed operation; field names follow the OTLP JSON span."""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_span_id",
+        "start_ns", "end_ns", "_started", "attributes", "status", "status_message",
+    )
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = "UNSET"
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str = "") -> None:
+        self.status = "ERROR"
+        self.status_message = message[:500]
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.set_error(str(exc))
+        self.attributes["exception.type"] = type(exc).__name__
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            # Wall-clock start + monotonic duration: immune to clock steps mid-span
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._started)
+            _export(self)
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace-context header for outgoing calls."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status},
+            "resource": {"service.name": SERVICE_NAME},
+        }
+        if self.status_message:
+            out["status"]["message"] = self.status_message
+        return out
+
+
+class _NoopSpan:
+    """Stand-in yielded when the request is not sampled, so callers never branch."""
+
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str = "") -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def open_span(name: str, kind: str = "INTERNAL", **attributes: Any) -> Optional[Span]:
+    """Child of the current span, or None outside a sampled trace. Does not become current."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(name, kind, parent.trace_id, parent.span_id, attributes)
+
+
+@contextmanager
+def start_span(name: str, kind: str = "INTERNAL", **attributes: Any) -> Iterator[Any]:
+    """
+    Time a block as a child of the current span (no-op outside a sampled trace):
+
+        with start_span("bcrypt.verify") as span:
+            ...
+    """
+    span = open_span(name, kind, **attributes)
+    if span is None:
+        yield NOOP_SPAN
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+@contextmanager
+def start_root_span(
+    name: str, parent: Optional[Tuple[Optional[str], Optional[str]]] = None, kind: str = "INTERNAL", **attributes: Any
+) -> Iterator[Any]:
+    """
+    Like start_span, for code that may run outside any request (background
+    tasks). The span is, in order of preference: a child of the current
+    span; a continuation of `parent` = (trace_id, span_id), the stored
+    context of a sampled request; or the root of a new trace, sampled at
+    TRACE_SAMPLE_RATE.
+    """
+    current = _current_span.get()
+    if current is not None:
+        span = Span(name, kind, current.trace_id, current.span_id, attributes)
+    elif parent is not None and parent[0] and parent[1]:
+        span = Span(name, kind, parent[0], parent[1], attributes)
+    else:
+        rate = settings.TRACE_SAMPLE_RATE
+        if not (rate >= 1.0 or (rate > 0 and random.random() < rate)):
+            yield NOOP_SPAN
+            return
+        span = Span(name, kind, _new_trace_id(), None, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def traced(name: Optional[str] = None, **attributes: Any) -> Callable:
+    """Decorator form of start_span for sync and async functions."""
+
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with start_span(span_name, **attributes):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with start_span(span_name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# --- Export ---
+class _SpanExporter:
+    """Background thread writing finished spans as JSON lines to traces.log."""
+
+    def __init__(self, directory: str, *, buffer_size: int, flush_interval: float, retention_days: int):
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Span] = deque()
+        self._max_buffered = max(1, buffer_size)
+        self._file = _DailyFile(directory, "traces", retention_days, follow_rotation=int(settings.SINGLE_PROCESS) == 0)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._stats = {"exported": 0, "dropped": 0, "write_errors": 0}
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        if len(self._buffer) >= self._max_buffered:
+            self._stats["dropped"] += 1
+            return
+        self._buffer.append(span)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch: List[Span] = []
+            while self._buffer:
+                batch.append(self._buffer.popleft())
+            if not batch:
+                return
+            try:
+                self._file.maybe_rotate(date.today())
+                self._file.write("".join(json.dumps(s.to_dict(), default=str) + "\n" for s in batch))
+                self._stats["exported"] += len(batch)
+            except Exception:
+                self._stats["write_errors"] += 1
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "buffered": len(self._buffer), "buffer_size": self._max_buffered}
+
+
+_exporter: Optional[_SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _export(span: Span) -> None:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _SpanExporter(
+                    settings.LOG_PATH,
+                    buffer_size=settings.TRACE_BUFFER_SIZE,
+                    flush_interval=settings.TRACE_FLUSH_INTERVAL,
+                    retention_days=settings.LOG_RETENTION_DAYS,
+                )
+    _exporter.submit(span)
+
+
+def shutdown_tracing() -> None:
+    """Write buffered spans and close traces.log (app shutdown)."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+
+
+def get_tracing_stats() -> Dict[str, Any]:
+    stats = _exporter.stats() if _exporter is not None else {}
+    return {"sample_rate": settings.TRACE_SAMPLE_RATE, **stats}
+
+
+# --- Instrumentation ---
+def _parse_traceparent(value: Optional[bytes]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent span id, sampled) from a W3C traceparent header."""
+    if not value:
+        return None
+    parts = value.decode("latin-1").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def _clean_request_id(value: Optional[bytes]) -> Optional[str]:
+    if not value:
+        return None
+    rid = value.decode("latin-1").strip()
+    # Echoed in a header and in logs: keep it short and printable
+    if not rid or len(rid) > 128 or not rid.isprintable():
+        return None
+    return rid
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware: request id + root span per HTTP request.
+
+    The request id is taken from X-Request-ID (else the trace id), bound
+    into loguru via logger.contextualize and echoed in the response. An
+    incoming W3C traceparent continues the caller's trace and sampling.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or ())
+        parent = _parse_traceparent(headers.get(b"traceparent"))
+        if parent is not None:
+            trace_id, parent_span_id, sampled = parent
+        else:
+            rate = settings.TRACE_SAMPLE_RATE
+            trace_id, parent_span_id = _new_trace_id(), None
+            sampled = rate >= 1.0 or (rate > 0 and random.random() < rate)
+        request_id = _clean_request_id(headers.get(b"x-request-id")) or trace_id
+
+        method = scope.get("method", "")
+        span = None
+        if sampled:
+            span = Span(
+                f"{method} {scope.get('path', '')}",
+                "SERVER",
+                trace_id,
+                parent_span_id,
+                {"http.request.method": method, "url.path": scope.get("path", ""), "request_id": request_id},
+            )
+        span_token = _current_span.set(span)
+        rid_token = _request_id.set(request_id)
+        rid_header = request_id.encode("latin-1")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", rid_header)]
+                if span is not None:
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_error()
+            await send(message)
+
+        try:
+            with logger.contextualize(request_id=request_id, trace_id=trace_id):
+                await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if span is not None:
+                span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(span_token)
+            _request_id.reset(rid_token)
+            if span is not None:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    # Low-cardinality name, as OTel recommends: "POST /payments/{payment_id}/confirm"
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+                span.end()
+
+
+def instrument_engine_tracing(sync_engine, label: str) -> None:
+    """One CLIENT span per SQL statement run on `sync_engine` (parameters are never recorded)."""
+    system = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        span = open_span(
+            operation,
+            "CLIENT",
+            **{
+                "db.system": system,
+                "db.engine": label,
+                "db.operation": operation,
+                "db.statement": statement[:_STATEMENT_MAX_CHARS],
+            },
+        )
+        if span is not None:
+            conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        if spans:
+            span = spans.pop()
+            if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            span.record_exception(exception_context.original_exception)
+            span.end()
+
+
+def instrument_session_tracing(session_class) -> None:
+    """
+    One span per Session.commit() (flush + COMMIT), parent of the flush's
+    INSERT/UPDATE spans. Applies to AsyncSession too (it wraps a Session).
+    """
+
+    @event.listens_for(session_class, "before_commit")
+    def _before_commit(session):
+        span = open_span("db.commit")
+        if span is not None:
+            session.info["trace_commit"] = (span, _current_span.get())
+            _current_span.set(span)
+
+    def _finish(session, failed: bool) -> None:
+        entry = session.info.pop("trace_commit", None)
+        if entry is not None:
+            span, previous = entry
+            if failed:
+                span.set_error("rolled back")
+            _current_span.set(previous)
+            span.end()
+
+    @event.listens_for(session_class, "after_commit")
+    def _after_commit(session):
+        _finish(session, failed=False)
+
+    @event.listens_for(session_class, "after_rollback")
+    def _after_rollback(session):
+        _finish(session, failed=True)
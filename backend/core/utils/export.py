@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, List
+
+from fastapi.responses import StreamingResponse
+
+from db.session import SessionLocal
+
+EXPORT_FORMAT_PATTERN = "^(csv|ndjson)$"
+
+# Rows fetched per round-trip; the DB driver streams, memory stays flat
+EXPORT_BATCH_SIZE = 1000
+
+_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(stmt, fmt: str) -> Iterator[str]:
+    """
+    Run a column-level `select()` with server-side batching and yield it as
+    CSV or NDJSON text chunks, one batch at a time.
+
+    Owns its session: the response body is iterated after the request's
+    `get_db` dependency may already have closed.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        columns: List[str] = list(result.keys())
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer is not None:
+            writer.writerow(columns)
+
+        for batch in result.partitions():
+            for row in batch:
+                values = [_plain(v) for v in row]
+                if writer is not None:
+                    writer.writerow(values)
+                else:
+                    buf.write(json.dumps(dict(zip(columns, values)), separators=(",", ":")))
+                    buf.write("\n")
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+
+        if buf.tell():
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+
+def export_response(stmt, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_export_rows(stmt, fmt),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,70 @@
+import json
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from loguru import logger
+
+from core.config import settings
+
+# Per-request (per asyncio task) sampling decision, so a sampled request
+# keeps all of its request/response lines together
+_sampled: ContextVar[Optional[bool]] = ContextVar("payment_log_sampled", default=None)
+
+_MIN_LEVEL_NO = logger.level(str(settings.LOG_LEVEL).upper()).no
+
+
+def level_enabled(level: str = "INFO") -> bool:
+    """Would a record at `level` pass LOG_LEVEL? Checked before building any payload."""
+    return logger.level(level).no >= _MIN_LEVEL_NO
+
+
+def should_log(failed: bool = False, level: str = "INFO") -> bool:
+    """
+    Failures are always logged; successes only for requests picked by
+    LOG_PAYMENT_SAMPLE_RATE. Call before serialising params/bodies.
+    """
+    if not level_enabled(level):
+        return False
+    if failed:
+        return True
+    decision = _sampled.get()
+    if decision is None:
+        rate = settings.LOG_PAYMENT_SAMPLE_RATE
+        decision = rate >= 1.0 or random.random() < rate
+        _sampled.set(decision)
+    return decision
+
+
+@contextmanager
+def sampling_scope() -> Iterator[None]:
+    """
+    A fresh sampling decision for one unit of work inside a long-lived task
+    (a saga run, a reconciled payment): otherwise the task's first decision
+    would apply to everything it ever handles.
+    """
+    token = _sampled.set(None)
+    try:
+        yield
+    finally:
+        _sampled.reset(token)
+
+
+def cap_body(value: Any, limit: Optional[int] = None) -> Any:
+    """Truncate a logged body (str, or anything JSON-able) to LOG_BODY_MAX_CHARS."""
+    limit = settings.LOG_BODY_MAX_CHARS if limit is None else limit
+    if limit <= 0:
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", errors="replace")
+    if not isinstance(value, str):
+        if value is None or isinstance(value, (int, float, bool)):
+            return value
+        text = json.dumps(value, default=str, ensure_ascii=False)
+        if len(text) <= limit:
+            return value
+        value = text
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}...(+{len(value) - limit} chars)"
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+# total=exact → COUNT(*) (old behaviour), approx → cheap estimate, none → skip
+TOTAL_MODE_PATTERN = "^(exact|approx|none)$"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor for keyset pagination on (created_at, id); created_at is NOT NULL on paged tables."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_raw, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_raw), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(created_col, id_col, cursor: str, descending: bool):
+    """WHERE clause selecting rows strictly after `cursor` in (created_at, id) order."""
+    created_at, row_id = decode_cursor(cursor)
+    key = tuple_(created_col, id_col)
+    return key < (created_at, row_id) if descending else key > (created_at, row_id)
+
+
+def next_cursor_for(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Rows were fetched with `limit + 1`: trim the probe row and return the
+    cursor of the last row kept when another page exists.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+
+def approximate_row_count(db: Session, model) -> int:
+    """
+    Cheap whole-table row estimate: planner statistics on Postgres, highest
+    primary key elsewhere (tables are append-mostly). Falls back to COUNT(*).
+    """
+    table = model.__tablename__
+    if db.bind is not None and db.bind.dialect.name == "postgresql":
+        estimate = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE relname = :t"), {"t": table}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    else:
+        estimate = db.execute(select(func.max(model.id))).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return db.execute(select(func.count()).select_from(model)).scalar() or 0
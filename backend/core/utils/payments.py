@@ -1,9 +1,8 @@
 from datetime import datetime
 
-def mark_confirmed(payment, db):
+async def mark_confirmed(payment, db):
     payment.status = "confirmed"
     if not getattr(payment, "confirmed_at", None):
         payment.confirmed_at = datetime.utcnow()
     db.add(payment)
-    db.commit()
-    db.refresh(payment)
\ No newline at end of file
+    await db.commit()
@@ -1,6 +1,169 @@
 # backend/core/utils/txid.py
-from datetime import datetime
+"""
+Transaction ids sent to OSP: decimal strings generated in memory (no DB
+round trip), unique across worker processes and hosts, and sortable by
+time like the old `<timestamp><payment id>` ids.
 
-def generate_transaction_id_from_id(db_id: int, when: datetime | None = None) -> str:
-    when = when or datetime.utcnow()
-    return f"{when.strftime('%Y%m%d%H%M%S')}{db_id:06d}"
\ No newline at end of file
+    20261018033748 042 0001234 00017
+    UTC second     node pid     sequence
+
+    node       TXID_NODE_ID (0-999), one per host/container: required
+               unless DEBUG (init_transaction_ids() fails the app
+               startup), where it falls back to a hash of the hostname
+    pid        process id, unique among the running workers of a host
+    sequence   00000-99999 within the second; once a second is used up
+               the generator waits for the next one (caps a process at
+               100k ids/s)
+
+29 digits: "R" + id (refunds) still fits the String(32) columns. A
+generator never issues ids in the second it was created in, so a
+restarted worker that gets the pid of one that just died cannot repeat
+its ids (the app creates it at startup and lets that second pass
+there). Ids of one process never go backwards, also when the system
+clock steps back: the generator keeps counting from the last second it
+used. PaymentSaga/Transaction.transaction_id are unique in the database
+as the last line of defence.
+
+Benchmark: `python -m core.utils.txid [count] [threads]`.
+"""
+import asyncio
+import os
+import socket
+import threading
+import time
+import zlib
+from typing import Optional
+
+from loguru import logger
+
+from core.config import settings
+
+_MAX_NODE_ID = 999
+_MAX_SEQUENCE = 99999
+
+
+class TransactionIdGenerator:
+    """Thread-safe time + node + pid + sequence id generator."""
+
+    def __init__(self, node_id: int, pid: Optional[int] = None):
+        if not 0 <= node_id <= _MAX_NODE_ID:
+            raise ValueError(f"TXID_NODE_ID must be 0-{_MAX_NODE_ID}, got {node_id}")
+        pid = os.getpid() if pid is None else pid
+        self.node_id = node_id
+        self._suffix = f"{node_id:03d}{pid % 10_000_000:07d}"
+        # the creation second counts as used up: a previous process with this pid may have used it
+        self._second = int(time.time())
+        self._sequence = _MAX_SEQUENCE
+        self._stamp = ""
+        self._lock = threading.Lock()
+
+    def _move_to(self, second: int) -> None:
+        self._second, self._sequence = second, 0
+        self._stamp = time.strftime("%Y%m%d%H%M%S", time.gmtime(second))
+
+    def next_id(self) -> str:
+        with self._lock:
+            now = int(time.time())
+            if now > self._second:
+                self._move_to(now)
+            elif self._sequence < _MAX_SEQUENCE:
+                # same second, or the clock stepped back: keep counting
+                self._sequence += 1
+            elif now == self._second:
+                # second used up: wait for the clock
+                time.sleep(max(0.0, self._second + 1 - time.time()))
+                self._move_to(max(int(time.time()), self._second + 1))
+            else:
+                # used up while the clock is behind: move on without it
+                self._move_to(self._second + 1)
+            return f"{self._stamp}{self._suffix}{self._sequence:05d}"
+
+
+def _node_id() -> int:
+    if settings.TXID_NODE_ID >= 0:
+        return settings.TXID_NODE_ID
+    if not settings.DEBUG:
+        raise RuntimeError(
+            f"TXID_NODE_ID (0-{_MAX_NODE_ID}) must be set to a value unique to this host/container"
+        )
+    # hostname hashes collide across hosts: good enough for a single dev box only
+    return zlib.crc32(socket.gethostname().encode()) % (_MAX_NODE_ID + 1)
+
+
+_generator: Optional[TransactionIdGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # a forked worker has a new pid: its ids must not continue the parent's
+    global _generator, _generator_lock
+    _generator = None
+    _generator_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_generator() -> TransactionIdGenerator:
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = TransactionIdGenerator(_node_id())
+    return _generator
+
+
+def generate_transaction_id() -> str:
+    """Next transaction id of this process."""
+    return _get_generator().next_id()
+
+
+async def init_transaction_ids() -> None:
+    """
+    App startup: fail without a usable TXID_NODE_ID, and create the
+    generator early, so the first payment does not wait for its creation
+    second to pass on the event loop.
+    """
+    generator = _get_generator()
+    if settings.TXID_NODE_ID < 0:
+        logger.warning(
+            f"TXID_NODE_ID not set, using {generator.node_id} from the hostname (DEBUG only) | module=core.utils.txid"
+        )
+    await asyncio.sleep(max(0.0, generator._second + 1 - time.time()))
+
+
+def _benchmark(count: int, threads: int) -> None:
+    generator = TransactionIdGenerator(_node_id())
+    generator.next_id()  # waits out the creation second
+    per_thread = count // threads
+    results = [[] for _ in range(threads)]
+
+    def run(out: list) -> None:
+        next_id = generator.next_id
+        out.extend(next_id() for _ in range(per_thread))
+
+    workers = [threading.Thread(target=run, args=(out,)) for out in results]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - started
+
+    ids = [txid for out in results for txid in out]
+    ordered = all(out == sorted(out) for out in results)
+    print(
+        f"{len(ids)} ids, {threads} thread(s): {len(ids) / seconds:,.0f} ids/s, "
+        f"unique={len(set(ids)) == len(ids)}, ordered per thread={ordered}, "
+        f"width={len(ids[0])}, first={ids[0]}, last={max(ids)}"
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    _benchmark(count, threads)
+    if threads == 1:
+        _benchmark(count, 8)
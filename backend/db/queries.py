@@ -0,0 +1,52 @@
+# backend/db/queries.py
+"""
+Hot list/filter statements, built in one place: the routes run them and
+db.query_plans EXPLAINs the very same statements, so an index a route
+relies on cannot go missing unnoticed. Callers add their own options,
+paging and optional filters.
+"""
+from typing import Tuple
+
+from sqlalchemy import Select, select
+
+from models.account import Account
+from models.payment import Payment
+from models.transaction import Transaction
+
+
+def newest_first(model) -> Tuple:
+    """ORDER BY of the (created_at, id) keyset, newest first."""
+    return model.created_at.desc(), model.id.desc()
+
+
+def oldest_first(model) -> Tuple:
+    """ORDER BY of the (created_at, id) keyset, oldest first (admin lists and exports)."""
+    return model.created_at.asc(), model.id.asc()
+
+
+def user_accounts(user_id: int) -> Select:
+    return select(Account).filter(Account.user_id == user_id)
+
+
+def user_transactions(user_id: int) -> Select:
+    """GET /transactions: the user's transactions, newest first."""
+    return select(Transaction).filter(Transaction.user_id == user_id).order_by(*newest_first(Transaction))
+
+
+def transactions_of_account(account_id: int, user_id: int) -> Select:
+    """GET /accounts/{account_id}/transactions, newest first."""
+    return (
+        select(Transaction)
+        .filter(Transaction.account_id == account_id, Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc())
+    )
+
+
+def payment_debit(payment_id: int) -> Select:
+    """The local debit of a payment."""
+    return select(Transaction).filter(Transaction.payment_id == payment_id, Transaction.direction == "debit")
+
+
+def user_payments(user_id: int) -> Select:
+    """Admin view of a user's payments; callers add the date range and order."""
+    return select(Payment).filter(Payment.user_id == user_id)
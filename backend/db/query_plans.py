@@ -0,0 +1,102 @@
+# backend/db/query_plans.py
+"""
+EXPLAIN the hot list/filter queries and flag full table scans.
+
+Regression check for the composite indexes on accounts/transactions/payments:
+if a model or migration change drops an index a query relies on, the query
+shows up here with `full_scan: true`. Run against the configured database
+with `python -m db.query_plans` (exit status 1 on any full scan); the test
+suite runs it on the migrated SQLite schema (tests/test_query_plans.py).
+
+Note: on Postgres the planner legitimately prefers a Seq Scan on tiny
+tables, so read the result against a realistically sized database.
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from db import queries
+from models.payment import Payment
+from models.transaction import Transaction
+
+_SAMPLE_DATE = datetime(2024, 1, 1)
+
+
+def _stuck_payments():
+    # imported late: the reconciliation service pulls in the OSP client
+    from services.reconciliation import stuck_payments_query
+
+    return stuck_payments_query(_SAMPLE_DATE)
+
+
+# name -> statement builder; the same builders the routes and services run (db/queries.py)
+HOT_QUERIES: Dict[str, Callable[[], Any]] = {
+    "accounts.by_user": lambda: queries.user_accounts(1),
+    "transactions.by_user_newest": lambda: queries.user_transactions(1).limit(21),
+    "transactions.by_account_newest": lambda: queries.transactions_of_account(1, 1),
+    "transactions.by_payment": lambda: queries.payment_debit(1),
+    "transactions.admin_keyset": lambda: (
+        select(Transaction)
+        .filter(Transaction.created_at > _SAMPLE_DATE)
+        .order_by(*queries.oldest_first(Transaction))
+        .limit(21)
+    ),
+    "payments.by_user_range": lambda: (
+        queries.user_payments(1).filter(Payment.created_at >= _SAMPLE_DATE).order_by(Payment.created_at)
+    ),
+    # reconciliation scan: committed / failed / reversal_failed payments older than the cutoff
+    "payments.stuck": _stuck_payments,
+    "payments.admin_keyset": lambda: (
+        select(Payment)
+        .filter(Payment.created_at > _SAMPLE_DATE)
+        .order_by(*queries.oldest_first(Payment))
+        .limit(21)
+    ),
+}
+
+
+def _explain(db: Session, stmt) -> List[str]:
+    dialect = db.bind.dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        # rows: (id, parent, notused, detail)
+        return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [row[0] for row in db.execute(text(f"EXPLAIN {sql}"))]
+
+
+def _is_full_scan(line: str) -> bool:
+    # SQLite: "SCAN transactions" (no index); Postgres: "Seq Scan on transactions"
+    if line.startswith("SCAN ") and "USING" not in line:
+        return True
+    return "Seq Scan on" in line
+
+
+def check_query_plans(db: Session) -> Dict[str, Any]:
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        plan = _explain(db, build())
+        results[name] = {
+            "full_scan": any(_is_full_scan(line.strip()) for line in plan),
+            "plan": plan,
+        }
+    return {
+        "dialect": db.bind.dialect.name,
+        "full_scans": sorted(n for n, r in results.items() if r["full_scan"]),
+        "queries": results,
+    }
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    from db.session import SessionLocal
+
+    with SessionLocal() as session:
+        report = check_query_plans(session)
+    print(json.dumps(report, indent=2))
+    if report["full_scans"]:
+        print(f"full table scans: {', '.join(report['full_scans'])}", file=sys.stderr)
+        sys.exit(1)
@@ -1,8 +1,42 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from core.config import settings
+from core.metrics import instrument_engine
+from core.tracing import instrument_engine_tracing, instrument_session_tracing
 
 
 connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine, "sync")
+instrument_engine_tracing(engine, "sync")
+
+
+# --- Async engine (same database, async driver) ---
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def _async_database_url(url: str) -> str:
+    """Map the configured sync URL onto its async driver (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in _ASYNC_DRIVERS and parsed.drivername != _ASYNC_DRIVERS[backend]:
+        parsed = parsed.set(drivername=_ASYNC_DRIVERS[backend])
+    return parsed.render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(_async_database_url(settings.DATABASE_URL))
+instrument_engine(async_engine.sync_engine, "async")
+instrument_engine_tracing(async_engine.sync_engine, "async")
+# expire_on_commit=False: objects stay readable after commit without an implicit
+# (and, in async, forbidden) lazy refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Commit spans for both session kinds (AsyncSession runs a Session underneath)
+instrument_session_tracing(Session)
@@ -1,6 +1,7 @@
 #backend/main.py
 import logging
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from decimal import Decimal
@@ -11,7 +12,21 @@ from core.logging import setup_logging
 from loguru import logger
 from core.security import hash_password
 from db.base import Base
-from db.session import engine, SessionLocal
+from db.session import engine, SessionLocal, async_engine
+from services.osp_http import close_osp_client
+from core.metrics import (
+    MetricsMiddleware,
+    instrument_payment_status,
+    render_metrics,
+    start_metrics_flusher,
+    stop_metrics_flusher,
+)
+from core.tracing import TracingMiddleware, shutdown_tracing
+from core.idempotency import IdempotencyMiddleware
+from core.utils.txid import init_transaction_ids
+from services.payment_saga import start_saga_workers, stop_saga_workers
+from services.reconciliation import start_reconciler, stop_reconciler
+from services.ledger import post_opening_balance, start_ledger_compactor, stop_ledger_compactor
 from alembic.config import Config
 from alembic import command
 
@@ -31,6 +46,10 @@ from models.account import Account
 from models.service import Service
 from models.transaction import Transaction
 from models.payment import Payment
+from models.payment_saga import PaymentSaga, PaymentSagaAttempt
+from models.balance_hold import BalanceHold
+from models.ledger import LedgerPosting, BalanceSnapshot
+from models.idempotency_key import IdempotencyKey
 import os
 import pathlib
 import traceback
@@ -58,6 +77,9 @@ def _parse_cors(origins_str: str):
         return ["*"]
     return [o.strip() for o in origins_str.split(",") if o.strip()]
 
+# --- Idempotency-Key replay; added first = innermost, so CORS/metrics/tracing also cover replays ---
+app.add_middleware(IdempotencyMiddleware)
+
 # --- CORS ---
 app.add_middleware(
     CORSMiddleware,
@@ -67,6 +89,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Metrics (per-route latency, OSP, DB pool, payment status) ---
+app.add_middleware(MetricsMiddleware)
+instrument_payment_status(Payment.status)
+
+# --- Tracing (request id in logs + spans to traces.log); added last = outermost ---
+app.add_middleware(TracingMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # --- Static files (logos) ---
 app.mount(f"/api/dmb/{API_VERSION}/static", StaticFiles(directory="static"), name="static")
 
@@ -111,6 +145,7 @@ def seed_data():
     #     return
     
     logging.warning(f"USE_MOCK_OSP = {settings.USE_MOCK_OSP}")
+    start_metrics_flusher()
 
     try:
         logging.info("Running alembic migrations (upgrade head)...")
@@ -142,7 +177,10 @@ def seed_data():
 
         for acc in default_accounts:
             if acc["number"] not in existing_accounts:
-                db.add(Account(user_id=user.id, **acc))
+                account = Account(user_id=user.id, **acc)
+                db.add(account)
+                db.flush()
+                post_opening_balance(db, account)
 
         # Seed default services
         existing_services = {s.code for s in db.query(Service).all()}
@@ -167,6 +205,25 @@ def seed_data():
     finally:
         db.close()
 
+# --- Background payment saga workers, reconciler + ledger compaction (need the running event loop) ---
+@app.on_event("startup")
+async def start_background_workers():
+    await init_transaction_ids()
+    start_saga_workers()
+    start_reconciler()
+    start_ledger_compactor()
+
+# --- Shutdown: stop background tasks, release pooled OSP + async DB connections, last metrics snapshot, buffered spans ---
+@app.on_event("shutdown")
+async def shutdown_osp_client():
+    await stop_ledger_compactor()
+    await stop_reconciler()
+    await stop_saga_workers()
+    await close_osp_client()
+    await async_engine.dispose()
+    stop_metrics_flusher()
+    shutdown_tracing()
+
 # --------- Versioned API Router ----------
 api_router = APIRouter(prefix=f"/api/dmb/{API_VERSION}")
 
@@ -16,6 +16,10 @@ from models.account import Account
 from models.service import Service
 from models.transaction import Transaction
 from models.payment import Payment
+from models.payment_saga import PaymentSaga, PaymentSagaAttempt
+from models.balance_hold import BalanceHold
+from models.ledger import LedgerPosting, BalanceSnapshot
+from models.idempotency_key import IdempotencyKey
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
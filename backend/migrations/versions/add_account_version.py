@@ -0,0 +1,19 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_account_version"
+down_revision = "add_payment_sagas"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Base.metadata.create_all() may already have built the column on fresh DBs
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("accounts")}
+    if "version" not in columns:
+        op.add_column("accounts", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,37 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_balance_holds"
+down_revision = "add_account_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Base.metadata.create_all() may already have built the table/column on fresh DBs
+    inspector = sa.inspect(op.get_bind())
+
+    if "held" not in {c["name"] for c in inspector.get_columns("accounts")}:
+        op.add_column("accounts", sa.Column("held", sa.Numeric(12, 2), nullable=False, server_default="0"))
+
+    if "balance_holds" not in set(inspector.get_table_names()):
+        op.create_table(
+            "balance_holds",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id"), nullable=False),
+            sa.Column("payment_id", sa.Integer(), sa.ForeignKey("payments.id"), nullable=False, unique=True),
+            sa.Column("amount", sa.Numeric(12, 2), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+    op.create_index("ix_balance_holds_id", "balance_holds", ["id"], if_not_exists=True)
+    op.create_index("ix_balance_holds_account_id", "balance_holds", ["account_id"], if_not_exists=True)
+    op.create_index("ix_balance_holds_status_expires", "balance_holds", ["status", "expires_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("balance_holds")
+    with op.batch_alter_table("accounts") as batch_op:
+        batch_op.drop_column("held")
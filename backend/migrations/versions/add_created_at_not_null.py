@@ -0,0 +1,42 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_created_at_not_null"
+down_revision = "add_unique_transaction_ids"
+branch_labels = None
+depends_on = None
+
+# keyset pagination cursors are (created_at, id): a NULL created_at cannot be paged past
+_BACKFILL = {
+    "payments": (
+        "UPDATE payments SET created_at = COALESCE("
+        "confirmed_at, cdc_transaction_datetime_utc, "
+        "(SELECT MIN(p.created_at) FROM payments p), CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    ),
+    "transactions": (
+        "UPDATE transactions SET created_at = COALESCE("
+        "(SELECT p.created_at FROM payments p WHERE p.id = transactions.payment_id), "
+        "(SELECT MIN(t.created_at) FROM transactions t), CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    ),
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, backfill in _BACKFILL.items():
+        # Base.metadata.create_all() builds the column NOT NULL on fresh DBs
+        columns = {c["name"]: c for c in inspector.get_columns(table)}
+        if not columns["created_at"]["nullable"]:
+            continue
+        # rows inserted without the ORM default: closest known time, else the oldest one in the table
+        op.execute(backfill)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column("created_at", existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    for table in ("transactions", "payments"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column("created_at", existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,30 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_idempotency_keys"
+down_revision = "add_ledger"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Base.metadata.create_all() may already have built the table on fresh DBs
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "idempotency_keys" not in existing:
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("key_hash", sa.String(64), primary_key=True),
+            sa.Column("fingerprint", sa.String(64), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("response_status", sa.Integer(), nullable=True),
+            sa.Column("response_headers", sa.Text(), nullable=True),
+            sa.Column("response_body", sa.LargeBinary(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("idempotency_keys")
@@ -0,0 +1,28 @@
+from alembic import op
+
+revision = "add_keyset_pagination_indexes"
+down_revision = "add_invoice_currency"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # if_not_exists: Base.metadata.create_all() may already have built them on fresh DBs
+    op.create_index(
+        "ix_transactions_user_created", "transactions",
+        ["user_id", "created_at", "id"], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_transactions_created_id", "transactions",
+        ["created_at", "id"], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_payments_created_id", "payments",
+        ["created_at", "id"], if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_payments_created_id", table_name="payments", if_exists=True)
+    op.drop_index("ix_transactions_created_id", table_name="transactions", if_exists=True)
+    op.drop_index("ix_transactions_user_created", table_name="transactions", if_exists=True)
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_ledger"
+down_revision = "add_balance_holds"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Base.metadata.create_all() may already have built the tables on fresh DBs
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "ledger_postings" not in existing:
+        op.create_table(
+            "ledger_postings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("entry_id", sa.String(40), nullable=False),
+            sa.Column("ledger", sa.String(), nullable=False),
+            sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id"), nullable=True),
+            sa.Column("amount", sa.Numeric(12, 2), nullable=False),
+            sa.Column("currency", sa.String(), nullable=True),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_ledger_postings_id", "ledger_postings", ["id"], if_not_exists=True)
+    op.create_index("ix_ledger_postings_entry_id", "ledger_postings", ["entry_id"], if_not_exists=True)
+    op.create_index("ix_ledger_postings_account_id_id", "ledger_postings", ["account_id", "id"], if_not_exists=True)
+
+    if "balance_snapshots" not in existing:
+        op.create_table(
+            "balance_snapshots",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("account_id", sa.Integer(), sa.ForeignKey("accounts.id"), nullable=False),
+            sa.Column("last_posting_id", sa.Integer(), nullable=False),
+            sa.Column("balance", sa.Numeric(12, 2), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_balance_snapshots_id", "balance_snapshots", ["id"], if_not_exists=True)
+    op.create_index(
+        "ix_balance_snapshots_account_posting",
+        "balance_snapshots",
+        ["account_id", "last_posting_id"],
+        unique=True,
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_balance_snapshots_account_created", "balance_snapshots", ["account_id", "created_at"], if_not_exists=True
+    )
+
+    # Existing accounts: their current balance opens their ledger history
+    now = datetime.utcnow()
+    for ledger, account_id, sign in (("customer", "accounts.id", ""), ("opening", "NULL", "-")):
+        op.get_bind().execute(
+            sa.text(
+                "INSERT INTO ledger_postings (entry_id, ledger, account_id, amount, currency, description, created_at) "
+                f"SELECT 'OPEN-' || accounts.id, '{ledger}', {account_id}, {sign}COALESCE(accounts.balance, 0), "
+                "accounts.currency, 'Opening balance', :now FROM accounts "
+                "WHERE NOT EXISTS (SELECT 1 FROM ledger_postings p "
+                f"WHERE p.entry_id = 'OPEN-' || accounts.id AND p.ledger = '{ledger}')"
+            ),
+            {"now": now},
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("balance_snapshots")
+    op.drop_table("ledger_postings")
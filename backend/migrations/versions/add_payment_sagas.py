@@ -0,0 +1,53 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_payment_sagas"
+down_revision = "add_query_pattern_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Base.metadata.create_all() may already have built the tables on fresh DBs
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "payment_sagas" not in existing:
+        op.create_table(
+            "payment_sagas",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("payment_id", sa.Integer(), sa.ForeignKey("payments.id"), nullable=False, unique=True),
+            sa.Column("step", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("transaction_id", sa.String(32), nullable=False),
+            sa.Column("request_id", sa.String(), nullable=True),
+            sa.Column("last_error", sa.String(), nullable=True),
+            sa.Column("next_run_at", sa.DateTime(), nullable=False),
+            sa.Column("lease_owner", sa.String(), nullable=True),
+            sa.Column("lease_expires_at", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+    op.create_index("ix_payment_sagas_id", "payment_sagas", ["id"], if_not_exists=True)
+    op.create_index("ix_payment_sagas_status_next_run", "payment_sagas", ["status", "next_run_at"], if_not_exists=True)
+
+    if "payment_saga_attempts" not in existing:
+        op.create_table(
+            "payment_saga_attempts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("saga_id", sa.Integer(), sa.ForeignKey("payment_sagas.id"), nullable=False),
+            sa.Column("step", sa.String(), nullable=False),
+            sa.Column("attempt", sa.Integer(), nullable=False),
+            sa.Column("outcome", sa.String(), nullable=False),
+            sa.Column("error", sa.String(), nullable=True),
+            sa.Column("worker", sa.String(), nullable=True),
+            sa.Column("duration_ms", sa.Float(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+    op.create_index("ix_payment_saga_attempts_id", "payment_saga_attempts", ["id"], if_not_exists=True)
+    op.create_index("ix_payment_saga_attempts_saga_id", "payment_saga_attempts", ["saga_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("payment_saga_attempts")
+    op.drop_table("payment_sagas")
@@ -0,0 +1,26 @@
+from alembic import op
+
+revision = "add_query_pattern_indexes"
+down_revision = "add_keyset_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+# name -> (table, columns); mirrors the Index() definitions on the models
+INDEXES = {
+    "ix_accounts_user_id": ("accounts", ["user_id"]),
+    "ix_transactions_account_created": ("transactions", ["account_id", "created_at"]),
+    "ix_transactions_payment_id": ("transactions", ["payment_id"]),
+    "ix_payments_user_created": ("payments", ["user_id", "created_at"]),
+    "ix_payments_status_created": ("payments", ["status", "created_at"]),
+}
+
+
+def upgrade() -> None:
+    # if_not_exists: Base.metadata.create_all() may already have built them on fresh DBs
+    for name, (table, columns) in INDEXES.items():
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,22 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_saga_trace_context"
+down_revision = "add_created_at_not_null"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Base.metadata.create_all() may already have built the columns on fresh DBs
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("payment_sagas")}
+    if "trace_id" not in columns:
+        op.add_column("payment_sagas", sa.Column("trace_id", sa.String(32), nullable=True))
+    if "span_id" not in columns:
+        op.add_column("payment_sagas", sa.Column("span_id", sa.String(16), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("payment_sagas") as batch_op:
+        batch_op.drop_column("span_id")
+        batch_op.drop_column("trace_id")
@@ -0,0 +1,18 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = "add_unique_transaction_ids"
+down_revision = "add_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # transaction ids are generated in memory (core/utils/txid.py): the DB refuses a repeated one
+    op.create_index(
+        "ux_payment_sagas_transaction_id", "payment_sagas", ["transaction_id"], unique=True, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_payment_sagas_transaction_id", table_name="payment_sagas")
@@ -2,4 +2,8 @@ from .user import User
 from .account import Account
 from .payment import Payment
 from .transaction import Transaction
-from .service import Service
\ No newline at end of file
+from .service import Service
+from .payment_saga import PaymentSaga, PaymentSagaAttempt
+from .balance_hold import BalanceHold
+from .ledger import LedgerPosting, BalanceSnapshot
+from .idempotency_key import IdempotencyKey
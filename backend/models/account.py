@@ -8,12 +8,18 @@ class Account(Base):
     __tablename__ = "accounts"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     number = Column(String, unique=True, nullable=False, index=True)
     balance = Column(Numeric(12, 2), default=Decimal("0.00"))
     currency = Column(String, default="USD")
+    # sum of active BalanceHold amounts; available = balance - held
+    held = Column(Numeric(12, 2), nullable=False, default=Decimal("0.00"), server_default="0")
+    # bumped by every balance write; ORM updates check it (see services/account_balance.py)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="accounts")
     payments = relationship("Payment", back_populates="account")
     transactions = relationship("Transaction", back_populates="account")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,30 @@
+#backend\models\balance_hold.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Index
+from datetime import datetime
+from sqlalchemy.orm import relationship
+from db.base import Base
+
+
+class BalanceHold(Base):
+    """Funds reserved on an account for one payment (see services.account_balance)."""
+
+    __tablename__ = "balance_holds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=False, unique=True)
+    amount = Column(Numeric(12, 2), nullable=False)
+    # held (counted in Account.held) | captured (debited) | released
+    status = Column(String, nullable=False, default="held")
+    # an unconfirmed payment's hold is released after this
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    account = relationship("Account")
+    payment = relationship("Payment")
+
+    __table_args__ = (
+        # expiry sweep: held holds by expiry time
+        Index("ix_balance_holds_status_expires", "status", "expires_at"),
+    )
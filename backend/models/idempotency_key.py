@@ -0,0 +1,23 @@
+#backend\models\idempotency_key.py
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Text
+from datetime import datetime
+from db.base import Base
+
+
+class IdempotencyKey(Base):
+    """Stored outcome of a request sent with an Idempotency-Key header (see core.idempotency)."""
+
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of caller (Authorization) + Idempotency-Key
+    key_hash = Column(String(64), primary_key=True)
+    # sha256 of method, path, query and body: the same key must not be reused for another request
+    fingerprint = Column(String(64), nullable=False)
+    # pending (running; owner may be taken over after expires_at) | done
+    status = Column(String, nullable=False, default="pending")
+    response_status = Column(Integer, nullable=True)
+    # JSON list of [name, value] pairs
+    response_headers = Column(Text, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,48 @@
+#backend\models\ledger.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Index
+from datetime import datetime
+from db.base import Base
+
+
+class LedgerPosting(Base):
+    """One leg of a double-entry journal entry; append-only (see services.ledger)."""
+
+    __tablename__ = "ledger_postings"
+
+    # increasing id = posting order; snapshots record the last id they cover
+    id = Column(Integer, primary_key=True, index=True)
+    # journal entry (transaction id, R<transaction id> for refunds, ADJ-/OPEN- ids); its legs sum to zero
+    entry_id = Column(String(40), nullable=False, index=True)
+    # customer | osp_clearing | adjustment | opening
+    ledger = Column(String, nullable=False)
+    # set on customer legs only
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
+    # signed: positive credits the ledger, negative debits it
+    amount = Column(Numeric(12, 2), nullable=False)
+    currency = Column(String, default="USD")
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # balance delta since a snapshot / as-of queries
+        Index("ix_ledger_postings_account_id_id", "account_id", "id"),
+    )
+
+
+class BalanceSnapshot(Base):
+    """Balance of an account after all postings up to last_posting_id."""
+
+    __tablename__ = "balance_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    last_posting_id = Column(Integer, nullable=False, default=0)
+    balance = Column(Numeric(12, 2), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # latest snapshot of an account; unique: concurrent passes cannot snapshot the same watermark twice
+        Index("ix_balance_snapshots_account_posting", "account_id", "last_posting_id", unique=True),
+        # latest snapshot taken before a point in time
+        Index("ix_balance_snapshots_account_created", "account_id", "created_at"),
+    )
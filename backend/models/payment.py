@@ -1,5 +1,5 @@
 #backend\models\payment.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Index
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from db.base import Base
@@ -27,9 +27,18 @@ class Payment(Base):
     reversal_transaction_id = Column(String, nullable=True)
     reversal_acknowledgement_id = Column(String, nullable=True)
     status = Column(String, default="started")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     confirmed_at = Column(DateTime, nullable=True)
 
     account = relationship("Account", back_populates="payments")
     service = relationship("Service", back_populates="payments")
     transaction = relationship("Transaction", back_populates="payment", uselist=False)
+
+    __table_args__ = (
+        # keyset pagination on (created_at, id): admin payment list
+        Index("ix_payments_created_id", "created_at", "id"),
+        # admin user detail / user payments: user_id filter + created_at order/range
+        Index("ix_payments_user_created", "user_id", "created_at"),
+        # admin status filters and stuck-payment scans by status + age
+        Index("ix_payments_status_created", "status", "created_at"),
+    )
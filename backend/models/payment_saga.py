@@ -0,0 +1,62 @@
+#backend\models\payment_saga.py
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Index
+from datetime import datetime
+from sqlalchemy.orm import relationship
+from db.base import Base
+
+
+class PaymentSaga(Base):
+    """Persisted state of one payment's confirm flow (see services.payment_saga)."""
+
+    __tablename__ = "payment_sagas"
+
+    id = Column(Integer, primary_key=True, index=True)
+    payment_id = Column(Integer, ForeignKey("payments.id"), nullable=False, unique=True)
+    # lookup → commit → debit → confirm, or reverse when compensating
+    step = Column(String, nullable=False, default="lookup")
+    # pending (runnable / running) | succeeded | failed
+    status = Column(String, nullable=False, default="pending")
+    # failed (or abandoned) attempts of the current step
+    attempts = Column(Integer, nullable=False, default=0)
+    transaction_id = Column(String(32), nullable=False)
+    # request that enqueued the saga, so worker logs correlate with it
+    request_id = Column(String, nullable=True)
+    # span of that request (if sampled): the worker's spans continue its trace
+    trace_id = Column(String(32), nullable=True)
+    span_id = Column(String(16), nullable=True)
+    last_error = Column(String, nullable=True)
+    next_run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # worker holding the saga; another worker may take over once the lease expires
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    payment = relationship("Payment")
+    attempts_log = relationship("PaymentSagaAttempt", back_populates="saga", order_by="PaymentSagaAttempt.id")
+
+    __table_args__ = (
+        # worker claim query: runnable sagas by due time
+        Index("ix_payment_sagas_status_next_run", "status", "next_run_at"),
+        # generated in memory (core/utils/txid.py): refuse a repeated id
+        Index("ux_payment_sagas_transaction_id", "transaction_id", unique=True),
+    )
+
+
+class PaymentSagaAttempt(Base):
+    """One executed step of a saga (append-only audit trail)."""
+
+    __tablename__ = "payment_saga_attempts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    saga_id = Column(Integer, ForeignKey("payment_sagas.id"), nullable=False, index=True)
+    step = Column(String, nullable=False)
+    attempt = Column(Integer, nullable=False)
+    # ok | retry | failed | abandoned (its worker died mid-step; logged by the worker taking over)
+    outcome = Column(String, nullable=False)
+    error = Column(String, nullable=True)
+    worker = Column(String, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    saga = relationship("PaymentSaga", back_populates="attempts_log")
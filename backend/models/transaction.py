@@ -1,5 +1,5 @@
 #backend\models\transaction.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Index
 from datetime import datetime
 from sqlalchemy.orm import relationship
 from db.base import Base
@@ -17,7 +17,17 @@ class Transaction(Base):
     currency = Column(String, default="USD")
     direction = Column(String, default="debit")
     description = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     account = relationship("Account", back_populates="transactions")
     payment = relationship("Payment", back_populates="transaction")
+
+    __table_args__ = (
+        # keyset pagination on (created_at, id): /transactions (per user) and admin list
+        Index("ix_transactions_user_created", "user_id", "created_at", "id"),
+        Index("ix_transactions_created_id", "created_at", "id"),
+        # /accounts/{id}/transactions: account_id filter, newest first
+        Index("ix_transactions_account_created", "account_id", "created_at"),
+        # Payment.transaction joins / eager loads
+        Index("ix_transactions_payment_id", "payment_id"),
+    )
@@ -46,9 +46,12 @@ class PaymentAdminOut(BaseModel):
 
 class PaginatedAdminPayments(BaseModel):
     items: List[PaymentAdminOut]
-    total: int
+    # None when requested with total=none
+    total: Optional[int] = None
     limit: int
     offset: int
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 
 class PaymentStatusUpdateIn(BaseModel):
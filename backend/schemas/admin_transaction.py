@@ -34,9 +34,12 @@ class AdminTransactionOut(BaseModel):
 
 class PaginatedAdminTransactions(BaseModel):
     items: List[AdminTransactionOut]
-    total: int
+    # None when requested with total=none
+    total: Optional[int] = None
     limit: int
     offset: int
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 
 class AdminTransactionDeleteOut(BaseModel):
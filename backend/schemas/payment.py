@@ -1,9 +1,9 @@
 # backend/schemas/payment.py
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PaymentServiceInfo(BaseModel):
@@ -12,6 +12,44 @@ class PaymentServiceInfo(BaseModel):
     logo_url: Optional[str] = None
 
 
+class PaymentLookupBatchIn(BaseModel):
+    reference_numbers: List[str] = Field(..., min_length=1)
+
+
+class PaymentBatchIn(BaseModel):
+    account_id: int
+    service_id: int
+    pin: str
+    reference_numbers: List[str] = Field(..., min_length=1)
+
+
+class PaymentBatchItemOut(BaseModel):
+    index: int
+    reference_number: str
+    # confirmed | processing | reversed | failed | reversal_failed | lookup-failed | skipped
+    status: str
+
+    payment_id: Optional[int] = None
+    transaction_id: Optional[str] = None
+    total_amount: Optional[Decimal] = None
+    detail: Optional[str] = None
+    # still processing: poll this
+    status_url: Optional[str] = None
+
+
+class PaymentBatchOut(BaseModel):
+    account_id: int
+    currency: str
+    # debited up front for every payable invoice; failed items are refunded
+    total_reserved: Decimal
+    new_balance: Decimal
+
+    confirmed: int
+    processing: int
+    failed: int
+    items: List[PaymentBatchItemOut]
+
+
 class PaymentStartOut(BaseModel):
     payment_id: int
     reference_number: str
@@ -72,3 +110,20 @@ class PaymentConfirmOut(BaseModel):
 
     created_at: Optional[datetime] = None
     confirmed_at: Optional[datetime] = None
+
+
+class PaymentStatusOut(BaseModel):
+    """Pollable state of a payment whose confirm runs as a background saga."""
+
+    payment_id: int
+    status: str
+
+    # saga progress (None before confirm was requested)
+    step: Optional[str] = None
+    saga_status: Optional[str] = None
+    attempts: Optional[int] = None
+    next_run_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    # full confirm result once the payment is confirmed
+    result: Optional[PaymentConfirmOut] = None
@@ -29,6 +29,9 @@ class TransactionOut(BaseModel):
 
 class PaginatedTransactions(BaseModel):
     items: List[TransactionOut]
-    total: int
+    # None when requested with total=none
+    total: Optional[int] = None
     page: int
     page_size: int
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: Optional[str] = None
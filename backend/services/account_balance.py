@@ -0,0 +1,265 @@
+# backend/services/account_balance.py
+"""
+Account balance writes without a global lock.
+
+Payment debits and refunds never read-modify-write the balance in Python:
+
+    UPDATE accounts SET balance = balance - :amount, version = version + 1
+    WHERE id = :id AND balance - held >= :amount
+
+The check and the write are one statement under the row lock every
+database takes for an UPDATE (Postgres re-evaluates the WHERE after
+waiting on a concurrent writer), so any number of workers can debit the
+same hot account without losing updates or overdrawing it, and payments
+on different accounts never wait on each other.
+
+Holds reserve funds between POST /payments/start and the saga's debit
+step, so the OSP round trips in between run outside any DB transaction:
+
+    place_hold      held += amount          (if balance - held >= amount)
+    capture_hold    balance -= amount, held -= amount
+    release_hold    held -= amount          (failed / canceled / expired payments)
+
+Each is a conditional UPDATE of the BalanceHold row (held → captured /
+released) plus one of the account row, committed by the caller with the
+rest of its (short) transaction. Every path taking a payment out of
+`started` other than the debit releases its hold; as a safety net
+release_stale_holds() releases holds of payments never confirmed after
+PAYMENT_HOLD_TTL, and holds of payments that are done by any other way.
+
+Every change of the balance itself is also posted to the ledger
+(services.ledger) by the caller, in the same transaction; update_account()
+posts the difference an admin edit makes as an adjustment.
+
+`Account.version` is the mapper's version counter: ORM writes (the
+admin balance/account edits) are `... WHERE id = :id AND version = :seen`
+and fail with StaleDataError if anything changed the row since it was
+read. update_account() reads the row with SELECT ... FOR UPDATE (a
+no-op on SQLite, where the version check does the work) and re-applies
+the edit on a fresh copy up to ACCOUNT_UPDATE_RETRIES times.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import and_, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from core.config import settings
+from models import Account, BalanceHold, Payment
+from services.ledger import ADJUSTMENT, new_adjustment_id, post_entry
+
+HELD = "held"
+CAPTURED = "captured"
+RELEASED = "released"
+
+# payment statuses whose hold is still needed: captured by the saga's debit step, or
+# released by the reverse step once reconciliation gets OSP to reverse (reversal_failed)
+_HOLDING_STATUSES = ("started", "processing", "committed", "reversal_failed")
+
+
+class InsufficientBalance(Exception):
+    """The account does not hold the amount to debit."""
+
+
+def _account_update(account_id: int, *conditions, **values):
+    return (
+        update(Account)
+        .where(Account.id == account_id, *conditions)
+        .values(version=Account.version + 1, **values)
+        .returning(Account.balance)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _update_account_row(db: AsyncSession, account_id: int, *conditions, **values) -> Optional[Decimal]:
+    return (await db.execute(_account_update(account_id, *conditions, **values))).scalar()
+
+
+async def debit_account(db: AsyncSession, account_id: int, amount: Decimal) -> Decimal:
+    """Take `amount` off the available balance if it is there; returns the new balance."""
+    balance = await _update_account_row(
+        db, account_id, Account.balance - Account.held >= amount, balance=Account.balance - amount
+    )
+    if balance is None:
+        raise InsufficientBalance(account_id)
+    return balance
+
+
+async def credit_account(db: AsyncSession, account_id: int, amount: Decimal) -> Decimal:
+    """Add `amount` to the balance; returns the new balance."""
+    balance = await _update_account_row(db, account_id, balance=Account.balance + amount)
+    if balance is None:
+        raise LookupError(f"Account {account_id} not found")
+    return balance
+
+
+# --- Holds ---
+def _hold_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.PAYMENT_HOLD_TTL)
+
+
+async def _reserve(db: AsyncSession, account_id: int, amount: Decimal) -> None:
+    reserved = await _update_account_row(
+        db, account_id, Account.balance - Account.held >= amount, held=Account.held + amount
+    )
+    if reserved is None:
+        raise InsufficientBalance(account_id)
+
+
+def _hold_settle(payment_id: int, status: str, *conditions):
+    return (
+        update(BalanceHold)
+        .where(BalanceHold.payment_id == payment_id, BalanceHold.status == HELD, *conditions)
+        .values(status=status, updated_at=datetime.utcnow())
+        .returning(BalanceHold.account_id, BalanceHold.amount)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _settle_hold(db: AsyncSession, payment_id: int, status: str) -> Optional[BalanceHold]:
+    """Move the payment's active hold to `status`; None if it had none (or another worker got there first)."""
+    return (await db.execute(_hold_settle(payment_id, status))).first()
+
+
+async def place_hold(db: AsyncSession, payment: Payment, amount: Decimal) -> None:
+    """Reserve `amount` for a flushed `payment` (InsufficientBalance if not available)."""
+    await _reserve(db, payment.account_id, amount)
+    db.add(
+        BalanceHold(
+            account_id=payment.account_id,
+            payment_id=payment.id,
+            amount=amount,
+            status=HELD,
+            expires_at=_hold_expiry(),
+            created_at=datetime.utcnow(),
+        )
+    )
+
+
+async def renew_hold(db: AsyncSession, payment: Payment, amount: Decimal) -> None:
+    """
+    Make sure `payment` has its funds held before it is confirmed: the
+    hold may have expired since start (or predate holds altogether).
+    """
+    hold = (await db.execute(select(BalanceHold).filter_by(payment_id=payment.id))).scalars().first()
+    if hold is None:
+        await place_hold(db, payment, amount)
+        return
+    if hold.status == HELD:
+        hold.expires_at = _hold_expiry()
+        return
+    if hold.status == RELEASED:
+        revived = await db.execute(
+            update(BalanceHold)
+            .where(BalanceHold.id == hold.id, BalanceHold.status == RELEASED)
+            .values(status=HELD, expires_at=_hold_expiry(), updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if revived.rowcount == 1:
+            await _reserve(db, hold.account_id, hold.amount)
+
+
+async def capture_hold(db: AsyncSession, payment_id: int) -> bool:
+    """Turn the payment's hold into the debit; False if it has no active hold."""
+    hold = await _settle_hold(db, payment_id, CAPTURED)
+    if hold is None:
+        return False
+    await _update_account_row(
+        db, hold.account_id, balance=Account.balance - hold.amount, held=Account.held - hold.amount
+    )
+    return True
+
+
+async def release_hold(db: AsyncSession, payment_id: int) -> bool:
+    """Give the payment's held funds back to the available balance; False if nothing was held."""
+    hold = await _settle_hold(db, payment_id, RELEASED)
+    if hold is None:
+        return False
+    await _update_account_row(db, hold.account_id, held=Account.held - hold.amount)
+    return True
+
+
+def release_hold_sync(db: Session, payment_id: int) -> bool:
+    """release_hold() for the sync admin routes; the caller commits."""
+    hold = db.execute(_hold_settle(payment_id, RELEASED)).first()
+    if hold is None:
+        return False
+    db.execute(_account_update(hold.account_id, held=Account.held - hold.amount))
+    return True
+
+
+async def release_stale_holds(db: AsyncSession, limit: int = 500) -> int:
+    """
+    Release the holds nothing will capture any more: expired holds of
+    payments never confirmed (still `started`), and holds of payments that
+    are done (failed, canceled, reversed, deleted, set by an admin, ...).
+    A `reversal_failed` payment keeps its hold until reconciliation settles it.
+    Returns how many.
+    """
+    now = datetime.utcnow()
+    in_use = exists().where(Payment.id == BalanceHold.payment_id, Payment.status.in_(_HOLDING_STATUSES))
+    unconfirmed = exists().where(Payment.id == BalanceHold.payment_id, Payment.status == "started")
+    stale = or_(~in_use, and_(BalanceHold.expires_at < now, unconfirmed))
+    payment_ids = list(
+        (
+            await db.execute(
+                select(BalanceHold.payment_id)
+                .where(BalanceHold.status == HELD, stale)
+                .order_by(BalanceHold.expires_at)
+                .limit(limit)
+            )
+        ).scalars()
+    )
+    released = 0
+    for payment_id in payment_ids:
+        # re-checked in the UPDATE: a confirm may have raced the read above
+        hold = (await db.execute(_hold_settle(payment_id, RELEASED, stale))).first()
+        if hold is not None:
+            await _update_account_row(db, hold.account_id, held=Account.held - hold.amount)
+            released += 1
+        await db.commit()
+    return released
+
+
+# --- Admin edits ---
+def update_account(
+    db: Session,
+    account_id: int,
+    apply: Callable[[Account], None],
+    user_id: Optional[int] = None,
+) -> Optional[Account]:
+    """
+    Run `apply` on the locked account row and commit; on a concurrent
+    write it is re-run on a fresh copy. None if the account does not
+    exist, 409 once the retries are used up.
+    """
+    attempts = max(1, settings.ACCOUNT_UPDATE_RETRIES)
+    for attempt in range(1, attempts + 1):
+        query = db.query(Account).filter(Account.id == account_id)
+        if user_id is not None:
+            query = query.filter(Account.user_id == user_id)
+        account = query.populate_existing().with_for_update().first()
+        if account is None:
+            db.rollback()
+            return None
+        before = Decimal(account.balance or 0)
+        apply(account)
+        delta = Decimal(account.balance or 0) - before
+        if delta:
+            post_entry(db, new_adjustment_id(), account.id, delta, ADJUSTMENT, account.currency, "Balance set by admin")
+        try:
+            db.commit()
+        except StaleDataError:
+            db.rollback()
+            logger.warning(
+                f"Account {account_id} changed concurrently (attempt {attempt}/{attempts}) | module=services.account_balance"
+            )
+            continue
+        db.refresh(account)
+        return account
+    raise HTTPException(status_code=409, detail="Account was updated concurrently, please retry")
@@ -0,0 +1,270 @@
+# backend/services/ledger.py
+"""
+Append-only double-entry ledger behind account balances.
+
+Every balance movement writes a journal entry of two postings that sum
+to zero: the customer leg (account_id set) and the internal ledger on
+the other side.
+
+    payment debit        customer -x    osp_clearing +x    entry = transaction id
+    refund               customer +x    osp_clearing -x    entry = R<transaction id>
+    admin balance edit   customer ±d    adjustment   ∓d    entry = ADJ-<uuid>
+    opening balance      customer +b    opening      -b    entry = OPEN-<account id>
+
+Postings are inserted in the same transaction as the Account.balance
+update they describe and never change afterwards. Account.balance stays
+the materialized current balance: O(1) to read, and the row the
+conditional debit checks funds against (services.account_balance).
+
+A compaction pass (every LEDGER_SNAPSHOT_INTERVAL seconds) writes a
+BalanceSnapshot for each account with new postings: its previous
+snapshot plus the sum of the postings since. The balance at any point in
+time is the last snapshot taken before it plus the postings after that
+snapshot, so an as-of query reads at most one interval of postings.
+Postings younger than LEDGER_SNAPSHOT_LAG are left for the next pass, so
+a snapshot never covers an id whose transaction has not committed yet.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional, Union
+
+from loguru import logger
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.session import AsyncSessionLocal
+from models import Account, BalanceSnapshot, LedgerPosting
+
+CUSTOMER = "customer"
+OSP_CLEARING = "osp_clearing"
+ADJUSTMENT = "adjustment"
+OPENING = "opening"
+
+_task: Optional[asyncio.Task] = None
+_lock: Optional[asyncio.Lock] = None
+_TOTALS = {"runs": 0, "snapshots": 0, "postings": 0, "seconds": 0.0}
+_last_run: Optional[dict] = None
+
+
+def post_entry(
+    db: Union[Session, AsyncSession],
+    entry_id: str,
+    account_id: int,
+    amount: Decimal,
+    counter_ledger: str,
+    currency: Optional[str] = "USD",
+    description: Optional[str] = None,
+) -> None:
+    """Add a journal entry: `amount` (signed) to the account, the opposite to `counter_ledger`."""
+    now = datetime.utcnow()
+    db.add_all(
+        [
+            LedgerPosting(
+                entry_id=entry_id,
+                ledger=CUSTOMER,
+                account_id=account_id,
+                amount=amount,
+                currency=currency,
+                description=description,
+                created_at=now,
+            ),
+            LedgerPosting(
+                entry_id=entry_id,
+                ledger=counter_ledger,
+                amount=-amount,
+                currency=currency,
+                description=description,
+                created_at=now,
+            ),
+        ]
+    )
+
+
+def post_opening_balance(db: Union[Session, AsyncSession], account: Account) -> None:
+    """First entry of a new (flushed) account, also when it opens at zero: its ledger history starts here."""
+    post_entry(
+        db,
+        f"OPEN-{account.id}",
+        account.id,
+        Decimal(account.balance or 0),
+        OPENING,
+        account.currency,
+        "Opening balance",
+    )
+
+
+def new_adjustment_id() -> str:
+    return f"ADJ-{uuid.uuid4().hex}"
+
+
+async def get_balance_as_of(db: AsyncSession, account_id: int, as_of: Optional[datetime] = None) -> Optional[dict]:
+    """
+    Ledger balance of the account at `as_of` (now if None): last snapshot
+    taken by then + the postings after it. None if the account had no
+    ledger history yet at that time.
+    """
+    snapshots = select(BalanceSnapshot).where(BalanceSnapshot.account_id == account_id)
+    postings = select(func.coalesce(func.sum(LedgerPosting.amount), 0), func.count(LedgerPosting.id)).where(
+        LedgerPosting.account_id == account_id
+    )
+    if as_of is not None:
+        snapshots = snapshots.where(BalanceSnapshot.created_at <= as_of)
+        postings = postings.where(LedgerPosting.created_at <= as_of)
+    snapshot = (
+        await db.execute(snapshots.order_by(BalanceSnapshot.last_posting_id.desc()).limit(1))
+    ).scalars().first()
+    if snapshot is not None:
+        postings = postings.where(LedgerPosting.id > snapshot.last_posting_id)
+    delta, count = (await db.execute(postings)).one()
+    if snapshot is None and count == 0:
+        return None
+    balance = (Decimal(snapshot.balance) if snapshot else Decimal("0.00")) + Decimal(delta)
+    return {
+        "account_id": account_id,
+        "as_of": (as_of or datetime.utcnow()).isoformat(),
+        "balance": balance.quantize(Decimal("0.01")),
+        "snapshot_at": snapshot.created_at.isoformat() if snapshot else None,
+        "snapshot_posting_id": snapshot.last_posting_id if snapshot else None,
+        "postings_since_snapshot": count,
+    }
+
+
+async def compact_balances() -> dict:
+    """One compaction pass: a new snapshot for every account with postings since its last one."""
+    global _lock, _last_run
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        cutoff = started_at - timedelta(seconds=settings.LEDGER_SNAPSHOT_LAG)
+        snapshots = postings = 0
+
+        async with AsyncSessionLocal() as db:
+            watermark = (
+                await db.execute(select(func.max(LedgerPosting.id)).where(LedgerPosting.created_at < cutoff))
+            ).scalar()
+            if watermark is not None:
+                latest = (
+                    select(
+                        BalanceSnapshot.account_id,
+                        func.max(BalanceSnapshot.last_posting_id).label("last_posting_id"),
+                    )
+                    .group_by(BalanceSnapshot.account_id)
+                    .subquery()
+                )
+                rows = (
+                    await db.execute(
+                        select(
+                            LedgerPosting.account_id,
+                            BalanceSnapshot.balance,
+                            func.sum(LedgerPosting.amount),
+                            func.count(LedgerPosting.id),
+                        )
+                        .outerjoin(latest, latest.c.account_id == LedgerPosting.account_id)
+                        .outerjoin(
+                            BalanceSnapshot,
+                            and_(
+                                BalanceSnapshot.account_id == latest.c.account_id,
+                                BalanceSnapshot.last_posting_id == latest.c.last_posting_id,
+                            ),
+                        )
+                        .where(
+                            LedgerPosting.account_id.is_not(None),
+                            LedgerPosting.id > func.coalesce(latest.c.last_posting_id, 0),
+                            LedgerPosting.id <= watermark,
+                        )
+                        .group_by(LedgerPosting.account_id, BalanceSnapshot.balance)
+                    )
+                ).all()
+                if rows:
+                    try:
+                        await db.execute(
+                            insert(BalanceSnapshot),
+                            [
+                                {
+                                    "account_id": account_id,
+                                    "last_posting_id": watermark,
+                                    "balance": (Decimal(previous or 0) + Decimal(delta)).quantize(Decimal("0.01")),
+                                    "created_at": started_at,
+                                }
+                                for account_id, previous, delta, _ in rows
+                            ],
+                        )
+                        await db.commit()
+                        snapshots = len(rows)
+                        postings = sum(row[3] for row in rows)
+                    except IntegrityError:
+                        # another process compacted up to the same watermark
+                        await db.rollback()
+
+        seconds = time.perf_counter() - started
+        _TOTALS["runs"] += 1
+        _TOTALS["snapshots"] += snapshots
+        _TOTALS["postings"] += postings
+        _TOTALS["seconds"] += seconds
+        _last_run = {
+            "started_at": started_at.isoformat(),
+            "duration_seconds": round(seconds, 3),
+            "watermark": watermark,
+            "snapshots": snapshots,
+            "postings": postings,
+        }
+    if snapshots:
+        logger.info(
+            f"[Ledger] {snapshots} snapshots over {postings} postings up to id={watermark} in {seconds:.2f}s | module=services.ledger"
+        )
+    return _last_run
+
+
+async def get_ledger_stats() -> dict:
+    """Last compaction run, totals (this process) and the postings not yet covered by a snapshot (database)."""
+    async with AsyncSessionLocal() as db:
+        covered = (await db.execute(select(func.max(BalanceSnapshot.last_posting_id)))).scalar() or 0
+        pending = (
+            await db.execute(
+                select(func.count(LedgerPosting.id)).where(
+                    LedgerPosting.account_id.is_not(None), LedgerPosting.id > covered
+                )
+            )
+        ).scalar()
+    return {
+        "interval_seconds": settings.LEDGER_SNAPSHOT_INTERVAL,
+        "last_run": _last_run,
+        "totals": {**_TOTALS, "seconds": round(_TOTALS["seconds"], 3)},
+        "covered_posting_id": covered,
+        "postings_since_snapshot": pending,
+    }
+
+
+async def _loop() -> None:
+    while True:
+        await asyncio.sleep(settings.LEDGER_SNAPSHOT_INTERVAL)
+        try:
+            await compact_balances()
+        except Exception:
+            logger.exception("[Ledger] compaction failed | module=services.ledger")
+
+
+def start_ledger_compactor() -> None:
+    """Schedule periodic compaction on the running loop (app startup); LEDGER_SNAPSHOT_INTERVAL=0 disables it."""
+    global _task
+    if _task is not None or settings.LEDGER_SNAPSHOT_INTERVAL <= 0:
+        return
+    _task = asyncio.create_task(_loop(), name="ledger-compactor")
+    logger.info(f"Ledger compaction scheduled every {settings.LEDGER_SNAPSHOT_INTERVAL:g}s | module=services.ledger")
+
+
+async def stop_ledger_compactor() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    await asyncio.gather(_task, return_exceptions=True)
+    _task = None
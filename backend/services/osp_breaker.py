@@ -0,0 +1,255 @@
+# backend/services/osp_breaker.py
+import asyncio
+import functools
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+from loguru import logger
+
+from core.config import settings
+from core.metrics import OSP_ERRORS, OSP_LATENCY
+from core.tracing import start_span
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class OSPUnavailableError(HTTPException):
+    """Raised without calling OSP while the endpoint's circuit is open."""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"OSP temporarily unavailable ({endpoint}). Please try again later.",
+            headers={"Retry-After": str(max(int(math.ceil(retry_after)), 1))},
+        )
+        self.endpoint = endpoint
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker over a rolling window of the last N calls.
+
+    - A call counts as failed on transport errors, timeouts and 5xx
+      responses, or when it is slower than `slow_call_seconds`.
+      4xx responses (e.g. 423 already paid) are business answers.
+    - CLOSED → OPEN when the failure rate over at least `min_calls`
+      calls reaches `failure_rate`.
+    - OPEN fast-fails for `open_seconds`, then HALF_OPEN lets
+      `half_open_probes` calls through; one failure re-opens,
+      all probes succeeding closes the circuit.
+
+    Only `adaptive_timeout` breakers shorten the call budget to what OSP
+    usually takes; the others always give a call the full OSP_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_rate: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        window_size: Optional[int] = None,
+        open_seconds: Optional[float] = None,
+        half_open_probes: Optional[int] = None,
+        adaptive_timeout: bool = True,
+    ):
+        self.name = name
+        self.adaptive_timeout = adaptive_timeout
+        self.failure_rate = failure_rate if failure_rate is not None else settings.OSP_CB_FAILURE_RATE
+        self.slow_call_seconds = slow_call_seconds if slow_call_seconds is not None else settings.OSP_CB_SLOW_CALL_SECONDS
+        self.min_calls = min_calls if min_calls is not None else settings.OSP_CB_MIN_CALLS
+        self.open_seconds = open_seconds if open_seconds is not None else settings.OSP_CB_OPEN_SECONDS
+        self.half_open_probes = half_open_probes if half_open_probes is not None else settings.OSP_CB_HALF_OPEN_PROBES
+        size = window_size if window_size is not None else settings.OSP_CB_WINDOW_SIZE
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=size)  # True = failed
+        self._latencies: Deque[float] = deque(maxlen=size)  # successful and timed-out calls
+        self._probes_in_flight = 0
+        self._probes_ok = 0
+        self.rejected = 0
+
+    # --- state ---
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.bind(endpoint=self.name, old_state=self.state, new_state=state).warning(
+            f"[OSP][breaker] {self.name} {self.state} → {state}"
+        )
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state in (OPEN, HALF_OPEN):
+            # latency seen before the outage says nothing about OSP after it
+            self._latencies.clear()
+        if state in (CLOSED, HALF_OPEN):
+            self._probes_in_flight = 0
+            self._probes_ok = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def before_call(self) -> None:
+        if self.state == OPEN:
+            remaining = self.open_seconds - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise OSPUnavailableError(self.name, remaining)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.rejected += 1
+                raise OSPUnavailableError(self.name, self.open_seconds)
+            self._probes_in_flight += 1
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without recording an outcome."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record(self, failed: bool, elapsed: float, timed_out: bool = False) -> None:
+        """
+        A timed-out call is also a latency sample (at the budget it got):
+        otherwise a slower OSP could never raise the budget again.
+        """
+        if not failed and elapsed >= self.slow_call_seconds:
+            failed = True
+        if not failed or timed_out:
+            self._latencies.append(elapsed)
+
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if failed:
+                self._transition(OPEN)
+                return
+            self._probes_ok += 1
+            if self._probes_ok >= self.half_open_probes:
+                self._transition(CLOSED)
+            return
+
+        self._outcomes.append(failed)
+        calls = len(self._outcomes)
+        if self.state == CLOSED and calls >= self.min_calls:
+            if sum(self._outcomes) / calls >= self.failure_rate:
+                self._transition(OPEN)
+
+    # --- adaptive timeout ---
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        idx = min(int(math.ceil(q * len(ordered))) - 1, len(ordered) - 1)
+        return ordered[max(idx, 0)]
+
+    def timeout(self) -> float:
+        """
+        Call budget from observed latency: pXX * multiplier, clamped to
+        [OSP_TIMEOUT_MIN, OSP_TIMEOUT]. Falls back to OSP_TIMEOUT until
+        enough samples are collected, for half-open probes and when the
+        breaker is not `adaptive_timeout`.
+        """
+        ceiling = float(settings.OSP_TIMEOUT or 30)
+        if not self.adaptive_timeout or self.state == HALF_OPEN or len(self._latencies) < self.min_calls:
+            return ceiling
+        observed = self.percentile(settings.OSP_TIMEOUT_PERCENTILE) or ceiling
+        budget = observed * settings.OSP_TIMEOUT_MULTIPLIER
+        return min(max(budget, settings.OSP_TIMEOUT_MIN), ceiling)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failure_rate": round(sum(self._outcomes) / calls, 4) if calls else 0.0,
+            "p50": self.percentile(0.50),
+            "p99": self.percentile(0.99),
+            "timeout": round(self.timeout(), 3),
+            "rejected": self.rejected,
+        }
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(endpoint: str, adaptive_timeout: bool = True) -> CircuitBreaker:
+    breaker = _BREAKERS.get(endpoint)
+    if breaker is None:
+        breaker = _BREAKERS[endpoint] = CircuitBreaker(endpoint, adaptive_timeout=adaptive_timeout)
+    return breaker
+
+
+def get_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: b.stats() for name, b in _BREAKERS.items()}
+
+
+def _is_failure(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def _error_kind(exc: BaseException) -> str:
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"http_{exc.response.status_code}"
+    if isinstance(exc, httpx.TransportError):
+        return "transport"
+    return type(exc).__name__
+
+
+def osp_guard(
+    endpoint: str, adaptive_timeout: bool = False
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """
+    Wrap an OSP call with the endpoint's circuit breaker and timeout.
+
+    Only read-only calls may set `adaptive_timeout`: cutting a commit,
+    confirm or reverse short leaves OSP's side unknown (it may still
+    apply it), so those keep the full OSP_TIMEOUT.
+    """
+
+    def decorator(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with start_span(endpoint, **{"osp.endpoint": endpoint}) as span:
+                breaker = get_breaker(endpoint, adaptive_timeout)
+                span.set_attribute("osp.breaker_state", breaker.state)
+                try:
+                    breaker.before_call()
+                except OSPUnavailableError:
+                    OSP_ERRORS.inc(endpoint, "circuit_open")
+                    raise
+                budget = breaker.timeout()
+                span.set_attribute("osp.timeout", round(budget, 3))
+                started = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(fn(*args, **kwargs), timeout=budget)
+                except asyncio.CancelledError:
+                    # Client went away: not an OSP outcome
+                    breaker.release()
+                    raise
+                except Exception as e:
+                    elapsed = time.monotonic() - started
+                    breaker.record(_is_failure(e), elapsed, timed_out=isinstance(e, asyncio.TimeoutError))
+                    OSP_LATENCY.observe(elapsed, endpoint, "error")
+                    OSP_ERRORS.inc(endpoint, _error_kind(e))
+                    if isinstance(e, asyncio.TimeoutError):
+                        logger.bind(endpoint=endpoint, timeout=budget).error(f"[OSP][{endpoint}] timed out after {budget:.2f}s")
+                    raise
+                elapsed = time.monotonic() - started
+                breaker.record(False, elapsed)
+                OSP_LATENCY.observe(elapsed, endpoint, "ok")
+                return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,149 @@
+# backend/services/osp_cache.py
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from core.config import settings
+
+
+class InvoiceLookupCache:
+    """
+    Short-TTL cache of successful OSP lookups keyed by reference number.
+
+    - Only `response_code == 200` results are cached; errors (incl. 423
+      already paid) always go upstream.
+    - Concurrent lookups of the same reference share one upstream call
+      (single-flight).
+    - Entries are dropped when OSP state changes (commit/confirm/reverse).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # reference_number -> (expires_at, result)
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _get_fresh(self, reference_number: str) -> Optional[dict]:
+        entry = self._entries.get(reference_number)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(reference_number, None)
+            return None
+        return result
+
+    def _store(self, reference_number: str, result: Any) -> None:
+        if not isinstance(result, dict) or result.get("response_code") != 200:
+            return
+        self._entries[reference_number] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(reference_number)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, reference_number: str, loader: Callable[[str], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await loader(reference_number)
+
+        cached = self._get_fresh(reference_number)
+        if cached is not None:
+            self._stats["hits"] += 1
+            return dict(cached)
+
+        pending = self._inflight.get(reference_number)
+        if pending is not None:
+            self._stats["coalesced"] += 1
+            try:
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The leading request was cancelled, not this one: go upstream
+                if not pending.cancelled():
+                    raise
+                result = await loader(reference_number)
+            return dict(result) if isinstance(result, dict) else result
+
+        self._stats["misses"] += 1
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[reference_number] = future
+        try:
+            result = await loader(reference_number)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not warn
+            future.exception()
+            raise
+        else:
+            # Skip storing if invalidated while the lookup was in flight
+            if self._inflight.get(reference_number) is future:
+                self._store(reference_number, result)
+            future.set_result(result)
+            return dict(result) if isinstance(result, dict) else result
+        finally:
+            if self._inflight.get(reference_number) is future:
+                del self._inflight[reference_number]
+
+    def invalidate(self, reference_number: str) -> None:
+        self._stats["invalidations"] += 1
+        self._entries.pop(reference_number, None)
+        # Let the in-flight call finish for its waiters but do not cache it
+        self._inflight.pop(reference_number, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "hit_ratio": round((self._stats["hits"] + self._stats["coalesced"]) / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+invoice_cache = InvoiceLookupCache(
+    ttl_seconds=settings.OSP_LOOKUP_CACHE_TTL,
+    max_entries=settings.OSP_LOOKUP_CACHE_MAX_ENTRIES,
+)
+
+
+def cached_lookup(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Serve `osp_lookup(reference_number)` through the invoice cache."""
+
+    @functools.wraps(fn)
+    async def wrapper(reference_number: str) -> Any:
+        return await invoice_cache.get(reference_number, fn)
+
+    return wrapper
+
+
+def invalidates_lookup(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Drop the cached lookup of `reference_number` (first argument) once an
+    OSP call that changes invoice state returns or fails.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(reference_number: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await fn(reference_number, *args, **kwargs)
+        finally:
+            invoice_cache.invalidate(reference_number)
+            logger.bind(reference_number=reference_number, endpoint=fn.__name__).debug(
+                "[OSP][cache] lookup invalidated"
+            )
+
+    return wrapper
@@ -1,11 +1,11 @@
-import httpx
 from core.config import settings
 from typing import Any
 from loguru import logger
-from core.config import settings
-import httpx
 
-from loguru import logger
+from services.osp_http import osp_request
+from services.osp_breaker import osp_guard
+from services.osp_cache import cached_lookup, invalidates_lookup
+from core.utils.log_sampling import cap_body, should_log
 
 HEADERS = {
     "Authorization": settings.OSP_AUTH,
@@ -13,7 +13,6 @@ HEADERS = {
 }
 
 BASE_URL = settings.OSP_BASE_URL
-TIMEOUT = settings.OSP_TIMEOUT or 30
 
 SENSITIVE_KEYS = {"pin"} 
 
@@ -31,7 +30,34 @@ def _build_param_log(params: dict[str, Any]) -> dict[str, dict[str, Any]]:
     }
 
 
+def _log_osp_request(endpoint: str, url: str, message: str, **payload: Any) -> None:
+    # Sampled with the rest of the request; params are only built if written
+    if not should_log():
+        return
+    # depth=1: attribute the record to the calling OSP function
+    logger.opt(depth=1).bind(
+        osp_log="request",
+        endpoint=endpoint,
+        url=url,
+        **{k: _build_param_log(v) for k, v in payload.items()},
+    ).info(message)
+
+
+def _log_osp_response(endpoint: str, url: str, label: str, res, fail_level: str = "ERROR") -> None:
+    """Failures (non-200) always logged at `fail_level`; successes sampled. Body capped."""
+    failed = res.status_code != 200
+    level = fail_level if failed else "INFO"
+    if not should_log(failed=failed, level=level):
+        return
+    outcome = "FAIL" if failed else "OK"
+    logger.opt(depth=1).bind(osp_log="response", endpoint=endpoint, url=url, status_code=res.status_code).log(
+        level, f"[OSP][{label}][{outcome}] {cap_body(res.text)}"
+    )
+
+
 # 1️ Query Payment (Lookup)
+@cached_lookup
+@osp_guard("osp.lookup", adaptive_timeout=True)
 async def osp_lookup(reference_number: str):
     """CDC Query Payment — GET"""
     url = f"{BASE_URL}/query-payment"
@@ -39,22 +65,12 @@ async def osp_lookup(reference_number: str):
         "reference_number": reference_number,
         "partner": settings.OSP_PARTNER,
     }
-    logger.bind(
-        osp_log="request",
-        endpoint="osp.lookup",
-        url=url,
-        params=_build_param_log(params),
-    ).info("[OSP][lookup] → GET")
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.get(url, params=params, headers={"Authorization": settings.OSP_AUTH})
-        logger.bind(
-            osp_log="response",
-            endpoint="osp.lookup",
-            url=url,
-            status_code=res.status_code,
-        ).info(f"[OSP][lookup] ← {res.status_code}: {res.text}")
-        res.raise_for_status()
-        return res.json()
+    _log_osp_request("osp.lookup", url, "[OSP][lookup] → GET", params=params)
+    res = await osp_request("GET", url, params=params, headers={"Authorization": settings.OSP_AUTH})
+    # 423 (already paid) is an expected answer, not an error
+    _log_osp_response("osp.lookup", url, "lookup", res, fail_level="INFO")
+    res.raise_for_status()
+    return res.json()
     
 # Lookup Failed Simulation Service
 async def lookup_failed(reference_number: str):
@@ -71,20 +87,21 @@ async def lookup_failed(reference_number: str):
         data=_build_param_log(data),
     ).info("[OSP][lookup_failed] → POST")
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        logger.bind(
-                osp_log="response",
-                endpoint="osp.lookup_failed",
-                url=url,
-                status_code=res.status_code,
-        ).error(f"[OSP][lookup_failed][FAIL] {res.text}")
-        res.raise_for_status()
-        return res.json()
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    logger.bind(
+            osp_log="response",
+            endpoint="osp.lookup_failed",
+            url=url,
+            status_code=res.status_code,
+    ).error(f"[OSP][lookup_failed][FAIL] {cap_body(res.text)}")
+    res.raise_for_status()
+    return res.json()
 
 
 
 # 2️ Commit Payment
+@invalidates_lookup
+@osp_guard("osp.commit")
 async def osp_commit(reference_number: str, session_id: str, transaction_id: str):
     """CDC Commit Payment — POST form-data"""
     url = f"{BASE_URL}/commit-payment"
@@ -96,32 +113,11 @@ async def osp_commit(reference_number: str, session_id: str, transaction_id: str
         "transaction_id": numeric_tid,
         "partner": settings.OSP_PARTNER,
     }
-    logger.bind(
-        osp_log="request",
-        endpoint="osp.commit",
-        url=url,
-        data=_build_param_log(data),
-    ).info("[OSP][commit] → POST")
-
-    
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        if res.status_code != 200:
-            logger.bind(
-                osp_log="response",
-                endpoint="osp.commit",
-                url=url,
-                status_code=res.status_code,
-            ).error(f"[OSP][commit][FAIL] {res.text}")
-        else:
-            logger.bind(
-                osp_log="response",
-                endpoint="osp.commit",
-                url=url,
-                status_code=res.status_code,
-            ).info(f"[OSP][commit][OK] {res.text}")
-        res.raise_for_status()
-        return res.json()
+    _log_osp_request("osp.commit", url, "[OSP][commit] → POST", data=data)
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    _log_osp_response("osp.commit", url, "commit", res)
+    res.raise_for_status()
+    return res.json()
 
 # Commit Failed Simulation Service
 async def commt_failed(reference_number: str, session_id: str, transaction_id: str):
@@ -140,19 +136,20 @@ async def commt_failed(reference_number: str, session_id: str, transaction_id: s
         data=_build_param_log(data),
     ).info("[OSP][commit_failed] → POST")
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        logger.bind(
-                osp_log="response",
-                endpoint="osp.commit_failed",
-                url=url,
-                status_code=res.status_code,
-        ).error(f"[OSP][commit_failed][FAIL] {res.text}")
-        res.raise_for_status()
-        return res.json()
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    logger.bind(
+            osp_log="response",
+            endpoint="osp.commit_failed",
+            url=url,
+            status_code=res.status_code,
+    ).error(f"[OSP][commit_failed][FAIL] {cap_body(res.text)}")
+    res.raise_for_status()
+    return res.json()
 
 
 # 3️ Confirm Payment
+@invalidates_lookup
+@osp_guard("osp.confirm")
 async def osp_confirm(reference_number: str, transaction_id: str, acknowledgement_id: str):
     """CDC Confirm Payment — POST form-data"""
     url = f"{BASE_URL}/confirm-payment"
@@ -164,30 +161,11 @@ async def osp_confirm(reference_number: str, transaction_id: str, acknowledgemen
         "partner": settings.OSP_PARTNER,
     }
 
-    logger.bind(
-        osp_log="request",
-        endpoint="osp.confirm",
-        url=url,
-        data=_build_param_log(data),
-    ).info("[OSP][confirm] → POST")
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        if res.status_code != 200:
-            logger.bind(
-                osp_log="response",
-                endpoint="osp.confirm",
-                url=url,
-                status_code=res.status_code,
-            ).error(f"[OSP][confirm][FAIL] {res.text}")
-        else:
-            logger.bind(
-                osp_log="response",
-                endpoint="osp.confirm",
-                url=url,
-                status_code=res.status_code,
-            ).info(f"[OSP][confirm][OK] {res.text}")
-        res.raise_for_status()
-        return res.json()
+    _log_osp_request("osp.confirm", url, "[OSP][confirm] → POST", data=data)
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    _log_osp_response("osp.confirm", url, "confirm", res)
+    res.raise_for_status()
+    return res.json()
 
 #Confirm Failed Simulation Service
 async def confirm_failed(reference_number: str, transaction_id: str, acknowledgement_id: str):
@@ -206,18 +184,19 @@ async def confirm_failed(reference_number: str, transaction_id: str, acknowledge
         data=_build_param_log(data),
     ).info("[OSP][confirm_failed] → POST")
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        logger.bind(
-                osp_log="response",
-                endpoint="osp.confirm_failed",
-                url=url,
-                status_code=res.status_code,
-        ).error(f"[OSP][confirm_failed][FAIL] {res.text}")
-        res.raise_for_status()
-        return res.json()
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    logger.bind(
+            osp_log="response",
+            endpoint="osp.confirm_failed",
+            url=url,
+            status_code=res.status_code,
+    ).error(f"[OSP][confirm_failed][FAIL] {cap_body(res.text)}")
+    res.raise_for_status()
+    return res.json()
 
 # 4️ Reverse Payment
+@invalidates_lookup
+@osp_guard("osp.reverse")
 async def osp_reverse(reference_number: str, transaction_id: str, reversal_transaction_id: str):
     """CDC Reverse Payment — POST form-data"""
     url = f"{BASE_URL}/reverse-payment"
@@ -231,30 +210,11 @@ async def osp_reverse(reference_number: str, transaction_id: str, reversal_trans
         "partner": settings.OSP_PARTNER,
     }
 
-    logger.bind(
-        osp_log="request",
-        endpoint="osp.reverse",
-        url=url,
-        data=_build_param_log(data),
-    ).info("[OSP][reverse] → POST")
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        if res.status_code != 200:
-            logger.bind(
-                osp_log="response",
-                endpoint="osp.reverse",
-                url=url,
-                status_code=res.status_code,
-            ).error(f"[OSP][reverse][FAIL] {res.text}")
-        else:
-            logger.bind(
-                osp_log="response",
-                endpoint="osp.reverse",
-                url=url,
-                status_code=res.status_code,
-            ).info(f"[OSP][reverse][OK] {res.text}")
-        res.raise_for_status()
-        return res.json()
+    _log_osp_request("osp.reverse", url, "[OSP][reverse] → POST", data=data)
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    _log_osp_response("osp.reverse", url, "reverse", res)
+    res.raise_for_status()
+    return res.json()
 
 # Reverse Failed Simulation Service
 async def reverse_failed(reference_number: str, transaction_id: str, reversal_transaction_id: str):
@@ -273,13 +233,12 @@ async def reverse_failed(reference_number: str, transaction_id: str, reversal_tr
         data=_build_param_log(data),
     ).info("[OSP][reverse_failed] → POST")
 
-    async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        res = await client.post(url, data=data, headers=HEADERS)
-        logger.bind(
-                osp_log="response",
-                endpoint="osp.reverse_failed",
-                url=url,
-                status_code=res.status_code,
-        ).error(f"[OSP][reverse_failed][FAIL] {res.text}")
-        res.raise_for_status()
-        return res.json()
\ No newline at end of file
+    res = await osp_request("POST", url, data=data, headers=HEADERS)
+    logger.bind(
+            osp_log="response",
+            endpoint="osp.reverse_failed",
+            url=url,
+            status_code=res.status_code,
+    ).error(f"[OSP][reverse_failed][FAIL] {cap_body(res.text)}")
+    res.raise_for_status()
+    return res.json()
\ No newline at end of file
@@ -1,15 +1,20 @@
-import httpx
 from core.config import settings
+from services.osp_http import osp_request
+from services.osp_breaker import osp_guard
+from services.osp_cache import cached_lookup, invalidates_lookup
 
+@cached_lookup
+@osp_guard("osp.lookup", adaptive_timeout=True)
 async def osp_lookup(reference_number: str):
     url = f"{settings.OSP_BASE_URL}/query-payment"
     params = {"partner": settings.OSP_PARTNER, "reference_number": reference_number}
     headers = {"authorization": settings.OSP_AUTH}
 
-    async with httpx.AsyncClient(timeout=settings.OSP_TIMEOUT) as client:
-        resp = await client.get(url, params=params, headers=headers)
-        return resp.json()
+    resp = await osp_request("GET", url, params=params, headers=headers)
+    return resp.json()
 
+@invalidates_lookup
+@osp_guard("osp.commit")
 async def osp_commit(reference_number: str, session_id: str, transaction_id: str):
     url = f"{settings.OSP_BASE_URL}/commit-payment"
     params = {
@@ -20,10 +25,11 @@ async def osp_commit(reference_number: str, session_id: str, transaction_id: str
     }
     headers = {"authorization": settings.OSP_AUTH}
 
-    async with httpx.AsyncClient(timeout=settings.OSP_TIMEOUT) as client:
-        resp = await client.get(url, params=params, headers=headers)
-        return resp.json()
+    resp = await osp_request("GET", url, params=params, headers=headers)
+    return resp.json()
 
+@invalidates_lookup
+@osp_guard("osp.confirm")
 async def osp_confirm(reference_number: str, transaction_id: str, acknowledgement_id: str):
     url = f"{settings.OSP_BASE_URL}/confirm-payment"
     params = {
@@ -34,10 +40,11 @@ async def osp_confirm(reference_number: str, transaction_id: str, acknowledgemen
     }
     headers = {"authorization": settings.OSP_AUTH}
 
-    async with httpx.AsyncClient(timeout=settings.OSP_TIMEOUT) as client:
-        resp = await client.get(url, params=params, headers=headers)
-        return resp.json()
+    resp = await osp_request("GET", url, params=params, headers=headers)
+    return resp.json()
 
+@invalidates_lookup
+@osp_guard("osp.reverse")
 async def osp_reverse(reference_number: str, transaction_id: str, reversal_transaction_id: str):
     url = f"{settings.OSP_BASE_URL}/reverse-payment"
     params = {
@@ -48,6 +55,5 @@ async def osp_reverse(reference_number: str, transaction_id: str, reversal_trans
     }
     headers = {"authorization": settings.OSP_AUTH}
 
-    async with httpx.AsyncClient(timeout=settings.OSP_TIMEOUT) as client:
-        resp = await client.get(url, params=params, headers=headers)
-        return resp.json()
+    resp = await osp_request("GET", url, params=params, headers=headers)
+    return resp.json()
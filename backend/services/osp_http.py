@@ -0,0 +1,122 @@
+# backend/services/osp_http.py
+import importlib.util
+from typing import Any, Optional
+
+import httpx
+from loguru import logger
+
+from core.config import settings
+from core.tracing import start_span
+
+# Process-wide client shared by every OSP call (real + mock clients).
+# Created lazily on first use, closed from the app shutdown hook.
+_client: Optional[httpx.AsyncClient] = None
+
+# Pool counters (per process)
+_POOL_STATS: dict[str, int] = {
+    "requests": 0,
+    "connections_opened": 0,
+    "connections_reused": 0,
+    "requests_waited": 0,
+    "in_flight": 0,
+}
+
+
+def _http2_enabled() -> bool:
+    if not settings.OSP_HTTP2:
+        return False
+    # HTTP/2 needs the optional `h2` package (httpx[http2])
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("OSP_HTTP2=true but 'h2' is not installed, falling back to HTTP/1.1 | module=services.osp_http")
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.OSP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OSP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OSP_KEEPALIVE_EXPIRY,
+    )
+    http2 = _http2_enabled()
+    logger.info(
+        f"OSP client pool created max_connections={limits.max_connections} "
+        f"max_keepalive={limits.max_keepalive_connections} http2={http2} | module=services.osp_http"
+    )
+    return httpx.AsyncClient(
+        timeout=settings.OSP_TIMEOUT or 30,
+        limits=limits,
+        http2=http2,
+    )
+
+
+def get_osp_client() -> httpx.AsyncClient:
+    """Return the shared OSP client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_osp_client() -> None:
+    """Close the shared client and release pooled connections (app shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("OSP client pool closed | module=services.osp_http")
+    _client = None
+
+
+async def osp_request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """
+    Send a request through the shared pool and record pool usage.
+
+    A request that does not trigger a TCP connect reused a pooled
+    connection; a request started while every connection slot is busy
+    has to wait for one.
+    """
+    client = get_osp_client()
+    opened = False
+
+    async def _trace(event_name: str, info: dict) -> None:
+        nonlocal opened
+        if event_name == "connection.connect_tcp.complete":
+            opened = True
+
+    _POOL_STATS["requests"] += 1
+    if _POOL_STATS["in_flight"] >= settings.OSP_MAX_CONNECTIONS:
+        _POOL_STATS["requests_waited"] += 1
+    _POOL_STATS["in_flight"] += 1
+
+    extensions = dict(kwargs.pop("extensions", None) or {})
+    extensions["trace"] = _trace
+    with start_span(f"HTTP {method}", "CLIENT", **{"http.request.method": method, "url.full": url}) as span:
+        if span.traceparent:
+            # Let OSP continue our trace if it speaks W3C trace-context
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "traceparent": span.traceparent}
+        try:
+            res = await client.request(method, url, extensions=extensions, **kwargs)
+        finally:
+            _POOL_STATS["in_flight"] -= 1
+            if opened:
+                _POOL_STATS["connections_opened"] += 1
+        span.set_attribute("http.response.status_code", res.status_code)
+        span.set_attribute("osp.connection_reused", not opened)
+        if res.status_code >= 500:
+            span.set_error(f"HTTP {res.status_code}")
+
+    if not opened:
+        _POOL_STATS["connections_reused"] += 1
+    return res
+
+
+def _open_connections() -> int:
+    if _client is None or _client.is_closed:
+        return 0
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    return len(getattr(pool, "connections", []) or [])
+
+
+def get_pool_stats() -> dict[str, int]:
+    """Snapshot of the OSP pool counters for this process."""
+    return {**_POOL_STATS, "connections_open": _open_connections()}
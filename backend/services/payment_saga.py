@@ -0,0 +1,742 @@
+# backend/services/payment_saga.py
+"""
+Durable payment saga: POST /payments/{id}/confirm only records a
+PaymentSaga row; background workers run its steps
+
+    lookup → commit → debit → confirm      (payment confirmed)
+                 ↘       ↘        ↘
+                    reverse              (OSP reversal + local refund)
+
+Reconciliation (services.reconciliation) re-drives stuck payments by
+resuming their saga at confirm / debit / reverse, or at `refund` when
+OSP no longer holds the payment and only the local debit is undone.
+Batch payments (POST /payments/batch) start their sagas at `commit` with
+the debit rows already written, so a rejected commit ends in `refund`.
+
+- Each step's result is committed together with the saga's next step,
+  and every attempt is appended to payment_saga_attempts.
+- Transient errors (timeouts, transport errors, 5xx, open circuit) are
+  retried with exponential backoff + jitter up to PAYMENT_SAGA_MAX_ATTEMPTS.
+  Business rejections end the saga at lookup/commit; confirm and reverse
+  retry on any failure, as OSP answers there are often temporary.
+- A worker claims a saga with a conditional UPDATE and holds it under a
+  lease. If the worker dies mid-step the lease expires and any worker
+  (in any process) resumes from the last committed step, so every step
+  handler is idempotent: the transaction id is fixed when the saga is
+  created and local debit/refund rows are looked up before writing. The
+  abandoned run counts as an attempt: a re-run commit that OSP rejects
+  (it may have taken the first one) is compensated by `reverse`.
+- Balances move by conditional UPDATEs (services.account_balance), so
+  workers debiting the same account never lose each other's writes. The
+  debit step captures the hold placed by /payments/start; a saga ending
+  without a debit releases it. Debits and refunds are posted to the
+  ledger (services.ledger) in the same transaction.
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.metrics import PAYMENT_TRANSITIONS, SAGA_STEPS
+from core.tracing import current_span, get_request_id, start_root_span
+from core.utils.log_sampling import cap_body, sampling_scope, should_log
+from core.utils.txid import generate_transaction_id
+from db.session import AsyncSessionLocal
+from models import Account, Payment, Service, Transaction
+from models.payment_saga import PaymentSaga, PaymentSagaAttempt
+from services.account_balance import (
+    InsufficientBalance,
+    capture_hold,
+    credit_account,
+    debit_account,
+    release_hold,
+    renew_hold,
+)
+from services.ledger import OSP_CLEARING, post_entry
+
+if settings.USE_MOCK_OSP is True:
+    from services.osp_client_mockup import osp_lookup, osp_commit, osp_confirm, osp_reverse
+else:
+    from services.osp_client import osp_lookup, osp_commit, osp_confirm, osp_reverse
+
+PENDING = "pending"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+_DONE = "done"
+_CLAIM_BATCH = 8
+
+
+class StepFailed(Exception):
+    """Definite failure of a step; the message is what the client is shown."""
+
+
+# --- Step handlers (idempotent: a step may run again after a crash) ---
+def _money(value) -> Decimal:
+    try:
+        return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+    except (InvalidOperation, TypeError, ValueError):
+        return Decimal("0.00")
+
+
+def _parse_cdc_datetime(value: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """CDC datetime is local (UTC+7): return (local, utc), both naive."""
+    if not value:
+        return None, None
+    try:
+        local = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except ValueError as e:
+        logger.warning(f"[CDC Time Parse Error] {value}: {e}")
+        return None, None
+    return local, local - timedelta(hours=7)
+
+
+async def _transaction_by_id(db: AsyncSession, transaction_id: str) -> Optional[Transaction]:
+    return (await db.execute(select(Transaction).filter_by(transaction_id=transaction_id))).scalars().first()
+
+
+async def _step_lookup(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> None:
+    # Always refresh the OSP session right before commit
+    res = await osp_lookup(payment.reference_number)
+    if res.get("response_code") != 200:
+        raise StepFailed("Invalid invoice or expired session from OSP")
+    payment.session_id = res.get("session_id") or payment.session_id
+
+
+async def _step_commit(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> None:
+    res = await osp_commit(payment.reference_number, payment.session_id, saga.transaction_id)
+    if res.get("response_code") != 200:
+        logger.error(f"[OSP Commit Error] {cap_body(res)}")
+        raise StepFailed("OSP commit failed")
+    if should_log():
+        logger.info(f"[OSP Commit Response] {cap_body(res)}")
+    payment.acknowledgement_id = res.get("acknowledgement_id")
+    payment.cdc_transaction_datetime, payment.cdc_transaction_datetime_utc = _parse_cdc_datetime(
+        res.get("cdc_transaction_datetime")
+    )
+    payment.status = "committed"
+
+
+async def _step_debit(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> None:
+    if await _transaction_by_id(db, saga.transaction_id) is not None:
+        return
+    account = await db.get(Account, payment.account_id)
+    amount = _money(payment.total_amount)
+    # funds held since /payments/start; payments without an active hold are debited directly
+    if not await capture_hold(db, payment.id):
+        try:
+            await debit_account(db, account.id, amount)
+        except InsufficientBalance:
+            raise StepFailed("Insufficient balance")
+    service_name = (await db.execute(select(Service.name).filter_by(id=payment.service_id))).scalar()
+    db.add(
+        Transaction(
+            transaction_id=saga.transaction_id,
+            user_id=payment.user_id,
+            account_id=account.id,
+            payment_id=payment.id,
+            reference_number=payment.reference_number,
+            amount=float(amount),
+            currency=payment.currency or account.currency or "USD",
+            direction="debit",
+            description=f"Payment to {service_name or ''}",
+            created_at=datetime.utcnow(),
+        )
+    )
+    post_entry(
+        db,
+        saga.transaction_id,
+        account.id,
+        -amount,
+        OSP_CLEARING,
+        payment.currency or account.currency or "USD",
+        f"Payment to {service_name or ''}",
+    )
+
+
+async def _step_confirm(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> None:
+    res = await osp_confirm(payment.reference_number, saga.transaction_id, payment.acknowledgement_id)
+    failed = res.get("response_code") != 200
+    if should_log(failed=failed):
+        logger.info(f"[OSP Confirm Response] {cap_body(res)}")
+    if failed:
+        raise StepFailed("OSP confirm failed")
+    payment.status = "confirmed"
+    if not payment.confirmed_at:
+        payment.confirmed_at = datetime.utcnow()
+
+
+async def _refund(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> bool:
+    """
+    Credit back the local debit, if there was one (refund row keyed by
+    R<transaction_id>), else release the payment's hold. True if the
+    payment had been debited.
+    """
+    debit = await _transaction_by_id(db, saga.transaction_id)
+    refund_id = f"R{saga.transaction_id}"
+    if debit is None:
+        await release_hold(db, payment.id)
+        return False
+    if await _transaction_by_id(db, refund_id) is not None:
+        return True
+    amount = _money(debit.amount)
+    db.add(
+        Transaction(
+            transaction_id=refund_id,
+            user_id=debit.user_id,
+            account_id=debit.account_id,
+            # no payment_id: Payment.transaction stays the original debit
+            reference_number=debit.reference_number,
+            amount=float(amount),
+            currency=debit.currency,
+            direction="credit",
+            description=f"Refund of payment #{payment.id}",
+            created_at=datetime.utcnow(),
+        )
+    )
+    post_entry(db, refund_id, debit.account_id, amount, OSP_CLEARING, debit.currency, f"Refund of payment #{payment.id}")
+    await credit_account(db, debit.account_id, amount)
+    return True
+
+
+async def _step_reverse(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> None:
+    reversal_id = f"REV-{saga.transaction_id}"
+    res = await osp_reverse(payment.reference_number, saga.transaction_id, reversal_id)
+    failed = res.get("response_code") != 200
+    if should_log(failed=failed):
+        logger.info(f"[OSP Reverse Response] {cap_body(res)}")
+    if failed:
+        raise StepFailed("OSP reversal failed")
+    payment.reversal_transaction_id = reversal_id
+    payment.reversal_acknowledgement_id = res.get("reversal_acknowledgement_id")
+    await _refund(db, saga, payment)
+    payment.status = "reversed"
+
+
+async def _step_refund(db: AsyncSession, saga: PaymentSaga, payment: Payment) -> None:
+    # OSP does not hold the payment (reconciliation saw the invoice open): undo locally only
+    payment.status = "reversed" if await _refund(db, saga, payment) else "failed"
+
+
+_STEPS: Dict[str, Callable[[AsyncSession, PaymentSaga, Payment], Awaitable[None]]] = {
+    "lookup": _step_lookup,
+    "commit": _step_commit,
+    "debit": _step_debit,
+    "confirm": _step_confirm,
+    "reverse": _step_reverse,
+    "refund": _step_refund,
+}
+_NEXT = {
+    "lookup": "commit",
+    "commit": "debit",
+    "debit": "confirm",
+    "confirm": _DONE,
+    "reverse": _DONE,
+    "refund": _DONE,
+}
+# OSP answers to these are often temporary: retry business failures too
+_RETRY_ANY_FAILURE = {"confirm", "reverse"}
+
+
+def _on_failure(step: str, attempt: int, transient: bool) -> Optional[str]:
+    """Compensation step once `step` has definitely failed (None = just fail)."""
+    if step == "commit":
+        # A timed-out, retried or taken-over commit may still have reached OSP
+        return "reverse" if transient or attempt > 1 else None
+    if step in ("debit", "confirm"):
+        return "reverse"
+    return None
+
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, StepFailed):
+        return False
+    if isinstance(exc, HTTPException):
+        # 503 = OSP circuit open
+        return exc.status_code == 503
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    # timeouts, transport and database errors
+    return True
+
+
+def _describe(step: str, exc: BaseException) -> str:
+    if isinstance(exc, StepFailed):
+        return str(exc)
+    if isinstance(exc, httpx.HTTPStatusError):
+        if exc.response.status_code == 423:
+            return "This invoice has already been paid."
+        return f"OSP {step} failed (HTTP {exc.response.status_code})"
+    if isinstance(exc, HTTPException):
+        return str(exc.detail)
+    if isinstance(exc, asyncio.TimeoutError):
+        return f"OSP {step} timed out"
+    return f"{step} failed: {type(exc).__name__}: {exc}"[:500]
+
+
+def _backoff(attempt: int) -> float:
+    delay = min(settings.PAYMENT_SAGA_BACKOFF_BASE * 2 ** (attempt - 1), settings.PAYMENT_SAGA_BACKOFF_MAX)
+    # jitter so sagas failing together do not retry together
+    return delay * (0.5 + random.random() / 2)
+
+
+# --- Engine ---
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+_tasks: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_stopping = False
+_waiters: Dict[int, List[asyncio.Event]] = {}
+_STATS = {"claimed": 0, "steps_ok": 0, "retries": 0, "compensations": 0, "succeeded": 0, "failed": 0}
+
+
+def new_payment_saga(payment: Payment, step: str = "lookup") -> PaymentSaga:
+    """Unsaved saga for a flushed `payment`, starting at `step`; its transaction id is fixed here."""
+    return PaymentSaga(
+        payment_id=payment.id,
+        step=step,
+        status=PENDING,
+        attempts=0,
+        transaction_id=generate_transaction_id(),
+        request_id=get_request_id(),
+        **_trace_context(),
+        next_run_at=datetime.utcnow(),
+    )
+
+
+def _trace_context() -> Dict[str, Optional[str]]:
+    """trace_id / span_id of the current (sampled) span, for the saga's worker spans to continue."""
+    span = current_span()
+    return {"trace_id": span.trace_id if span else None, "span_id": span.span_id if span else None}
+
+
+def wake_saga_workers() -> None:
+    """Let idle workers in this process pick up newly committed sagas right away."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def start_payment_saga(db: AsyncSession, payment: Payment, amount: Decimal) -> Optional[PaymentSaga]:
+    """
+    Move a started payment to processing, hold `amount` for it again (the
+    hold from /payments/start may have expired) and persist its saga, then
+    wake the workers.
+
+    The payment moves with a conditional UPDATE, so of concurrent confirms,
+    or a confirm racing a cancel, only one gets through: the others get
+    None. Raises InsufficientBalance if the funds can no longer be held.
+    """
+    res = await db.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, Payment.status == "started")
+        .values(status="processing")
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        await db.rollback()
+        return None
+    try:
+        await renew_hold(db, payment, amount)
+    except InsufficientBalance:
+        await db.rollback()
+        raise
+    saga = new_payment_saga(payment)
+    db.add(saga)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # the payment already has a saga (payment_id is unique)
+        await db.rollback()
+        return None
+
+    PAYMENT_TRANSITIONS.inc("started", "processing")
+    wake_saga_workers()
+    return saga
+
+
+async def resume_payment_saga(
+    db: AsyncSession, payment_id: int, from_status: str, step: str, transaction_id: str
+) -> bool:
+    """
+    Re-run a stuck payment's saga from `step` (status → processing).
+
+    Both the payment and an existing saga are changed with conditional
+    UPDATEs, so a payment that moved on meanwhile, or whose saga another
+    reconciler already resumed, is left alone (returns False).
+    """
+    now = datetime.utcnow()
+    res = await db.execute(
+        update(Payment)
+        .where(Payment.id == payment_id, Payment.status == from_status)
+        .values(status="processing")
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        await db.rollback()
+        return False
+
+    values = dict(
+        step=step,
+        status=PENDING,
+        attempts=0,
+        next_run_at=now,
+        lease_owner=None,
+        lease_expires_at=None,
+        request_id=get_request_id(),
+        **_trace_context(),
+    )
+    res = await db.execute(
+        update(PaymentSaga)
+        .where(PaymentSaga.payment_id == payment_id, PaymentSaga.status != PENDING)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        if await get_payment_saga(db, payment_id) is not None:
+            # resumed (or still running) elsewhere
+            await db.rollback()
+            return False
+        db.add(PaymentSaga(payment_id=payment_id, transaction_id=transaction_id, created_at=now, **values))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # another process created the saga first (payment_id is unique)
+        await db.rollback()
+        return False
+
+    PAYMENT_TRANSITIONS.inc(from_status, "processing")
+    wake_saga_workers()
+    return True
+
+
+async def get_payment_saga(db: AsyncSession, payment_id: int) -> Optional[PaymentSaga]:
+    return (
+        await db.execute(
+            select(PaymentSaga).filter_by(payment_id=payment_id).execution_options(populate_existing=True)
+        )
+    ).scalars().first()
+
+
+async def wait_for_saga(payment_id: int, timeout: float) -> Optional[PaymentSaga]:
+    """The saga once it has finished, or None if it is still running after `timeout` seconds."""
+    return (await wait_for_sagas([payment_id], timeout)).get(payment_id)
+
+
+async def wait_for_sagas(payment_ids: List[int], timeout: float) -> Dict[int, PaymentSaga]:
+    """
+    Finished sagas by payment id, once all of them have finished or after
+    `timeout` seconds (sagas still running are missing). Woken by this
+    process's workers; sagas finished by another process are seen on the
+    next DB poll (one query for all ids).
+    """
+    deadline = time.monotonic() + timeout
+    event = asyncio.Event()
+    for payment_id in payment_ids:
+        _waiters.setdefault(payment_id, []).append(event)
+    try:
+        while True:
+            event.clear()
+            async with AsyncSessionLocal() as db:
+                sagas = (
+                    await db.execute(
+                        select(PaymentSaga)
+                        .where(PaymentSaga.payment_id.in_(payment_ids), PaymentSaga.status != PENDING)
+                        .execution_options(populate_existing=True)
+                    )
+                ).scalars().all()
+            finished = {saga.payment_id: saga for saga in sagas}
+            remaining = deadline - time.monotonic()
+            if len(finished) == len(set(payment_ids)) or remaining <= 0:
+                return finished
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, settings.PAYMENT_SAGA_POLL_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for payment_id in payment_ids:
+            waiting = _waiters.get(payment_id, [])
+            if event in waiting:
+                waiting.remove(event)
+            if not waiting:
+                _waiters.pop(payment_id, None)
+
+
+def _notify(payment_id: int) -> None:
+    for event in _waiters.get(payment_id, ()):
+        event.set()
+
+
+def _runnable(now: datetime) -> tuple:
+    return (
+        PaymentSaga.status == PENDING,
+        PaymentSaga.next_run_at <= now,
+        or_(PaymentSaga.lease_expires_at.is_(None), PaymentSaga.lease_expires_at < now),
+    )
+
+
+async def _claim(owner: str) -> Optional[int]:
+    """
+    Take the lease on one due saga; the conditional UPDATE makes the claim
+    atomic across workers.
+
+    A lease that is still set has expired without being released: its
+    worker died (or stalled) in the middle of the step. That run counts as
+    an attempt, so a re-run commit that OSP may already have taken ends in
+    `reverse` rather than in a plain failure (see _on_failure).
+    """
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        rows = list(
+            await db.execute(
+                select(PaymentSaga.id, PaymentSaga.lease_owner, PaymentSaga.step, PaymentSaga.attempts)
+                .where(*_runnable(now))
+                .order_by(PaymentSaga.next_run_at)
+                .limit(_CLAIM_BATCH)
+            )
+        )
+        # Workers woken together should not all race for the same row
+        random.shuffle(rows)
+        for saga_id, previous_owner, step, attempts in rows:
+            values = dict(lease_owner=owner, lease_expires_at=now + timedelta(seconds=settings.PAYMENT_SAGA_LEASE_SECONDS))
+            if previous_owner is None:
+                same_owner = PaymentSaga.lease_owner.is_(None)
+            else:
+                same_owner = PaymentSaga.lease_owner == previous_owner
+                values["attempts"] = attempts + 1
+            res = await db.execute(
+                update(PaymentSaga)
+                .where(PaymentSaga.id == saga_id, PaymentSaga.attempts == attempts, same_owner, *_runnable(now))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if res.rowcount == 1 and previous_owner is not None:
+                db.add(
+                    PaymentSagaAttempt(
+                        saga_id=saga_id,
+                        step=step,
+                        attempt=attempts + 1,
+                        outcome="abandoned",
+                        error=f"lease of {previous_owner} expired mid-step",
+                        worker=owner,
+                        created_at=now,
+                    )
+                )
+                SAGA_STEPS.inc(step, "abandoned")
+                logger.warning(
+                    f"[Saga] saga={saga_id} step={step}: took over from {previous_owner} | module=services.payment_saga"
+                )
+            await db.commit()
+            if res.rowcount == 1:
+                return saga_id
+    return None
+
+
+def _release(saga: PaymentSaga) -> None:
+    saga.lease_owner = None
+    saga.lease_expires_at = None
+
+
+def _finish(saga: PaymentSaga, payment: Payment, step: str, failed: bool) -> None:
+    _release(saga)
+    if not failed and step == "confirm":
+        saga.status = SUCCEEDED
+        _STATS["succeeded"] += 1
+        return
+    saga.status = FAILED
+    _STATS["failed"] += 1
+    if not failed:
+        # reverse/refund succeeded: the payment was undone
+        undone = "Payment reversed." if payment.status == "reversed" else "Payment not completed."
+        saga.last_error = f"{saga.last_error or 'Payment failed'}. {undone}"
+    elif step == "reverse":
+        payment.status = "reversal_failed"
+        saga.last_error = f"{saga.last_error or 'OSP reversal failed'}. The reversal will be retried by reconciliation."
+        logger.error(f"[Saga] payment={payment.id} reversal failed → left for reconciliation")
+    else:
+        payment.status = "failed"
+
+
+async def _run(saga_id: int, owner: str) -> None:
+    """Run a claimed saga step by step until it finishes, has to wait for a retry, or the worker stops."""
+    while True:
+        async with AsyncSessionLocal() as db:
+            saga = await db.get(PaymentSaga, saga_id)
+            if saga is None or saga.status != PENDING or saga.lease_owner != owner:
+                return
+            if _stopping:
+                # Hand the saga straight to another worker/process
+                _release(saga)
+                await db.commit()
+                return
+            payment = await db.get(Payment, saga.payment_id)
+            step, attempt = saga.step, saga.attempts + 1
+            # End the read transaction: no connection is held across the OSP call
+            await db.commit()
+            error, transient = None, False
+            started = time.perf_counter()
+
+            # one root span per step run, in the trace of the request that queued the saga
+            span_context = start_root_span(
+                f"payment.saga.{step}",
+                (saga.trace_id, saga.span_id),
+                **{"payment.id": payment.id, "saga.id": saga.id, "saga.attempt": attempt, "request_id": saga.request_id},
+            )
+            with logger.contextualize(request_id=saga.request_id, payment_id=payment.id, saga_step=step), span_context as span:
+                try:
+                    await _STEPS[step](db, saga, payment)
+                except Exception as e:
+                    error, transient = _describe(step, e), _is_transient(e)
+                    logger.warning(f"[Saga] payment={payment.id} step={step} attempt={attempt} failed: {error}")
+                    # Drop the step's partial changes; keep the saga bookkeeping below
+                    await db.rollback()
+                    saga = await db.get(PaymentSaga, saga_id, populate_existing=True)
+                    payment = await db.get(Payment, saga.payment_id, populate_existing=True)
+
+                now = datetime.utcnow()
+                finished = False
+                if error is None:
+                    outcome = "ok"
+                    _STATS["steps_ok"] += 1
+                    saga.attempts = 0
+                    if _NEXT[step] == _DONE:
+                        _finish(saga, payment, step, failed=False)
+                        finished = True
+                    else:
+                        saga.step = _NEXT[step]
+                        saga.lease_expires_at = now + timedelta(seconds=settings.PAYMENT_SAGA_LEASE_SECONDS)
+                elif (transient or step in _RETRY_ANY_FAILURE) and attempt < settings.PAYMENT_SAGA_MAX_ATTEMPTS:
+                    outcome = "retry"
+                    _STATS["retries"] += 1
+                    saga.attempts = attempt
+                    saga.last_error = error
+                    saga.next_run_at = now + timedelta(seconds=_backoff(attempt))
+                    _release(saga)
+                else:
+                    outcome = "failed"
+                    saga.last_error = error
+                    fallback = _on_failure(step, attempt, transient)
+                    if (
+                        fallback is None
+                        and step in ("lookup", "commit")
+                        and await _transaction_by_id(db, saga.transaction_id) is not None
+                    ):
+                        # OSP never took the payment but it was debited up front (batch): give the money back
+                        fallback = "refund"
+                    if fallback is not None:
+                        _STATS["compensations"] += 1
+                        saga.step = fallback
+                        saga.attempts = 0
+                        saga.lease_expires_at = now + timedelta(seconds=settings.PAYMENT_SAGA_LEASE_SECONDS)
+                    else:
+                        if step != "reverse":
+                            # nothing left to undo at OSP: free the reserved funds
+                            # (a failed reversal keeps them until reconciliation settles it)
+                            await release_hold(db, payment.id)
+                        _finish(saga, payment, step, failed=True)
+                        finished = True
+
+                db.add(
+                    PaymentSagaAttempt(
+                        saga_id=saga.id,
+                        step=step,
+                        attempt=attempt,
+                        outcome=outcome,
+                        error=error,
+                        worker=owner,
+                        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                        created_at=now,
+                    )
+                )
+                await db.commit()
+                SAGA_STEPS.inc(step, outcome)
+                span.set_attribute("saga.outcome", outcome)
+                if error is not None:
+                    span.set_error(error)
+
+        if finished:
+            _notify(saga.payment_id)
+            return
+        if outcome == "retry":
+            return
+
+
+async def _worker(n: int) -> None:
+    owner = f"{_WORKER_ID}:{n}"
+    while not _stopping:
+        try:
+            saga_id = await _claim(owner)
+        except Exception as e:
+            logger.warning(f"[Saga] claim failed: {e} | module=services.payment_saga")
+            saga_id = None
+        if saga_id is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.PAYMENT_SAGA_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+        _STATS["claimed"] += 1
+        try:
+            with sampling_scope():
+                await _run(saga_id, owner)
+        except Exception:
+            # Lease expiry hands the saga to another worker
+            logger.exception(f"[Saga] worker {owner} crashed on saga={saga_id} | module=services.payment_saga")
+
+
+def start_saga_workers() -> None:
+    """Start PAYMENT_SAGA_WORKERS worker tasks on the running loop (app startup)."""
+    global _wakeup, _stopping
+    if _tasks or settings.PAYMENT_SAGA_WORKERS <= 0:
+        return
+    _stopping = False
+    _wakeup = asyncio.Event()
+    for n in range(settings.PAYMENT_SAGA_WORKERS):
+        _tasks.append(asyncio.create_task(_worker(n), name=f"payment-saga-{n}"))
+    logger.info(f"Payment saga workers started count={len(_tasks)} | module=services.payment_saga")
+
+
+async def stop_saga_workers(timeout: float = 5.0) -> None:
+    """Let workers finish their current step, then cancel what is left (its lease will expire)."""
+    global _stopping
+    _stopping = True
+    if _wakeup is not None:
+        _wakeup.set()
+    if _tasks:
+        _, pending = await asyncio.wait(_tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    _tasks.clear()
+
+
+async def get_saga_stats() -> dict:
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        pending, due, oldest = (
+            await db.execute(
+                select(
+                    func.count(PaymentSaga.id),
+                    func.count(PaymentSaga.id).filter(PaymentSaga.next_run_at <= now),
+                    func.min(PaymentSaga.created_at),
+                ).where(PaymentSaga.status == PENDING)
+            )
+        ).one()
+    return {
+        **_STATS,
+        "workers": len(_tasks),
+        "pending": pending,
+        "due": due,
+        "oldest_pending_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+    }
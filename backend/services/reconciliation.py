@@ -0,0 +1,286 @@
+# backend/services/reconciliation.py
+"""
+Reconciliation of stuck payments.
+
+A payment can be left half done at OSP: `committed` without a running
+saga (crash / legacy inline flow), `failed` after OSP acknowledged the
+commit, or `reversal_failed` once the saga gave up on the reversal.
+A periodic pass (every RECONCILE_INTERVAL seconds, or on demand via
+POST /adm/payments/reconcile) pages through those rows on
+ix_payments_status_created, asks OSP about each invoice (at most
+RECONCILE_CONCURRENCY lookups in flight) and resumes the payment's saga
+at the step that finishes it:
+
+    OSP holds the payment (423)   committed        → confirm (debit first if missing)
+                                  failed / reversal_failed → reverse
+    invoice still open (200)      any              → refund (local debit only)
+
+The saga workers then run the step with their usual retries and
+idempotency guarantees. Payments whose OSP state cannot be read are
+skipped and picked up again by the next pass.
+
+Each pass also releases the balance holds of payments started but never
+confirmed within PAYMENT_HOLD_TTL, and any hold left on a payment that is
+done (services.account_balance).
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+from sqlalchemy import Select, and_, exists, func, or_, select, tuple_
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
+
+from core.config import settings
+from core.metrics import RECONCILE_ACTIONS
+from core.tracing import start_root_span
+from core.utils.log_sampling import sampling_scope
+from core.utils.txid import generate_transaction_id
+from db.session import AsyncSessionLocal
+from models import Payment, Transaction
+from models.payment_saga import PaymentSaga
+from services.account_balance import release_stale_holds
+from services.osp_cache import invoice_cache
+from services.payment_saga import PENDING, resume_payment_saga
+
+if settings.USE_MOCK_OSP is True:
+    from services.osp_client_mockup import osp_lookup
+else:
+    from services.osp_client import osp_lookup
+
+STUCK_STATUSES = ("committed", "failed", "reversal_failed")
+
+# OSP invoice state
+_PAID = "paid"
+_OPEN = "open"
+
+# separate alias: the batch query also joins payment_sagas for the transaction id
+_saga = aliased(PaymentSaga)
+
+_task: Optional[asyncio.Task] = None
+_lock: Optional[asyncio.Lock] = None
+_TOTALS: Dict[str, float] = {"runs": 0, "scanned": 0, "resumed": 0, "seconds": 0.0}
+_last_run: Optional[dict] = None
+
+
+def _stuck(cutoff: datetime) -> List[ColumnElement]:
+    """Stuck payments older than `cutoff` that no saga is currently working on."""
+    return [
+        Payment.status.in_(STUCK_STATUSES),
+        Payment.created_at < cutoff,
+        # a plain `failed` is only stuck if OSP acknowledged the commit, nothing was reversed
+        # and no saga has handled it (sagas end in failed only once nothing is left to undo)
+        or_(
+            Payment.status != "failed",
+            and_(
+                Payment.acknowledgement_id.is_not(None),
+                Payment.reversal_transaction_id.is_(None),
+                ~exists().where(_saga.payment_id == Payment.id),
+            ),
+        ),
+        ~exists().where(_saga.payment_id == Payment.id, _saga.status == PENDING),
+    ]
+
+
+def stuck_payments_query(cutoff: datetime, after: Optional[Tuple[datetime, int]] = None) -> Select:
+    """
+    One batch of stuck payments, oldest first, with their saga's and debit's
+    transaction ids; `after` is the (created_at, id) of the last row seen.
+    """
+    stmt = (
+        select(
+            Payment.id,
+            Payment.created_at,
+            Payment.status,
+            Payment.reference_number,
+            PaymentSaga.transaction_id,
+            Transaction.transaction_id,
+        )
+        .outerjoin(PaymentSaga, PaymentSaga.payment_id == Payment.id)
+        .outerjoin(Transaction, and_(Transaction.payment_id == Payment.id, Transaction.direction == "debit"))
+        .where(*_stuck(cutoff))
+        .order_by(Payment.created_at, Payment.id)
+        .limit(max(1, settings.RECONCILE_BATCH_SIZE))
+    )
+    if after is not None:
+        # keyset: skipped rows stay stuck, do not read them again in this pass
+        stmt = stmt.where(tuple_(Payment.created_at, Payment.id) > after)
+    return stmt
+
+
+async def _invoice_state(reference_number: str) -> Optional[str]:
+    """_PAID / _OPEN as OSP sees the invoice now, or None if OSP did not give a usable answer."""
+    # A cached lookup may predate the commit that got stuck
+    invoice_cache.invalidate(reference_number)
+    try:
+        res = await osp_lookup(reference_number)
+    except httpx.HTTPStatusError as e:
+        return _PAID if e.response.status_code == 423 else None
+    except Exception as e:
+        logger.warning(f"[Reconcile] lookup {reference_number} failed: {type(e).__name__}: {e} | module=services.reconciliation")
+        return None
+    code = res.get("response_code") if isinstance(res, dict) else None
+    if code == 200:
+        return _OPEN
+    if code == 423:
+        return _PAID
+    return None
+
+
+def _next_step(status: str, state: str, debited: bool) -> str:
+    if state == _OPEN:
+        return "refund"
+    if status == "committed":
+        return "confirm" if debited else "debit"
+    return "reverse"
+
+
+async def _reconcile_one(row, semaphore: asyncio.Semaphore) -> str:
+    payment_id, _, status, reference_number, saga_txid, debit_txid = row
+    with sampling_scope():
+        async with semaphore:
+            state = await _invoice_state(reference_number)
+            if state is None:
+                return "skipped"
+            step = _next_step(status, state, debit_txid is not None)
+            transaction_id = saga_txid or debit_txid
+            if transaction_id is None:
+                if step != "refund":
+                    # OSP holds a payment whose transaction id was never stored
+                    logger.error(
+                        f"[Reconcile] payment={payment_id} {status}: no transaction id to {step} with | module=services.reconciliation"
+                    )
+                    return "manual"
+                # nothing was debited: a fresh id only keys the (no-op) refund lookup
+                transaction_id = generate_transaction_id()
+            async with AsyncSessionLocal() as db:
+                resumed = await resume_payment_saga(db, payment_id, status, step, transaction_id)
+        if not resumed:
+            return "raced"
+        logger.info(f"[Reconcile] payment={payment_id} {status} → {step} (OSP: {state}) | module=services.reconciliation")
+        return step
+
+
+async def reconcile_payments() -> dict:
+    """One reconciliation pass over every stuck payment; returns the run report."""
+    global _lock, _last_run
+    if _lock is None:
+        _lock = asyncio.Lock()
+    async with _lock:
+        started_at = datetime.utcnow()
+        started = time.perf_counter()
+        cutoff = started_at - timedelta(seconds=settings.RECONCILE_MIN_AGE)
+        semaphore = asyncio.Semaphore(max(1, settings.RECONCILE_CONCURRENCY))
+        actions: Dict[str, int] = {}
+        scanned = 0
+        after = None
+
+        with start_root_span("payment.reconcile"):
+            while True:
+                async with AsyncSessionLocal() as db:
+                    rows = (await db.execute(stuck_payments_query(cutoff, after))).all()
+                if not rows:
+                    break
+                after = (rows[-1].created_at, rows[-1].id)
+                scanned += len(rows)
+                for action in await asyncio.gather(*(_reconcile_one(row, semaphore) for row in rows)):
+                    actions[action] = actions.get(action, 0) + 1
+                    RECONCILE_ACTIONS.inc(action)
+                if len(rows) < settings.RECONCILE_BATCH_SIZE:
+                    break
+
+            holds_released = 0
+            while True:
+                async with AsyncSessionLocal() as db:
+                    released = await release_stale_holds(db, limit=max(1, settings.RECONCILE_BATCH_SIZE))
+                holds_released += released
+                if released < settings.RECONCILE_BATCH_SIZE:
+                    break
+
+        seconds = time.perf_counter() - started
+        resumed = sum(n for action, n in actions.items() if action not in ("skipped", "manual", "raced"))
+        _TOTALS["runs"] += 1
+        _TOTALS["scanned"] += scanned
+        _TOTALS["resumed"] += resumed
+        _TOTALS["seconds"] += seconds
+        _last_run = {
+            "started_at": started_at.isoformat(),
+            "duration_seconds": round(seconds, 3),
+            "scanned": scanned,
+            "resumed": resumed,
+            "actions": actions,
+            "holds_released": holds_released,
+            "payments_per_second": round(scanned / seconds, 1) if seconds > 0 else None,
+        }
+    if scanned or holds_released:
+        logger.info(
+            f"[Reconcile] scanned={scanned} resumed={resumed} actions={actions} holds_released={holds_released} "
+            f"in {seconds:.2f}s | module=services.reconciliation"
+        )
+    return _last_run
+
+
+async def get_reconcile_stats() -> dict:
+    """Last run, totals (this process) and the current stuck backlog (database)."""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.RECONCILE_MIN_AGE)
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(
+                    Payment.status,
+                    func.count(Payment.id),
+                    func.count(Payment.id).filter(Payment.created_at < cutoff),
+                    func.min(Payment.created_at),
+                )
+                .where(*_stuck(now))
+                .group_by(Payment.status)
+            )
+        ).all()
+    oldest = min((row[3] for row in rows if row[3] is not None), default=None)
+    return {
+        "interval_seconds": settings.RECONCILE_INTERVAL,
+        "last_run": _last_run,
+        "totals": {
+            **_TOTALS,
+            "seconds": round(_TOTALS["seconds"], 3),
+            "payments_per_second": round(_TOTALS["scanned"] / _TOTALS["seconds"], 1) if _TOTALS["seconds"] else None,
+        },
+        "backlog": {
+            "total": sum(row[1] for row in rows),
+            # old enough for the next pass
+            "due": sum(row[2] for row in rows),
+            "by_status": {row[0]: row[1] for row in rows},
+            "oldest_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+        },
+    }
+
+
+async def _loop() -> None:
+    while True:
+        await asyncio.sleep(settings.RECONCILE_INTERVAL)
+        try:
+            await reconcile_payments()
+        except Exception:
+            logger.exception("[Reconcile] pass failed | module=services.reconciliation")
+
+
+def start_reconciler() -> None:
+    """Schedule periodic passes on the running loop (app startup); RECONCILE_INTERVAL=0 disables them."""
+    global _task
+    if _task is not None or settings.RECONCILE_INTERVAL <= 0:
+        return
+    _task = asyncio.create_task(_loop(), name="payment-reconciler")
+    logger.info(f"Payment reconciler scheduled every {settings.RECONCILE_INTERVAL:g}s | module=services.reconciliation")
+
+
+async def stop_reconciler() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    await asyncio.gather(_task, return_exceptions=True)
+    _task = None
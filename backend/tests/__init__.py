@@ -0,0 +1,57 @@
+# backend/tests/__init__.py
+"""
+Behaviour tests. Run from backend/:
+
+    python -m unittest discover -s tests -t .      (or: python -m pytest tests)
+
+Settings are read once at import time, so the environment is pointed at
+a throwaway SQLite database, log directory and the fake OSP server of
+tests.support here, before any test module imports the app.
+"""
+import os
+import socket
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="dummybank-tests-")
+
+with socket.socket() as _sock:
+    _sock.bind(("127.0.0.1", 0))
+    OSP_PORT = _sock.getsockname()[1]
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_TMP}/test.db",
+    LOG_PATH=f"{_TMP}/logs",
+    LOG_CONSOLE="false",
+    OSP_BASE_URL=f"http://127.0.0.1:{OSP_PORT}",
+    USE_MOCK_OSP="true",
+    OSP_LOOKUP_CACHE_TTL="0",
+    METRICS_MULTIPROC_DIR="",
+    TRACE_SAMPLE_RATE="0",
+    RATE_LIMIT_BACKEND="memory",
+    RATE_LIMIT_START_PER_IP="0",
+    RATE_LIMIT_START_PER_USER="0",
+    RATE_LIMIT_CONFIRM_PER_IP="0",
+    RATE_LIMIT_CONFIRM_PER_USER="0",
+    RATE_LIMIT_REVERSE_PER_USER="0",
+    RATE_LIMIT_BATCH_PAY_PER_IP="0",
+    RATE_LIMIT_BATCH_PAY_PER_USER="0",
+    PAYMENT_SAGA_BACKOFF_BASE="0.01",
+    PAYMENT_SAGA_BACKOFF_MAX="0.05",
+    RECONCILE_INTERVAL="0",
+    LEDGER_SNAPSHOT_INTERVAL="0",
+    TXID_NODE_ID="1",
+)
+for _name, _value in {
+    "SECRET_KEY": "test-secret",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "CORS_ORIGINS": "*",
+    "OSP_AUTH": "test",
+    "OSP_PARTNER": "TEST",
+    "API_VERSION": "v1.0.0",
+    "API_TITLE": "Dummy Bank API",
+    "API_DESCRIPTION": "tests",
+    "API_CONTACT_NAME": "tests",
+    "API_CONTACT_EMAIL": "tests@example.com",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(_name, _value)
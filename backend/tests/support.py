@@ -0,0 +1,182 @@
+# backend/tests/support.py
+"""
+Shared fixtures: a fake OSP server, one app client for the whole test
+process (the async engine stays bound to its event loop) and customers
+with their own account, so tests do not see each other's balances.
+
+Fake OSP behaviour by reference number prefix:
+
+    PAID...          lookup 423 (already paid)
+    HELD...          lookup answers response_code 423 (already paid, as the
+                     mock client sees it: it does not raise on HTTP errors)
+    FAILCOMMIT...    commit answers 500
+    ONCE...          a second commit answers response_code 409 (already committed)
+    FAILCONFIRM...   confirm answers response_code 500
+    anything else    4000 KHR invoice, every call succeeds
+"""
+import itertools
+import json
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from tests import OSP_PORT
+
+# the invoice above: 4000 KHR = 1.00 USD, plus FEE_AMOUNT
+PAYMENT_TOTAL = Decimal("11.00")
+
+calls: List[Tuple[str, Dict[str, str]]] = []
+
+
+class _FakeOSP(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, code: int, obj: dict) -> None:
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if self.command == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            query.update({k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()})
+        calls.append((url.path.rsplit("/", 1)[-1], query))
+        ref = query.get("reference_number", "")
+        if url.path.endswith("query-payment"):
+            if ref.startswith("PAID"):
+                return self._send(423, {"detail": "already paid"})
+            if ref.startswith("HELD"):
+                return self._send(200, {"response_code": 423, "response_msg": "already paid"})
+            return self._send(
+                200,
+                {"response_code": 200, "session_id": f"S-{ref}", "amount": "4000", "currency": "KHR", "customer_name": "Customer"},
+            )
+        if url.path.endswith("commit-payment"):
+            if ref.startswith("FAILCOMMIT"):
+                return self._send(500, {"detail": "commit failed"})
+            if ref.startswith("ONCE") and osp_calls("commit-payment", ref) > 1:
+                return self._send(200, {"response_code": 409, "response_msg": "already committed"})
+            return self._send(
+                200, {"response_code": 200, "acknowledgement_id": f"ACK-{ref}", "cdc_transaction_datetime": "2026-01-01 10:00:00"}
+            )
+        if url.path.endswith("confirm-payment"):
+            return self._send(200, {"response_code": 500 if ref.startswith("FAILCONFIRM") else 200})
+        if url.path.endswith("reverse-payment"):
+            return self._send(200, {"response_code": 200, "reversal_acknowledgement_id": f"RACK-{ref}"})
+        self._send(404, {})
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+def osp_calls(endpoint: str, reference_number: Optional[str] = None) -> int:
+    return sum(
+        1 for path, query in calls
+        if path == endpoint and (reference_number is None or query.get("reference_number") == reference_number)
+    )
+
+
+_lock = threading.Lock()
+_client = None
+_ids = itertools.count(1)
+
+
+def client():
+    """The app under test, started once (startup events, saga workers)."""
+    global _client
+    with _lock:
+        if _client is None:
+            server = ThreadingHTTPServer(("127.0.0.1", OSP_PORT), _FakeOSP)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+            import atexit
+
+            from fastapi.testclient import TestClient
+
+            import main
+
+            _client = TestClient(main.app)
+            _client.__enter__()
+            atexit.register(_client.__exit__, None, None, None)
+        return _client
+
+
+def api(path: str) -> str:
+    from core.config import settings
+
+    return f"/api/dmb/{settings.API_VERSION}{path}"
+
+
+def new_customer(balance: Decimal = Decimal("100.00"), role: str = "user") -> Tuple[Dict[str, str], int]:
+    """A user (PIN 1234) with one USD account: (auth headers, account id)."""
+    from core.security import create_token, hash_password
+    from db.session import SessionLocal
+    from models import Account, User
+    from services.ledger import post_opening_balance
+
+    client()
+    n = next(_ids)
+    with SessionLocal() as db:
+        user = User(
+            name=f"Test {n}",
+            phone=f"0990{n:06d}",
+            password_hash=hash_password("secret"),
+            pin_hash=hash_password("1234"),
+            role=role,
+        )
+        db.add(user)
+        db.flush()
+        account = Account(user_id=user.id, name="Wallet", number=f"T-{n:06d}", balance=balance, currency="USD")
+        db.add(account)
+        db.flush()
+        post_opening_balance(db, account)
+        db.commit()
+        return {"Authorization": f"Bearer {create_token(user.id)}"}, account.id
+
+
+def account_balance(account_id: int) -> Tuple[Decimal, Decimal]:
+    """(balance, held) as stored."""
+    from db.session import SessionLocal
+    from models import Account
+
+    with SessionLocal() as db:
+        account = db.get(Account, account_id)
+        return Decimal(account.balance), Decimal(account.held or 0)
+
+
+def payment_row(payment_id: int):
+    from db.session import SessionLocal
+    from models import BalanceHold, Payment
+
+    with SessionLocal() as db:
+        payment = db.get(Payment, payment_id)
+        hold = db.query(BalanceHold).filter_by(payment_id=payment_id).first()
+        return payment.status, (hold.status if hold else None)
+
+
+def start_payment(headers: Dict[str, str], account_id: int, reference_number: str, **extra_headers):
+    return client().post(
+        api("/payments/start"),
+        params={"account_id": account_id, "reference_number": reference_number, "service_id": 1},
+        headers={**headers, **extra_headers},
+    )
+
+
+def confirm_payment(headers: Dict[str, str], payment_id: int, pin: str = "1234", **extra_headers):
+    return client().post(
+        api(f"/payments/{payment_id}/confirm"), params={"pin": pin}, headers={**headers, **extra_headers}
+    )
+
+
+def run(async_fn, *args):
+    """Run `async_fn(*args)` on the app's event loop."""
+    return client().portal.call(async_fn, *args)
@@ -0,0 +1,50 @@
+# backend/tests/test_batch_payment.py
+import unittest
+from decimal import Decimal
+
+from tests.support import PAYMENT_TOTAL, account_balance, api, client, new_customer, osp_calls
+
+
+def _batch(headers, account, references, pin="1234"):
+    return client().post(
+        api("/payments/batch"),
+        json={"account_id": account, "service_id": 1, "pin": pin, "reference_numbers": references},
+        headers=headers,
+    )
+
+
+class BatchPaymentTest(unittest.TestCase):
+    def test_pays_what_can_be_paid(self):
+        headers, account = new_customer(Decimal("100.00"))
+        r = _batch(headers, account, ["BATCH-1A", "PAID-1", "BATCH-1B", "BATCH-1A"])
+        self.assertEqual(r.status_code, 200, r.text)
+        body = r.json()
+        self.assertEqual(
+            [item["status"] for item in body["items"]], ["confirmed", "lookup-failed", "confirmed", "skipped"]
+        )
+        self.assertEqual(Decimal(str(body["total_reserved"])), 2 * PAYMENT_TOTAL)
+        self.assertEqual(account_balance(account), (Decimal("100.00") - 2 * PAYMENT_TOTAL, Decimal("0.00")))
+
+    def test_failed_commit_is_reversed_and_refunded(self):
+        headers, account = new_customer(Decimal("100.00"))
+        r = _batch(headers, account, ["BATCH-2A", "FAILCOMMIT-2"])
+        self.assertEqual(r.status_code, 200, r.text)
+        # a commit answered 5xx may still have reached OSP: reversed there, refunded here
+        self.assertEqual([item["status"] for item in r.json()["items"]], ["confirmed", "reversed"])
+        self.assertEqual(account_balance(account)[0], Decimal("100.00") - PAYMENT_TOTAL)
+
+    def test_all_or_nothing_on_insufficient_balance(self):
+        headers, account = new_customer(PAYMENT_TOTAL)
+        r = _batch(headers, account, ["BATCH-3A", "BATCH-3B"])
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(account_balance(account), (PAYMENT_TOTAL, Decimal("0.00")))
+        self.assertEqual(osp_calls("commit-payment", "BATCH-3A"), 0)
+
+    def test_wrong_pin_is_rejected_before_any_lookup(self):
+        headers, account = new_customer()
+        self.assertEqual(_batch(headers, account, ["BATCH-4"], pin="9999").status_code, 402)
+        self.assertEqual(osp_calls("query-payment", "BATCH-4"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+# backend/tests/test_debug.py
+import unittest
+
+from tests.support import api, client, new_customer
+
+
+class DebugAccessTest(unittest.TestCase):
+    def test_admin_only(self):
+        customer, _ = new_customer()
+        admin, _ = new_customer(role="admin")
+        for path in ("/debug/payment-saga", "/debug/ledger", "/debug/idempotency", "/debug/osp-pool"):
+            with self.subTest(path=path):
+                self.assertEqual(client().get(api(path)).status_code, 401)
+                self.assertEqual(client().get(api(path), headers=customer).status_code, 403)
+                self.assertEqual(client().get(api(path), headers=admin).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+# backend/tests/test_export.py
+import csv
+import io
+import json
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from tests.support import api, client, new_customer
+
+# far from the rows the other tests create "now", so the date filter isolates these
+_DAYS = [datetime(2001, 1, day, 12, 0) for day in (1, 2, 3)]
+
+
+def _seed() -> None:
+    """One payment per day of _DAYS with its debit transaction; the second payment failed."""
+    from db.session import SessionLocal
+    from models import Account, Payment, Transaction
+
+    _, account_id = new_customer()
+    with SessionLocal() as db:
+        account = db.get(Account, account_id)
+        for n, day in enumerate(_DAYS, start=1):
+            payment = Payment(
+                user_id=account.user_id, account_id=account_id, service_id=1, reference_number=f"EXPORT-{n}",
+                customer_name=f'Customer "{n}", Ltd', amount=Decimal(n), fee=Decimal("0.50"),
+                total_amount=Decimal(n) + Decimal("0.50"), currency="USD",
+                status="failed" if n == 2 else "confirmed", created_at=day,
+            )
+            db.add(payment)
+            db.flush()
+            db.add(
+                Transaction(
+                    transaction_id=f"2001010{n}000000001000000000001", user_id=account.user_id, account_id=account_id,
+                    payment_id=payment.id, reference_number=payment.reference_number, amount=payment.total_amount,
+                    currency="USD", direction="debit", created_at=day,
+                )
+            )
+        db.commit()
+
+
+class ExportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        _seed()
+        cls.admin, _ = new_customer(role="admin")
+
+    def _export(self, what: str, fmt: str, **params):
+        params = {"format": fmt, "start_date": "2001-01-01T00:00:00", "end_date": "2001-01-31T00:00:00", **params}
+        r = client().get(api(f"/adm/{what}/export"), params=params, headers=self.admin)
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(r.headers["content-disposition"], f'attachment; filename="{what}.{fmt}"')
+        return r
+
+    def test_payments_as_csv(self):
+        r = self._export("payments", "csv")
+        self.assertTrue(r.headers["content-type"].startswith("text/csv"))
+        rows = list(csv.reader(io.StringIO(r.text)))
+        header, rows = rows[0], rows[1:]
+        self.assertEqual(header[:3], ["id", "customer_name", "service_id"])
+        self.assertIn("reference_number", header)
+        records = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([r["reference_number"] for r in records], ["EXPORT-1", "EXPORT-2", "EXPORT-3"])
+        # quoting survives commas and quotes; numbers and dates are plain text
+        self.assertEqual(records[0]["customer_name"], 'Customer "1", Ltd')
+        self.assertEqual(records[0]["total_amount"], "1.5")
+        self.assertEqual(records[0]["created_at"], "2001-01-01T12:00:00")
+
+    def test_payments_as_ndjson_filtered(self):
+        r = self._export("payments", "ndjson", status="confirmed", end_date="2001-01-02T23:59:59")
+        self.assertTrue(r.headers["content-type"].startswith("application/x-ndjson"))
+        records = [json.loads(line) for line in r.text.splitlines()]
+        self.assertEqual([(p["reference_number"], p["status"]) for p in records], [("EXPORT-1", "confirmed")])
+        self.assertEqual(records[0]["total_amount"], 1.5)
+
+    def test_transactions_as_csv_and_ndjson(self):
+        rows = list(csv.reader(io.StringIO(self._export("transactions", "csv", start_date="2001-01-02T00:00:00").text)))
+        header = rows[0]
+        self.assertEqual(header[:4], ["id", "transaction_id", "direction", "created_at"])
+        self.assertEqual([dict(zip(header, row))["reference_number"] for row in rows[1:]], ["EXPORT-2", "EXPORT-3"])
+
+        records = [json.loads(line) for line in self._export("transactions", "ndjson").text.splitlines()]
+        self.assertEqual([t["reference_number"] for t in records], ["EXPORT-1", "EXPORT-2", "EXPORT-3"])
+        self.assertEqual({t["direction"] for t in records}, {"debit"})
+        self.assertEqual(records[1]["status"], "failed")
+        self.assertEqual(records[2]["amount"], 3.0)
+
+    def test_admin_only_and_known_formats(self):
+        customer, _ = new_customer()
+        for what in ("payments", "transactions"):
+            with self.subTest(what=what):
+                self.assertEqual(client().get(api(f"/adm/{what}/export"), headers=customer).status_code, 403)
+                r = client().get(api(f"/adm/{what}/export"), params={"format": "xml"}, headers=self.admin)
+                self.assertEqual(r.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
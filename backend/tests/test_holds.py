@@ -0,0 +1,130 @@
+# backend/tests/test_holds.py
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from tests.support import (
+    PAYMENT_TOTAL,
+    account_balance,
+    api,
+    client,
+    confirm_payment,
+    new_customer,
+    osp_calls,
+    payment_row,
+    run,
+    start_payment,
+)
+
+
+def _sweep() -> int:
+    from db.session import AsyncSessionLocal
+    from services.account_balance import release_stale_holds
+
+    async def sweep():
+        async with AsyncSessionLocal() as db:
+            return await release_stale_holds(db)
+
+    return run(sweep)
+
+
+def _set(payment_id: int, status=None, hold_expires_at=None) -> None:
+    from db.session import SessionLocal
+    from models import BalanceHold, Payment
+
+    with SessionLocal() as db:
+        if status is not None:
+            db.get(Payment, payment_id).status = status
+        if hold_expires_at is not None:
+            db.query(BalanceHold).filter_by(payment_id=payment_id).update({"expires_at": hold_expires_at})
+        db.commit()
+
+
+class HoldLifecycleTest(unittest.TestCase):
+    def test_start_holds_and_confirm_captures(self):
+        headers, account = new_customer(Decimal("100.00"))
+        r = start_payment(headers, account, "HOLD-1")
+        self.assertEqual(r.status_code, 200, r.text)
+        payment = r.json()["payment_id"]
+        self.assertEqual(account_balance(account), (Decimal("100.00"), PAYMENT_TOTAL))
+        self.assertEqual(payment_row(payment), ("started", "held"))
+
+        r = confirm_payment(headers, payment)
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(account_balance(account), (Decimal("100.00") - PAYMENT_TOTAL, Decimal("0.00")))
+        self.assertEqual(payment_row(payment), ("confirmed", "captured"))
+
+    def test_start_refuses_funds_already_held(self):
+        headers, account = new_customer(PAYMENT_TOTAL + Decimal("5.00"))
+        self.assertEqual(start_payment(headers, account, "HOLD-2A").status_code, 200)
+        r = start_payment(headers, account, "HOLD-2B")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["detail"], "Insufficient balance")
+
+    def test_failed_confirm_gives_the_money_back(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "FAILCONFIRM-1").json()["payment_id"]
+        r = confirm_payment(headers, payment)
+        self.assertEqual(r.status_code, 400, r.text)
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(payment_row(payment)[0], "reversed")
+
+
+class HoldReleaseTest(unittest.TestCase):
+    def test_reversing_a_started_payment_cancels_it(self):
+        from core.metrics import PAYMENT_TRANSITIONS
+
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "HOLD-3").json()["payment_id"]
+        canceled = PAYMENT_TRANSITIONS.collect().get(("started", "canceled"), 0.0)
+        r = client().post(api(f"/payments/{payment}/reverse"), headers=headers)
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(r.json()["status"], "canceled")
+        self.assertEqual(PAYMENT_TRANSITIONS.collect().get(("started", "canceled")), canceled + 1)
+        self.assertEqual(payment_row(payment), ("canceled", "released"))
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(osp_calls("reverse-payment", "HOLD-3"), 0)
+
+    def test_reversing_a_confirmed_payment_refunds_it(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "HOLD-4").json()["payment_id"]
+        self.assertEqual(confirm_payment(headers, payment).status_code, 200)
+        r = client().post(api(f"/payments/{payment}/reverse"), headers=headers)
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(r.json()["status"], "reversed")
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(osp_calls("reverse-payment", "HOLD-4"), 1)
+        # nothing left to reverse
+        r = client().post(api(f"/payments/{payment}/reverse"), headers=headers)
+        self.assertEqual(r.status_code, 409)
+
+    def test_admin_status_change_releases_the_hold(self):
+        admin, _ = new_customer(role="admin")
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "HOLD-5").json()["payment_id"]
+        r = client().put(api(f"/adm/payments/{payment}/status"), json={"status": "failed"}, headers=admin)
+        self.assertEqual(r.status_code, 200, r.text)
+        self.assertEqual(payment_row(payment), ("failed", "released"))
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+
+    def test_sweep_releases_holds_nothing_will_capture(self):
+        headers, account = new_customer(Decimal("100.00"))
+        done = start_payment(headers, account, "HOLD-6A").json()["payment_id"]
+        expired = start_payment(headers, account, "HOLD-6B").json()["payment_id"]
+        waiting = start_payment(headers, account, "HOLD-6C").json()["payment_id"]
+        unreversed = start_payment(headers, account, "HOLD-6D").json()["payment_id"]
+        _set(done, status="failed")
+        _set(expired, hold_expires_at=datetime.utcnow() - timedelta(seconds=1))
+        # committed at OSP, reversal gave up: the funds stay reserved for reconciliation
+        _set(unreversed, status="reversal_failed", hold_expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+        self.assertGreaterEqual(_sweep(), 2)
+        self.assertEqual(payment_row(done), ("failed", "released"))
+        self.assertEqual(payment_row(expired), ("started", "released"))
+        self.assertEqual(payment_row(waiting), ("started", "held"))
+        self.assertEqual(payment_row(unreversed), ("reversal_failed", "held"))
+        self.assertEqual(account_balance(account), (Decimal("100.00"), 2 * PAYMENT_TOTAL))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# backend/tests/test_idempotency.py
+import asyncio
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import httpx
+
+from tests.support import (
+    PAYMENT_TOTAL,
+    account_balance,
+    api,
+    client,
+    confirm_payment,
+    new_customer,
+    osp_calls,
+    run,
+    start_payment,
+)
+
+REPLAYED = "idempotent-replayed"
+
+
+class IdempotencyKeyTest(unittest.TestCase):
+    def test_retry_gets_the_stored_response(self):
+        headers, account = new_customer()
+        first = start_payment(headers, account, "IDEM-1", **{"Idempotency-Key": "start-1"})
+        retry = start_payment(headers, account, "IDEM-1", **{"Idempotency-Key": "start-1"})
+        self.assertEqual(first.status_code, 200, first.text)
+        self.assertIsNone(first.headers.get(REPLAYED))
+        self.assertEqual(retry.headers.get(REPLAYED), "true")
+        self.assertEqual(retry.json(), first.json())
+        # one payment, one hold
+        self.assertEqual(account_balance(account)[1], PAYMENT_TOTAL)
+
+    def test_without_a_key_requests_are_not_deduplicated(self):
+        headers, account = new_customer()
+        a = start_payment(headers, account, "IDEM-2").json()["payment_id"]
+        b = start_payment(headers, account, "IDEM-2").json()["payment_id"]
+        self.assertNotEqual(a, b)
+
+    def test_key_reused_for_another_request(self):
+        headers, account = new_customer()
+        start_payment(headers, account, "IDEM-3A", **{"Idempotency-Key": "start-3"})
+        r = start_payment(headers, account, "IDEM-3B", **{"Idempotency-Key": "start-3"})
+        self.assertEqual(r.status_code, 422)
+
+    def test_keys_are_scoped_per_caller(self):
+        first, account_a = new_customer()
+        second, account_b = new_customer()
+        a = start_payment(first, account_a, "IDEM-4", **{"Idempotency-Key": "shared"})
+        b = start_payment(second, account_b, "IDEM-4", **{"Idempotency-Key": "shared"})
+        self.assertIsNone(b.headers.get(REPLAYED))
+        self.assertNotEqual(a.json()["payment_id"], b.json()["payment_id"])
+
+    def test_concurrent_duplicates_run_once(self):
+        import main
+
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "IDEM-5").json()["payment_id"]
+
+        async def confirm_six_times():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await asyncio.gather(
+                    *(
+                        http.post(
+                            api(f"/payments/{payment}/confirm"),
+                            params={"pin": "1234"},
+                            headers={**headers, "Idempotency-Key": "confirm-5"},
+                        )
+                        for _ in range(6)
+                    )
+                )
+
+        responses = run(confirm_six_times)
+        self.assertEqual({r.status_code for r in responses}, {200})
+        self.assertEqual(sum(1 for r in responses if r.headers.get(REPLAYED)), 5)
+        self.assertEqual(osp_calls("commit-payment", "IDEM-5"), 1)
+        self.assertEqual(account_balance(account), (Decimal("100.00") - PAYMENT_TOTAL, Decimal("0.00")))
+
+    def test_final_client_errors_are_replayed(self):
+        headers, account = new_customer()
+        payment = start_payment(headers, account, "IDEM-6").json()["payment_id"]
+        first = confirm_payment(headers, payment, pin="9999", **{"Idempotency-Key": "confirm-6"})
+        retry = confirm_payment(headers, payment, pin="9999", **{"Idempotency-Key": "confirm-6"})
+        self.assertEqual((first.status_code, retry.status_code), (402, 402))
+        self.assertEqual(retry.headers.get(REPLAYED), "true")
+
+    def test_temporary_errors_are_not_stored(self):
+        headers, account = new_customer()
+        payment = start_payment(headers, account, "IDEM-7").json()["payment_id"]
+        self.assertEqual(client().post(api(f"/payments/{payment}/reverse"), headers=headers).status_code, 200)
+        for _ in range(2):
+            # canceled: 409, which may be temporary for other payments (still processing)
+            r = client().post(api(f"/payments/{payment}/reverse"), headers={**headers, "Idempotency-Key": "rev-7"})
+            self.assertEqual(r.status_code, 409)
+            self.assertIsNone(r.headers.get(REPLAYED))
+
+    def test_still_processing_is_not_stored(self):
+        from core.config import settings
+        from services.payment_saga import wait_for_saga
+
+        headers, account = new_customer()
+        payment = start_payment(headers, account, "IDEM-8").json()["payment_id"]
+        with mock.patch.object(settings, "PAYMENT_CONFIRM_WAIT_SECONDS", 0):
+            first = confirm_payment(headers, payment, **{"Idempotency-Key": "confirm-8"})
+        self.assertEqual(first.status_code, 202, first.text)
+
+        self.assertEqual(run(wait_for_saga, payment, 5.0).status, "succeeded")
+        # the retry gets the outcome, not the stored "processing" answer
+        retry = confirm_payment(headers, payment, **{"Idempotency-Key": "confirm-8"})
+        self.assertEqual(retry.status_code, 200, retry.text)
+        self.assertIsNone(retry.headers.get(REPLAYED))
+        self.assertEqual(osp_calls("commit-payment", "IDEM-8"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# backend/tests/test_log_sampling.py
+import asyncio
+import contextlib
+import random
+import unittest
+
+from core.config import settings
+from core.utils.log_sampling import sampling_scope, should_log as _should_log
+
+
+def should_log(failed: bool = False) -> bool:
+    # at a level the tests' LOG_LEVEL lets through
+    return _should_log(failed=failed, level="WARNING")
+
+
+class SamplingScopeTest(unittest.TestCase):
+    def setUp(self):
+        self._rate = settings.LOG_PAYMENT_SAMPLE_RATE
+        settings.LOG_PAYMENT_SAMPLE_RATE = 0.5
+        random.seed(7)
+
+    def tearDown(self):
+        settings.LOG_PAYMENT_SAMPLE_RATE = self._rate
+
+    @staticmethod
+    def _worker(scoped: bool):
+        """One long-lived task handling 200 units of work, like a saga worker."""
+
+        async def worker():
+            decisions = []
+            for _ in range(200):
+                with sampling_scope() if scoped else contextlib.nullcontext():
+                    first = should_log()
+                    # the decision holds for the whole unit of work
+                    assert all(should_log() == first for _ in range(3))
+                    decisions.append(first)
+                await asyncio.sleep(0)
+            return decisions
+
+        return asyncio.run(worker())
+
+    def test_each_unit_of_work_is_sampled_on_its_own(self):
+        decisions = self._worker(scoped=True)
+        self.assertTrue(any(decisions))
+        self.assertFalse(all(decisions))
+
+    def test_without_a_scope_the_first_decision_sticks(self):
+        self.assertEqual(len(set(self._worker(scoped=False))), 1)
+
+    def test_failures_are_always_logged(self):
+        settings.LOG_PAYMENT_SAMPLE_RATE = 0.0
+        with sampling_scope():
+            self.assertFalse(should_log())
+            self.assertTrue(should_log(failed=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
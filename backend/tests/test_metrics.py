@@ -0,0 +1,134 @@
+# backend/tests/test_metrics.py
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from tests.support import api, client, new_customer
+
+
+def _sample(text: str, name_and_labels: str) -> float:
+    """Value of the exposition line starting with `name_and_labels` (0 if absent)."""
+    for line in text.splitlines():
+        if line.startswith(name_and_labels + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class _Scratch(unittest.TestCase):
+    """Metrics made by a test are taken out of the registry again, so /metrics does not show them."""
+
+    def _metric(self, cls, name: str, *args, **kwargs):
+        from core import metrics
+
+        metric = cls(name, f"{name} (test)", *args, **kwargs)
+        self.addCleanup(metrics.REGISTRY.remove, metric)
+        return metric
+
+
+class ScrapeTest(unittest.TestCase):
+    def test_requests_are_counted_per_route_template(self):
+        headers, _ = new_customer()
+        route = "/payments/{payment_id}/status"
+        counter = f'http_requests_total{{method="GET",route="{route}",status="404"}}'
+        count = f'http_request_duration_seconds_count{{method="GET",route="{route}"}}'
+        inf = f'http_request_duration_seconds_bucket{{method="GET",route="{route}",le="+Inf"}}'
+        before = client().get("/metrics").text
+
+        self.assertEqual(client().get(api("/payments/999999/status"), headers=headers).status_code, 404)
+        self.assertEqual(client().get("/no/such/path/12345").status_code, 404)
+        r = client().get("/metrics")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.headers["content-type"].startswith("text/plain; version=0.0.4"))
+
+        text = r.text
+        self.assertIn("# TYPE http_requests_total counter", text)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertEqual(_sample(text, counter), _sample(before, counter) + 1)
+        self.assertEqual(_sample(text, count), _sample(before, count) + 1)
+        self.assertEqual(_sample(text, inf), _sample(text, count))
+        # the payment id never becomes a label value; unknown paths share one label
+        self.assertNotIn("999999", text)
+        self.assertNotIn("/no/such/path", text)
+        self.assertGreaterEqual(_sample(text, 'http_requests_total{method="GET",route="unmatched",status="404"}'), 1)
+
+
+class RenderTest(_Scratch):
+    def test_histogram_buckets_are_cumulative(self):
+        from core.metrics import Histogram, render_metrics
+
+        histogram = self._metric(Histogram, "test_latency_seconds", ("endpoint",), buckets=(1.0, 0.1))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value, "osp.lookup")
+
+        text = render_metrics()
+        labels = 'endpoint="osp.lookup"'
+        # a value equal to a bound falls in that bucket (le = less or equal)
+        self.assertEqual(_sample(text, f'test_latency_seconds_bucket{{{labels},le="0.1"}}'), 2)
+        self.assertEqual(_sample(text, f'test_latency_seconds_bucket{{{labels},le="1.0"}}'), 3)
+        self.assertEqual(_sample(text, f'test_latency_seconds_bucket{{{labels},le="+Inf"}}'), 4)
+        self.assertAlmostEqual(_sample(text, f"test_latency_seconds_sum{{{labels}}}"), 5.65)
+        self.assertEqual(_sample(text, f"test_latency_seconds_count{{{labels}}}"), 4)
+
+    def test_label_values_are_escaped(self):
+        from core.metrics import Counter, render_metrics
+
+        counter = self._metric(Counter, "test_escaped_total", ("kind",))
+        counter.inc('say "hi"\\\n')
+        self.assertIn('test_escaped_total{kind="say \\"hi\\"\\\\\\n"} 1.0', render_metrics())
+
+
+class WorkerMergeTest(_Scratch):
+    def setUp(self):
+        from core.config import settings
+
+        self.directory = tempfile.mkdtemp(prefix="metrics-")
+        patch = mock.patch.object(settings, "METRICS_MULTIPROC_DIR", self.directory)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _worker(self, pid: int, samples: dict, age: float = 0.0) -> None:
+        path = os.path.join(self.directory, f"{pid}.json")
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({name: {"samples": s} for name, s in samples.items()}, fh)
+        if age:
+            os.utime(path, (time.time() - age, time.time() - age))
+
+    def test_other_workers_are_merged_into_the_scrape(self):
+        from core.config import settings
+        from core.metrics import Counter, Gauge, Histogram, render_metrics
+
+        counter = self._metric(Counter, "test_merged_total", ("outcome",))
+        gauge = self._metric(Gauge, "test_in_use", ("engine",))
+        histogram = self._metric(Histogram, "test_merged_seconds", (), buckets=(0.1, 1.0))
+        counter.inc("ok")
+        gauge.inc("async", amount=2)
+        histogram.observe(0.05)
+
+        live = {
+            "test_merged_total": [[["ok"], 2.0], [["error"], 1.0]],
+            "test_in_use": [[["async"], 3.0]],
+            "test_merged_seconds": [[[], [[0, 1, 1], 5.5, 2]]],
+        }
+        self._worker(1001, live)
+        # stopped worker: its counts stay, its gauges are gone
+        self._worker(1002, live, age=10 * settings.METRICS_FLUSH_INTERVAL)
+        # a snapshot with other buckets (older build) is left out of the histogram
+        self._worker(1003, {"test_merged_seconds": [[[], [[1, 1], 1.0, 2]]]})
+        with open(os.path.join(self.directory, "1004.json"), "w") as fh:
+            fh.write("{half a snapsh")
+
+        text = render_metrics()
+        self.assertEqual(_sample(text, 'test_merged_total{outcome="ok"}'), 5)
+        self.assertEqual(_sample(text, 'test_merged_total{outcome="error"}'), 2)
+        self.assertEqual(_sample(text, 'test_in_use{engine="async"}'), 5)
+        self.assertEqual(_sample(text, 'test_merged_seconds_bucket{le="0.1"}'), 1)
+        self.assertEqual(_sample(text, 'test_merged_seconds_bucket{le="1.0"}'), 3)
+        self.assertEqual(_sample(text, 'test_merged_seconds_bucket{le="+Inf"}'), 5)
+        self.assertEqual(_sample(text, "test_merged_seconds_count"), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# backend/tests/test_osp_breaker.py
+import time
+import unittest
+
+from core.config import settings
+from services.osp_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test",
+        **kwargs,
+        failure_rate=0.5,
+        slow_call_seconds=10.0,
+        min_calls=10,
+        window_size=100,
+        open_seconds=30.0,
+        half_open_probes=1,
+    )
+
+
+class AdaptiveTimeoutTest(unittest.TestCase):
+    def test_budget_follows_observed_latency(self):
+        breaker = _breaker()
+        self.assertEqual(breaker.timeout(), float(settings.OSP_TIMEOUT))
+        for _ in range(100):
+            breaker.record(False, 0.2)
+        self.assertEqual(breaker.timeout(), max(0.2 * settings.OSP_TIMEOUT_MULTIPLIER, settings.OSP_TIMEOUT_MIN))
+
+    def test_non_adaptive_budget_stays_at_the_ceiling(self):
+        # commit/confirm/reverse: a cut-short call leaves OSP's side unknown
+        breaker = _breaker(adaptive_timeout=False)
+        for _ in range(100):
+            breaker.record(False, 0.2)
+        self.assertEqual(breaker.timeout(), float(settings.OSP_TIMEOUT))
+
+    def test_guard_is_adaptive_only_when_asked(self):
+        import asyncio
+
+        from services.osp_breaker import get_breaker, osp_guard
+
+        @osp_guard("test.write")
+        async def write():
+            return "ok"
+
+        @osp_guard("test.read", adaptive_timeout=True)
+        async def read():
+            return "ok"
+
+        self.assertEqual(asyncio.run(write()), "ok")
+        self.assertEqual(asyncio.run(read()), "ok")
+        self.assertFalse(get_breaker("test.write").adaptive_timeout)
+        self.assertTrue(get_breaker("test.read").adaptive_timeout)
+
+    def test_timed_out_calls_raise_the_budget(self):
+        breaker = _breaker()
+        for _ in range(100):
+            breaker.record(False, 0.2)
+        budget = breaker.timeout()
+        for _ in range(2):
+            breaker.record(True, budget, timed_out=True)
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertGreater(breaker.timeout(), budget)
+
+    def test_breaker_recovers_when_osp_gets_slower(self):
+        # 0.2s calls, then OSP settles at 2.5s: slower than the learnt budget, below the slow-call threshold
+        breaker = _breaker()
+        for _ in range(100):
+            breaker.record(False, 0.2)
+        while breaker.state == CLOSED:
+            breaker.record(True, breaker.timeout(), timed_out=True)
+        self.assertEqual(breaker.state, OPEN)
+
+        breaker.opened_at = time.monotonic() - breaker.open_seconds
+        breaker.before_call()
+        self.assertEqual(breaker.state, HALF_OPEN)
+        # the probe gets the full ceiling, not the budget learnt before the outage
+        self.assertEqual(breaker.timeout(), float(settings.OSP_TIMEOUT))
+        breaker.record(False, 2.5)
+        self.assertEqual(breaker.state, CLOSED)
+
+        for _ in range(breaker.min_calls):
+            self.assertGreater(breaker.timeout(), 2.5)
+            breaker.record(False, 2.5)
+        self.assertGreaterEqual(breaker.timeout(), 2.5 * settings.OSP_TIMEOUT_MULTIPLIER)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+# backend/tests/test_osp_cache.py
+import asyncio
+import unittest
+from unittest import mock
+
+from services import osp_cache
+from services.osp_cache import InvoiceLookupCache, cached_lookup, invalidates_lookup
+
+
+class _Upstream:
+    """Fake osp_lookup: counts calls; `gate` holds them in flight until set."""
+
+    def __init__(self, response_code: int = 200):
+        self.calls = 0
+        self.response_code = response_code
+        self.gate = None
+
+    async def __call__(self, reference_number: str) -> dict:
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return {"response_code": self.response_code, "reference_number": reference_number, "call": self.calls}
+
+
+class LookupCacheTest(unittest.TestCase):
+    # the suite runs with OSP_LOOKUP_CACHE_TTL=0 (cache off): each test sets its own TTL
+
+    def test_hits_until_the_ttl_runs_out(self):
+        cache, upstream = InvoiceLookupCache(ttl_seconds=0.2, max_entries=10), _Upstream()
+
+        async def scenario():
+            first = await cache.get("REF-1", upstream)
+            second = await cache.get("REF-1", upstream)
+            await asyncio.sleep(0.25)
+            third = await cache.get("REF-1", upstream)
+            return first, second, third
+
+        first, second, third = asyncio.run(scenario())
+        self.assertEqual((first["call"], second["call"], third["call"]), (1, 1, 2))
+        self.assertEqual(upstream.calls, 2)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 2))
+
+    def test_errors_and_disabled_cache_go_upstream(self):
+        paid = _Upstream(response_code=423)
+        cache = InvoiceLookupCache(ttl_seconds=60, max_entries=10)
+        off, upstream = InvoiceLookupCache(ttl_seconds=0, max_entries=10), _Upstream()
+
+        async def scenario():
+            for _ in range(2):
+                await cache.get("PAID-1", paid)
+                await off.get("REF-2", upstream)
+
+        asyncio.run(scenario())
+        self.assertEqual((paid.calls, upstream.calls), (2, 2))
+
+    def test_returned_results_are_copies(self):
+        cache, upstream = InvoiceLookupCache(ttl_seconds=60, max_entries=10), _Upstream()
+
+        async def scenario():
+            (await cache.get("REF-3", upstream))["amount"] = "tampered"
+            return await cache.get("REF-3", upstream)
+
+        self.assertNotIn("amount", asyncio.run(scenario()))
+
+    def test_concurrent_lookups_share_one_upstream_call(self):
+        cache, upstream = InvoiceLookupCache(ttl_seconds=60, max_entries=10), _Upstream()
+
+        async def scenario():
+            upstream.gate = asyncio.Event()
+            lookups = [asyncio.create_task(cache.get("REF-4", upstream)) for _ in range(5)]
+            await asyncio.sleep(0.01)
+            upstream.gate.set()
+            return await asyncio.gather(*lookups)
+
+        results = asyncio.run(scenario())
+        self.assertEqual(upstream.calls, 1)
+        self.assertEqual({r["call"] for r in results}, {1})
+        self.assertEqual(cache.stats()["coalesced"], 4)
+
+    def test_least_recently_stored_entries_are_evicted(self):
+        cache, upstream = InvoiceLookupCache(ttl_seconds=60, max_entries=2), _Upstream()
+
+        async def scenario():
+            for ref in ("REF-5A", "REF-5B", "REF-5C", "REF-5A"):
+                await cache.get(ref, upstream)
+
+        asyncio.run(scenario())
+        self.assertEqual(upstream.calls, 4)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+
+class InvalidationTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.object(osp_cache, "invoice_cache", InvoiceLookupCache(ttl_seconds=60, max_entries=10))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.upstream = _Upstream()
+        self.lookup = cached_lookup(self.upstream)
+
+        @invalidates_lookup
+        async def commit(reference_number: str, fail: bool = False) -> dict:
+            if fail:
+                raise RuntimeError("OSP down")
+            return {"response_code": 200}
+
+        self.commit = commit
+
+    def test_state_changing_calls_drop_the_entry(self):
+        async def scenario():
+            await self.lookup("REF-6")
+            await self.commit("REF-6")
+            await self.lookup("REF-6")
+            with self.assertRaises(RuntimeError):
+                await self.commit("REF-6", fail=True)
+            await self.lookup("REF-6")
+
+        asyncio.run(scenario())
+        self.assertEqual(self.upstream.calls, 3)
+        self.assertEqual(osp_cache.invoice_cache.stats()["invalidations"], 2)
+
+    def test_commit_during_an_inflight_lookup_is_not_cached_over(self):
+        async def scenario():
+            self.upstream.gate = asyncio.Event()
+            before = asyncio.create_task(self.lookup("REF-7"))
+            waiter = asyncio.create_task(self.lookup("REF-7"))
+            await asyncio.sleep(0.01)
+            # OSP state changes while the lookup is still on the wire
+            await self.commit("REF-7")
+            self.upstream.gate.set()
+            stale = await asyncio.gather(before, waiter)
+            after = await self.lookup("REF-7")
+            return stale, after
+
+        stale, after = asyncio.run(scenario())
+        # the waiter still shares the in-flight call, but its (pre-commit) answer is not stored
+        self.assertEqual([r["call"] for r in stale], [1, 1])
+        self.assertEqual(after["call"], 2)
+        self.assertEqual(self.upstream.calls, 2)
+        self.assertEqual(osp_cache.invoice_cache.stats()["entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
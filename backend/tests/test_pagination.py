@@ -0,0 +1,86 @@
+# backend/tests/test_pagination.py
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+
+from core.utils.pagination import decode_cursor, encode_cursor
+from tests.support import api, client, new_customer
+
+_BASE = datetime(2024, 3, 1, 12, 0, 0)
+
+
+def _add_transactions(account_id: int, times: list) -> list:
+    """Transactions on the account's owner at the given created_at times: their ids."""
+    from db.session import SessionLocal
+    from models import Account, Transaction
+
+    with SessionLocal() as db:
+        user_id = db.get(Account, account_id).user_id
+        rows = [
+            Transaction(
+                user_id=user_id, account_id=account_id, reference_number=f"PAGE-{i}",
+                amount=Decimal("1.00"), created_at=created_at,
+            )
+            for i, created_at in enumerate(times)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+
+
+def _pages(path: str, headers: dict, size_param: str, size: int) -> list:
+    items, cursor = [], None
+    while True:
+        params = {size_param: size, "total": "none"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client().get(api(path), params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            return items
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(_BASE, 42)), (_BASE, 42))
+
+    def test_invalid_cursor_is_400(self):
+        for cursor in ("not-base64!", encode_cursor(_BASE, 1)[:-3], "W251bGwsMV0"):  # last: [null,1]
+            with self.subTest(cursor=cursor), self.assertRaises(HTTPException) as raised:
+                decode_cursor(cursor)
+            self.assertEqual(raised.exception.status_code, 400)
+
+
+class KeysetPaginationTest(unittest.TestCase):
+    def test_user_transactions_newest_first_with_ties(self):
+        headers, account_id = new_customer()
+        # three rows share a timestamp: the id breaks the tie across page boundaries
+        times = [_BASE, _BASE + timedelta(seconds=1), _BASE + timedelta(seconds=1),
+                 _BASE + timedelta(seconds=1), _BASE + timedelta(seconds=2), _BASE - timedelta(days=1), _BASE]
+        ids = _add_transactions(account_id, times)
+        expected = [i for _, i in sorted(zip(times, ids), reverse=True)]
+
+        for size in (1, 2, 3, 7, 10):
+            with self.subTest(page_size=size):
+                pages = _pages("/transactions/", headers, "page_size", size)
+                self.assertEqual([t["id"] for t in pages], expected)
+
+    def test_admin_transactions_oldest_first(self):
+        admin, account_id = new_customer(role="admin")
+        ids = _add_transactions(account_id, [_BASE, _BASE, _BASE - timedelta(days=400)])
+
+        items = _pages("/adm/transactions/", admin, "limit", 2)
+        seen = [t["id"] for t in items]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertTrue(set(ids) <= set(seen))
+        keys = [(t["created_at"], t["id"]) for t in items]
+        self.assertEqual(keys, sorted(keys))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+# backend/tests/test_payment_saga.py
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from tests.support import (
+    PAYMENT_TOTAL,
+    account_balance,
+    api,
+    client,
+    new_customer,
+    osp_calls,
+    payment_row,
+    run,
+    start_payment,
+)
+
+
+async def _wait(payment_id: int, timeout: float = 5.0):
+    from services.payment_saga import wake_saga_workers, wait_for_saga
+
+    wake_saga_workers()
+    return await wait_for_saga(payment_id, timeout)
+
+
+async def _reconcile() -> dict:
+    from services.reconciliation import reconcile_payments
+
+    return await reconcile_payments()
+
+
+def _saga(
+    payment_id: int, status: str, step: str, lease_expires_at=None, payment_status=None, transaction_id=None,
+    lease_owner="crashed-host:1:0",
+) -> str:
+    """Put a saga row on the payment as a worker left it; returns its transaction id."""
+    from core.utils.txid import generate_transaction_id
+    from db.session import SessionLocal
+    from models import Payment
+    from models.payment_saga import PaymentSaga
+
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        payment = db.get(Payment, payment_id)
+        if payment_status is not None:
+            payment.status = payment_status
+        payment.acknowledgement_id = payment.acknowledgement_id or f"ACK-{payment.reference_number}"
+        saga = PaymentSaga(
+            payment_id=payment_id,
+            step=step,
+            status=status,
+            attempts=0,
+            transaction_id=transaction_id or generate_transaction_id(),
+            next_run_at=now - timedelta(seconds=1),
+            lease_owner=lease_owner if lease_expires_at else None,
+            lease_expires_at=lease_expires_at,
+        )
+        db.add(saga)
+        db.commit()
+        return saga.transaction_id
+
+
+def _saga_row(payment_id: int):
+    from db.session import SessionLocal
+    from models.payment_saga import PaymentSaga
+
+    with SessionLocal() as db:
+        saga = db.query(PaymentSaga).filter_by(payment_id=payment_id).one()
+        return saga.id, [attempt.outcome for attempt in saga.attempts_log]
+
+
+async def _start_saga(*stale_sessions):
+    """start_payment_saga for each of `stale_sessions` (loaded the payment while it was started)."""
+    from services.payment_saga import start_payment_saga
+
+    results = []
+    for db, payment in stale_sessions:
+        results.append(await start_payment_saga(db, payment, PAYMENT_TOTAL))
+        await db.close()
+    return results
+
+
+async def _load(payment_id: int):
+    from db.session import AsyncSessionLocal
+    from models import Payment
+
+    db = AsyncSessionLocal()
+    return db, await db.get(Payment, payment_id)
+
+
+def _expire_lease(payment_id: int) -> None:
+    from db.session import SessionLocal
+    from models.payment_saga import PaymentSaga
+
+    with SessionLocal() as db:
+        db.query(PaymentSaga).filter_by(payment_id=payment_id).update(
+            {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+
+
+def _stuck_payment(account_id: int, reference_number: str, status: str, debit_transaction_id=None) -> int:
+    """A payment older than RECONCILE_MIN_AGE in `status`, optionally with its local debit row."""
+    from db.session import SessionLocal
+    from models import Account, Payment, Transaction
+
+    created_at = datetime.utcnow() - timedelta(hours=1)
+    with SessionLocal() as db:
+        account = db.get(Account, account_id)
+        payment = Payment(
+            user_id=account.user_id, account_id=account_id, service_id=1, reference_number=reference_number,
+            amount=Decimal("1.00"), fee=Decimal("10.00"), total_amount=PAYMENT_TOTAL, currency="USD",
+            acknowledgement_id=f"ACK-{reference_number}", status=status, created_at=created_at,
+        )
+        db.add(payment)
+        db.flush()
+        if debit_transaction_id is not None:
+            db.add(
+                Transaction(
+                    transaction_id=debit_transaction_id, user_id=account.user_id, account_id=account_id,
+                    payment_id=payment.id, reference_number=reference_number, amount=PAYMENT_TOTAL,
+                    currency="USD", direction="debit", created_at=created_at,
+                )
+            )
+        db.commit()
+        return payment.id
+
+
+def _make_stuck(payment_id: int, status: str) -> None:
+    """Move a payment made through the API into `status`, older than RECONCILE_MIN_AGE."""
+    from db.session import SessionLocal
+    from models import Payment
+
+    with SessionLocal() as db:
+        payment = db.get(Payment, payment_id)
+        payment.status, payment.created_at = status, datetime.utcnow() - timedelta(hours=1)
+        db.commit()
+
+
+def _transactions(reference_number: str) -> list:
+    from db.session import SessionLocal
+    from models import Transaction
+
+    with SessionLocal() as db:
+        return sorted(
+            (t.direction, t.transaction_id)
+            for t in db.query(Transaction).filter_by(reference_number=reference_number)
+        )
+
+
+class SagaResumeTest(unittest.TestCase):
+    def test_expired_lease_is_taken_over_from_the_last_step(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "RESUME-1").json()["payment_id"]
+        # the worker committed at OSP, then died holding the lease
+        txid = _saga(payment, "pending", "debit", datetime.utcnow() - timedelta(seconds=1), "committed")
+
+        saga = run(_wait, payment)
+        self.assertEqual(saga.status, "succeeded")
+        self.assertEqual(payment_row(payment), ("confirmed", "captured"))
+        self.assertEqual(account_balance(account), (Decimal("100.00") - PAYMENT_TOTAL, Decimal("0.00")))
+        self.assertEqual(_transactions("RESUME-1"), [("debit", txid)])
+        self.assertEqual(osp_calls("commit-payment", "RESUME-1"), 0)
+        self.assertEqual(osp_calls("confirm-payment", "RESUME-1"), 1)
+
+    def test_live_lease_is_left_to_its_worker(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "RESUME-2").json()["payment_id"]
+        _saga(payment, "pending", "debit", datetime.utcnow() + timedelta(minutes=5), "committed")
+
+        self.assertIsNone(run(_wait, payment, 0.5))
+        self.assertEqual(payment_row(payment), ("committed", "held"))
+        self.assertEqual(osp_calls("confirm-payment", "RESUME-2"), 0)
+
+        _expire_lease(payment)
+        self.assertEqual(run(_wait, payment).status, "succeeded")
+        self.assertEqual(payment_row(payment), ("confirmed", "captured"))
+
+
+    def test_worker_dying_after_the_osp_commit_is_compensated(self):
+        from services import payment_saga
+
+        class WorkerDied(BaseException):
+            pass
+
+        real_commit = payment_saga.osp_commit
+
+        async def commit_then_die(*args):
+            await real_commit(*args)
+            raise WorkerDied
+
+        async def run_until_death(saga_id: int) -> None:
+            payment_saga.osp_commit = commit_then_die
+            try:
+                await payment_saga._run(saga_id, "doomed-host:1:0")
+            except WorkerDied:
+                pass
+            finally:
+                payment_saga.osp_commit = real_commit
+
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "ONCE-1").json()["payment_id"]
+        # leased to a worker of this test, so the app's workers leave it alone until it dies
+        _saga(payment, "pending", "commit", datetime.utcnow() + timedelta(minutes=5), "processing",
+              lease_owner="doomed-host:1:0")
+        saga_id, _ = _saga_row(payment)
+
+        run(run_until_death, saga_id)
+        self.assertEqual(osp_calls("commit-payment", "ONCE-1"), 1)
+        self.assertEqual(payment_row(payment), ("processing", "held"))
+
+        # OSP took the commit but the DB never heard of it; the re-run commit is rejected
+        _expire_lease(payment)
+        saga = run(_wait, payment)
+        self.assertEqual(saga.status, "failed")
+        self.assertEqual(osp_calls("commit-payment", "ONCE-1"), 2)
+        self.assertEqual(osp_calls("reverse-payment", "ONCE-1"), 1)
+        self.assertEqual(payment_row(payment), ("reversed", "released"))
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(_saga_row(payment)[1][:2], ["abandoned", "failed"])
+
+
+class ConfirmRaceTest(unittest.TestCase):
+    def test_concurrent_confirms_start_one_saga(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "RACE-1").json()["payment_id"]
+        # both requests read the payment while it was still started
+        first, second = run(_load, payment), run(_load, payment)
+
+        started, joined = run(_start_saga, first, second)
+        self.assertIsNotNone(started)
+        self.assertIsNone(joined)
+        self.assertEqual(run(_wait, payment).status, "succeeded")
+        self.assertEqual(payment_row(payment), ("confirmed", "captured"))
+        self.assertEqual(account_balance(account), (Decimal("100.00") - PAYMENT_TOTAL, Decimal("0.00")))
+        self.assertEqual(osp_calls("commit-payment", "RACE-1"), 1)
+
+    def test_confirm_racing_a_cancel_leaves_it_canceled(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "RACE-2").json()["payment_id"]
+        confirm = run(_load, payment)
+        r = client().post(api(f"/payments/{payment}/reverse"), headers=headers)
+        self.assertEqual(r.json()["status"], "canceled", r.text)
+
+        self.assertEqual(run(_start_saga, confirm), [None])
+        self.assertEqual(payment_row(payment), ("canceled", "released"))
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(osp_calls("commit-payment", "RACE-2"), 0)
+
+
+class ReconcileResumeTest(unittest.TestCase):
+    def test_committed_and_debited_is_confirmed_without_a_second_debit(self):
+        # legacy inline flow: debited, then the process died before confirm
+        _, account = new_customer(Decimal("100.00") - PAYMENT_TOTAL)
+        payment = _stuck_payment(account, "HELD-REC-1", "committed", debit_transaction_id="20260101000000001000000100001")
+
+        self.assertGreaterEqual(run(_reconcile)["actions"].get("confirm", 0), 1)
+        self.assertEqual(run(_wait, payment).status, "succeeded")
+        self.assertEqual(payment_row(payment)[0], "confirmed")
+        self.assertEqual(account_balance(account), (Decimal("100.00") - PAYMENT_TOTAL, Decimal("0.00")))
+        self.assertEqual(_transactions("HELD-REC-1"), [("debit", "20260101000000001000000100001")])
+        self.assertEqual(osp_calls("confirm-payment", "HELD-REC-1"), 1)
+
+    def test_reversal_failed_is_reversed_and_refunded(self):
+        _, account = new_customer(Decimal("100.00") - PAYMENT_TOTAL)
+        # the saga debited, then gave up on the OSP reversal
+        txid = "20260101000000001000000100002"
+        payment = _stuck_payment(account, "HELD-REC-2", "reversal_failed", debit_transaction_id=txid)
+        _saga(payment, "failed", "reverse", transaction_id=txid)
+
+        self.assertGreaterEqual(run(_reconcile)["actions"].get("reverse", 0), 1)
+        saga = run(_wait, payment)
+        self.assertEqual(saga.status, "failed")
+        self.assertIn("Payment reversed.", saga.last_error)
+        self.assertEqual(payment_row(payment)[0], "reversed")
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(_transactions("HELD-REC-2"), [("credit", f"R{txid}"), ("debit", txid)])
+
+    def test_open_invoice_releases_the_hold(self):
+        # OSP never took the payment: nothing to confirm or reverse there
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "OPEN-REC-1").json()["payment_id"]
+        _make_stuck(payment, "committed")
+
+        self.assertGreaterEqual(run(_reconcile)["actions"].get("refund", 0), 1)
+        self.assertEqual(run(_wait, payment).status, "failed")
+        self.assertEqual(payment_row(payment), ("failed", "released"))
+        self.assertEqual(account_balance(account), (Decimal("100.00"), Decimal("0.00")))
+        self.assertEqual(_transactions("OPEN-REC-1"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
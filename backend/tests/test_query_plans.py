@@ -0,0 +1,22 @@
+# backend/tests/test_query_plans.py
+import unittest
+
+from tests.support import client
+
+
+class QueryPlanTest(unittest.TestCase):
+    def test_hot_queries_use_indexes(self):
+        # the app startup has built and migrated the schema
+        client()
+        from db.query_plans import check_query_plans
+        from db.session import SessionLocal
+
+        with SessionLocal() as db:
+            report = check_query_plans(db)
+        self.assertEqual(report["full_scans"], [], report["queries"])
+        # the reconciliation scan narrows on its real stuck statuses, not the whole table
+        self.assertIn("ix_payments_status_created", report["queries"]["payments.stuck"]["plan"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# backend/tests/test_rate_limit.py
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from fastapi import HTTPException
+
+from core import rate_limit
+from core.rate_limit import MemoryRateLimitBackend, SQLiteRateLimitBackend, check_rate_limit_async
+
+
+class _Backend:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __enter__(self):
+        self.previous, rate_limit._backend = rate_limit._backend, self.backend
+        return self.backend
+
+    def __exit__(self, *exc):
+        rate_limit._backend = self.previous
+
+
+class RateLimitTest(unittest.TestCase):
+    def test_sliding_window(self):
+        with _Backend(MemoryRateLimitBackend(max_keys=100, evict_interval=60)):
+            for _ in range(3):
+                asyncio.run(check_rate_limit_async("client", scope="t", max_requests=3, window_seconds=60))
+            with self.assertRaises(HTTPException) as raised:
+                asyncio.run(check_rate_limit_async("client", scope="t", max_requests=3, window_seconds=60))
+            self.assertEqual(raised.exception.status_code, 429)
+            # other clients have their own window
+            asyncio.run(check_rate_limit_async("other", scope="t", max_requests=3, window_seconds=60))
+
+    def test_sqlite_backend_does_not_block_the_event_loop(self):
+        path = os.path.join(tempfile.mkdtemp(), "rl.db")
+        backend = SQLiteRateLimitBackend(path, evict_interval=60)
+        # another worker holds the write lock for a while
+        other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        other.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.5, other.execute, ("COMMIT",)).start()
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            started = time.monotonic()
+            await check_rate_limit_async("client", scope="t", max_requests=5, window_seconds=60)
+            waited = time.monotonic() - started
+            task.cancel()
+            return waited, ticks
+
+        with _Backend(backend):
+            waited, ticks = asyncio.run(scenario())
+        self.assertGreaterEqual(waited, 0.4)
+        # the loop kept running while the hit waited on the lock
+        self.assertGreaterEqual(ticks, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
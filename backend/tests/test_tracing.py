@@ -0,0 +1,54 @@
+# backend/tests/test_tracing.py
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from tests.support import confirm_payment, new_customer, run, start_payment
+
+
+class BackgroundSpansTest(unittest.TestCase):
+    def setUp(self):
+        from core import tracing
+        from core.config import settings
+
+        self.spans = []
+        patches = (
+            mock.patch.object(settings, "TRACE_SAMPLE_RATE", 1.0),
+            mock.patch.object(tracing, "_export", self.spans.append),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _named(self, prefix: str) -> list:
+        return [s for s in self.spans if s.name.startswith(prefix)]
+
+    def test_saga_steps_continue_the_confirm_trace(self):
+        headers, account = new_customer(Decimal("100.00"))
+        payment = start_payment(headers, account, "TRACE-1").json()["payment_id"]
+        self.assertEqual(confirm_payment(headers, payment).status_code, 200)
+
+        (request,) = self._named("POST /payments/{payment_id}/confirm")
+        steps = self._named("payment.saga.")
+        self.assertEqual([s.name for s in steps], [f"payment.saga.{step}" for step in ("lookup", "commit", "debit", "confirm")])
+        for step in steps:
+            self.assertEqual((step.trace_id, step.parent_span_id), (request.trace_id, request.span_id))
+            self.assertEqual(step.attributes["saga.outcome"], "ok")
+
+        # the OSP calls and DB commits of the worker are children of its step spans
+        step_ids = {s.span_id for s in steps}
+        (commit,) = self._named("osp.commit")
+        self.assertIn(commit.parent_span_id, step_ids)
+        self.assertTrue(any(s.name == "db.commit" and s.parent_span_id in step_ids for s in self.spans))
+
+    def test_scheduled_reconciliation_opens_a_root_span(self):
+        from services.reconciliation import reconcile_payments
+
+        run(reconcile_payments)
+        (root,) = self._named("payment.reconcile")
+        self.assertIsNone(root.parent_span_id)
+        self.assertTrue(any(s.trace_id == root.trace_id and s.name == "SELECT" for s in self.spans))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+# backend/tests/test_txid.py
+import threading
+import time
+import unittest
+from unittest import mock
+
+from core.config import settings
+from core.utils import txid
+from core.utils.txid import TransactionIdGenerator
+
+
+class TransactionIdTest(unittest.TestCase):
+    def test_unique_and_ordered_across_threads(self):
+        generator = TransactionIdGenerator(7)
+        results = [[] for _ in range(4)]
+
+        def run(out):
+            out.extend(generator.next_id() for _ in range(5000))
+
+        workers = [threading.Thread(target=run, args=(out,)) for out in results]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        ids = [i for out in results for i in out]
+        self.assertEqual(len(set(ids)), len(ids))
+        for out in results:
+            self.assertEqual(out, sorted(out))
+        self.assertEqual({len(i) for i in ids}, {29})
+        self.assertEqual(ids[0][14:17], "007")
+
+    def test_never_issues_in_the_creation_second(self):
+        clock = [1_000_000.5]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        with mock.patch.object(txid.time, "time", lambda: clock[0]), \
+                mock.patch.object(txid.time, "sleep", sleep):
+            generator = TransactionIdGenerator(1, pid=42)
+            first = generator.next_id()
+        self.assertEqual(first[:14], time.strftime("%Y%m%d%H%M%S", time.gmtime(1_000_001)))
+
+    def test_reused_pid_does_not_repeat_ids(self):
+        # a worker dies and its pid is handed to the next one
+        old = TransactionIdGenerator(1, pid=42)
+        issued = {old.next_id() for _ in range(100)}
+        new = TransactionIdGenerator(1, pid=42)
+        self.assertTrue(issued.isdisjoint(new.next_id() for _ in range(100)))
+
+    def test_clock_stepping_back_keeps_counting(self):
+        with mock.patch.object(txid.time, "time", return_value=2_000_000.0):
+            generator = TransactionIdGenerator(1, pid=42)
+        with mock.patch.object(txid.time, "time", return_value=2_000_005.0):
+            before = generator.next_id()
+        with mock.patch.object(txid.time, "time", return_value=2_000_001.0):
+            after = generator.next_id()
+        self.assertGreater(after, before)
+
+    def test_node_id_required_outside_debug(self):
+        with mock.patch.object(settings, "TXID_NODE_ID", -1), mock.patch.object(settings, "DEBUG", False):
+            with self.assertRaises(RuntimeError):
+                txid._node_id()
+        with mock.patch.object(settings, "TXID_NODE_ID", -1), mock.patch.object(settings, "DEBUG", True):
+            self.assertTrue(0 <= txid._node_id() <= 999)
+        with self.assertRaises(ValueError):
+            TransactionIdGenerator(1000)
+
+
+if __name__ == "__main__":
+    unittest.main()